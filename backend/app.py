@@ -1,27 +1,45 @@
 from __future__ import annotations
 
+import io
 import json
+import mimetypes
 import os
 import re
+import sqlite3
+import time
 import uuid
-from datetime import timedelta
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone, tzinfo
 from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
 load_dotenv(Path(__file__).parent / ".env")
 
-from flask import Flask, jsonify, request, send_from_directory, session
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Flask, Response, jsonify, request, send_from_directory, session
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
 from werkzeug.utils import secure_filename
 import pytesseract
 from PIL import Image
-from pdf2image import convert_from_path
 import google.generativeai as genai
-import cv2
-import numpy as np
 
-from db import connect, default_db_path, init_db, query_one, query_all, exec_one
+import bill_cache
+import gst_report
+import ledger_export
+import ledger_import
+import metrics
+from compression import StaticCompressor, compress_chunks, compress_response, negotiate, precompressed_response
+from assets import CACHE_CONTROL as ASSET_CACHE_CONTROL, AssetPipeline
+import rollup
+import search
+from einvoice import QR_CONFIDENCE, find_einvoice, looks_like_einvoice
+from db import ConnectionPool, default_db_path, get_pool, init_db, query_one, query_all, exec_one
+from extraction import extract as extract_ocr_fields, first_number, voice_amount
+from jobs import KIND_PROCESS_BILL, enqueue, latest_for_bill
+from ocr_engine import OcrTimeout, PdfConversionFailed, TesseractMissing, get_engine as get_ocr_engine
 
 # Configure Tesseract path with env override and PATH fallback
 _default_tesseract = Path(r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe")
@@ -41,12 +59,111 @@ GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Bill uploads return immediately and are processed by backend/worker.py.
+# Set LEDGERLY_BILLS_ASYNC=0 to run the pipeline inline (e.g. when no worker is deployed).
+BILLS_ASYNC = os.environ.get("LEDGERLY_BILLS_ASYNC", "1") != "0"
+BILL_EVENTS_MAX_SECONDS = 300
+
+# Batch uploads (/api/bills/batch): files per request, bytes per file, bills OCR'd at once
+BATCH_MAX_FILES = int(os.environ.get("LEDGERLY_BATCH_MAX_FILES", "100"))
+BATCH_MAX_FILE_BYTES = 20 * 1024 * 1024
+BATCH_CONCURRENCY = int(os.environ.get("LEDGERLY_BATCH_CONCURRENCY", "4"))
+
 # Allowed file extensions for bill uploads
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp", "bmp", "tiff", "pdf"}
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Snapshot day boundaries are local to the shop; created_at is stored in UTC.
+DEFAULT_TIMEZONE = os.environ.get("LEDGERLY_TIMEZONE", "Asia/Kolkata")
+_UTC_OFFSET_RE = re.compile(r"^([+-])(\d{1,2}):?(\d{2})$")
+# Fixed offsets for zones we must resolve even without tzdata (e.g. on Windows)
+_ZONE_FALLBACKS = {"Asia/Kolkata": "+05:30", "Asia/Calcutta": "+05:30"}
+
+
+def resolve_timezone(name: str) -> tzinfo:
+    """An IANA zone (``Asia/Kolkata``), ``UTC`` or a fixed offset (``+05:30``); raises ValueError."""
+    if name.upper() in ("UTC", "Z"):
+        return timezone.utc
+    m = _UTC_OFFSET_RE.match(_ZONE_FALLBACKS.get(name, name))
+    try:
+        zone = ZoneInfo(name) if "/" in name else None
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = None
+    if zone is not None:
+        return zone
+    if m:
+        sign, hours, minutes = m.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes))
+        if offset < timedelta(hours=15) and int(minutes) < 60:
+            return timezone(-offset if sign == "-" else offset)
+    raise ValueError(f"unknown timezone: {name}")
+
+
+def local_day_start_utc(day: date, tz: tzinfo) -> datetime:
+    """Naive UTC datetime of local midnight on ``day`` (comparable with created_at)."""
+    return datetime.combine(day, datetime.min.time(), tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Listing endpoints (/api/entries, /api/bills): keyset pagination with
+# ``?before_id=&limit=`` and a ``fields=`` column projection.
+PAGE_DEFAULT_LIMIT = 100
+PAGE_MAX_LIMIT = 500
+ENTRY_FIELDS = (
+    "id", "entry_type", "amount", "note", "created_at", "vendor_name", "vendor_gstin",
+    "bill_number", "bill_date", "taxable_amount", "cgst_amount", "sgst_amount", "igst_amount",
+)
+ENTRY_DEFAULT_FIELDS = ("id", "entry_type", "amount", "note", "created_at")
+BILL_FIELDS = (
+    "id", "filename", "s3_url", "ocr_text", "detected_amount", "vendor_name", "bill_date",
+    "total_amount", "gst_amount", "items_json", "confidence", "status", "created_at",
+)
+BILL_DEFAULT_FIELDS = (
+    "id", "filename", "s3_url", "ocr_text", "detected_amount", "vendor_name", "bill_date",
+    "total_amount", "gst_amount", "items_json", "status", "created_at",
+)
+
+
+def parse_page_args(args) -> tuple[int | None, int]:
+    """``(before_id, limit)`` from query args; raises ValueError on bad input."""
+    try:
+        before_id = int(args["before_id"]) if args.get("before_id") else None
+        limit = int(args.get("limit") or PAGE_DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError("before_id and limit must be integers") from None
+    if before_id is not None and before_id < 1:
+        raise ValueError("before_id must be positive")
+    if not 1 <= limit <= PAGE_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {PAGE_MAX_LIMIT}")
+    return before_id, limit
+
+
+def parse_fields(raw: str | None, allowed: tuple[str, ...], default: tuple[str, ...]) -> list[str]:
+    """Columns for a ``fields=a,b,c`` projection (``id`` is always included)."""
+    if not raw:
+        return list(default)
+    requested = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+    return ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+
+def keyset_page(
+    conn, table: str, columns: list[str], user_id: int, before_id: int | None, limit: int
+) -> tuple[list[dict], int | None]:
+    """Newest-first page of a user's rows and the ``before_id`` of the next page (None at the end)."""
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = ?"
+    params: list = [user_id]
+    if before_id is not None:
+        sql += " AND id < ?"
+        params.append(before_id)
+    rows = query_all(conn, sql + " ORDER BY id DESC LIMIT ?", (*params, limit + 1))
+    page = [dict(r) for r in rows[:limit]]
+    return page, (page[-1]["id"] if len(rows) > limit else None)
+
+
 def _clean_json_text(raw_text: str) -> str:
     """Extract JSON from LLM response (handles ```json blocks)."""
     text = raw_text.strip()
@@ -64,66 +181,27 @@ def _clean_json_text(raw_text: str) -> str:
 # ================================
 # 🔥 STEP 1: IMAGE PREPROCESSING
 # ================================
-def preprocess_bill_image(image_path: Path) -> Path:
-    """
-    Preprocess bill image for better OCR and LLM accuracy.
-    - Converts to grayscale
-    - Applies adaptive thresholding to remove shadows
-    - Enhances handwriting visibility
-    """
-    try:
-        img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            return image_path  # Return original if can't read
-        
-        # Adaptive threshold - removes shadows, enhances text
-        processed = cv2.adaptiveThreshold(
-            img, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            11, 2
-        )
-        
-        # Save processed image alongside original
-        processed_path = image_path.parent / f"processed_{image_path.name}"
-        cv2.imwrite(str(processed_path), processed)
-        return processed_path
-    except Exception:
-        return image_path  # Return original on any error
-
-
-def pdf_to_image(pdf_path: Path) -> Path:
-    """Convert first page of PDF to an image file and return its path."""
-    poppler_path = os.environ.get("POPPLER_PATH")  # Optional: path to poppler bin on Windows
-    try:
-        images = convert_from_path(str(pdf_path), first_page=1, last_page=1, poppler_path=poppler_path)
-        if not images:
-            return pdf_path
-        out_path = pdf_path.with_suffix(".png")
-        images[0].save(out_path, "PNG")
-        return out_path
-    except Exception as e:
-        print(f"[ledgerly] PDF conversion failed: {e}")
-        return pdf_path
+# Preprocessing, PDF rasterisation and Tesseract run in the OCR process pool
+# (ocr_engine.py) on in-memory image buffers.
 
 # ================================
 # 🎯 STEP 3: EXTRACTION_PROMPT
 # ================================
 EXTRACTION_PROMPT = """
 Analyze this Indian GST bill and extract the following information in JSON format:
-{
+{{
   "vendor_name": "",
   "vendor_gstin": "",
   "bill_number": "",
   "bill_date": "",
   "items": [
-    {
+    {{
       "description": "",
       "hsn_code": "",
       "quantity": 0,
       "rate": 0,
       "amount": 0
-    }
+    }}
   ],
   "subtotal": 0,
   "cgst_rate": 0,
@@ -133,7 +211,7 @@ Analyze this Indian GST bill and extract the following information in JSON forma
   "igst_rate": 0,
   "igst_amount": 0,
   "total_amount": 0
-}
+}}
 
 Return ONLY valid JSON, no markdown formatting.
 
@@ -231,50 +309,15 @@ def validate_bill_data(bill: dict) -> dict:
 
 def _fallback_extract_from_ocr(ocr_text: str) -> dict:
     """Lightweight regex-based extraction used when no Gemini API key is set."""
-    # Amount detection (reuse patterns similar to upload handler)
-    amount_patterns = [
-        r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",
-        r"Total[:\s]*([\d,]+\.?\d*)",
-        r"Amount[:\s]*([\d,]+\.?\d*)",
-        r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",
-        r"\b([\d,]+\.\d{2})\b",
-    ]
-    detected_amount = None
-    for pattern in amount_patterns:
-        m = re.search(pattern, ocr_text, re.IGNORECASE)
-        if m:
-            try:
-                detected_amount = float(m.group(1).replace(",", ""))
-                break
-            except ValueError:
-                continue
-
-    # Date detection (simple dd/mm/yyyy or yyyy-mm-dd)
-    date_patterns = [
-        r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4})",
-        r"(\d{4}[\-/]\d{1,2}[\-/]\d{1,2})",
-    ]
-    bill_date = None
-    for pattern in date_patterns:
-        m = re.search(pattern, ocr_text)
-        if m:
-            bill_date = m.group(1)
-            break
-
+    fields = extract_ocr_fields(ocr_text)
+    detected_amount = fields.best_amount()
+    bill_date = fields.best_date()
     # Vendor name: first non-empty line that isn't obviously a label
-    vendor_name = None
-    for line in ocr_text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        if any(label in line.lower() for label in ["invoice", "bill", "date", "gst", "total", "amount"]):
-            continue
-        vendor_name = line
-        break
+    vendor_name = fields.best_vendor()
 
     return {
         "vendor_name": vendor_name,
-        "vendor_gstin": None,
+        "vendor_gstin": fields.best_gstin(),
         "bill_number": None,
         "bill_date": bill_date,
         "items": [],
@@ -297,36 +340,10 @@ def extract_voice_data_simple(transcript: str) -> dict:
     - "200 rupees ka rice kharida" -> amount=200, type=expense
     - "received 1000 from customer" -> amount=1000, type=income
     """
-    import re
     text_lower = transcript.lower()
-    
-    amount = 0
-    
-    # Priority 1: Look for currency patterns (rupaye/rupees/rs/₹ followed/preceded by number)
-    # Pattern: number + rupaye/rupees/rs OR ₹ + number
-    currency_patterns = [
-        r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:rupaye|rupees|rupiya|rs\.?|₹)",  # 500 rupaye
-        r"(?:rupaye|rupees|rupiya|rs\.?|₹)\s*(\d+(?:,\d+)*(?:\.\d+)?)",  # rs 500
-        r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:ka|ke|ki|mein|me|में)",  # 500 ka (Hindi pattern)
-    ]
-    
-    for pattern in currency_patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            amount_str = match.group(1).replace(",", "")
-            try:
-                amount = float(amount_str)
-                break
-            except ValueError:
-                continue
-    
-    # Priority 2: If no currency pattern found, look for the largest number (likely the amount)
-    if amount == 0:
-        all_numbers = re.findall(r"(\d+(?:,\d+)*(?:\.\d+)?)", transcript)
-        if all_numbers:
-            numbers = [float(n.replace(",", "")) for n in all_numbers]
-            # Take the largest number as the amount
-            amount = max(numbers)
+
+    # Currency-adjacent number first ("500 rupaye", "rs 500", "500 ka"), else the largest number
+    amount = voice_amount(transcript)
     
     # Determine entry type based on keywords
     entry_type = "expense"  # Default
@@ -360,7 +377,7 @@ def extract_voice_data_simple(transcript: str) -> dict:
 # ================================
 # 🧠 MAIN EXTRACTION PIPELINE
 # ================================
-def run_gemini_structured(image_path: Path, ocr_text: str) -> dict | None:
+def run_gemini_structured(image_bytes: bytes | None, ocr_text: str) -> dict | None:
     """
     Complete bill extraction pipeline:
     1. Preprocess image
@@ -372,20 +389,27 @@ def run_gemini_structured(image_path: Path, ocr_text: str) -> dict | None:
         return _fallback_extract_from_ocr(ocr_text)
 
     try:
-        # Preprocess image for better accuracy
-        processed_path = preprocess_bill_image(image_path)
-        
-        # Load image for Gemini (ensure RGB)
-        pil_image = Image.open(processed_path).convert("RGB")
+        # Digital PDFs arrive as text only (image_bytes is None)
+        pil_image = None
+        if image_bytes is not None:
+            # Preprocess image for better accuracy (in the OCR process pool)
+            with metrics.stage("preprocess"):
+                processed = get_ocr_engine().preprocess(image_bytes)
+
+            # Load image for Gemini (ensure RGB)
+            pil_image = Image.open(io.BytesIO(processed)).convert("RGB")
         
         # STEP 3: First extraction pass
         extraction_prompt = EXTRACTION_PROMPT.format(ocr_text=ocr_text)
         model_name = GEMINI_MODEL or "gemini-1.5-flash"
         model = genai.GenerativeModel(model_name)
         
-        response = model.generate_content([extraction_prompt, pil_image])
-        raw = response.text or ""
-        extracted = json.loads(_clean_json_text(raw))
+        with metrics.stage("gemini_extract"):
+            with metrics.llm_call("gemini", model_name, "bill_extract") as call:
+                response = model.generate_content([extraction_prompt, pil_image] if pil_image else [extraction_prompt])
+                call.usage_from(response)
+            raw = response.text or ""
+            extracted = json.loads(_clean_json_text(raw))
         
         if not isinstance(extracted, dict):
             return None
@@ -395,9 +419,12 @@ def run_gemini_structured(image_path: Path, ocr_text: str) -> dict | None:
             verify_prompt = VERIFICATION_PROMPT.format(
                 extracted_json=json.dumps(extracted, indent=2)
             )
-            verify_response = model.generate_content([verify_prompt, pil_image])
-            verify_raw = verify_response.text or ""
-            verified = json.loads(_clean_json_text(verify_raw))
+            with metrics.stage("gemini_verify"):
+                with metrics.llm_call("gemini", model_name, "bill_verify") as call:
+                    verify_response = model.generate_content([verify_prompt, pil_image] if pil_image else [verify_prompt])
+                    call.usage_from(verify_response)
+                verify_raw = verify_response.text or ""
+                verified = json.loads(_clean_json_text(verify_raw))
             
             if isinstance(verified, dict):
                 extracted = verified  # Use verified version
@@ -405,21 +432,365 @@ def run_gemini_structured(image_path: Path, ocr_text: str) -> dict | None:
             pass  # Keep original extraction if verification fails
         
         # STEP 5: Rule-based validation
-        validated = validate_bill_data(extracted)
-        
-        # Cleanup processed image
-        if processed_path != image_path and processed_path.exists():
-            try:
-                processed_path.unlink()
-            except Exception:
-                pass
-        
-        return validated
+        with metrics.stage("validate"):
+            return validate_bill_data(extracted)
         
     except Exception as e:
         print(f"Gemini extraction error: {e}")
         return None
 
+# Per-page results of a multi-page bill: header fields come from the first page
+# that has them, totals from the last (they are printed at the end), items are concatenated.
+BILL_HEADER_FIELDS = ("vendor_name", "vendor_gstin", "bill_number", "bill_date")
+BILL_TOTAL_FIELDS = (
+    "subtotal", "cgst_rate", "cgst_amount", "sgst_rate", "sgst_amount",
+    "igst_rate", "igst_amount", "gst_amount", "gst_percentage", "total_amount",
+)
+
+
+def merge_bill_pages(pages: list[dict]) -> dict:
+    """Combine the structured extraction of each page into one bill."""
+    if len(pages) <= 1:
+        return dict(pages[0]) if pages else {}
+
+    merged: dict = {}
+    for page in pages:
+        for key, value in page.items():
+            if value in (None, "", 0, []) or key in ("items", "confidence"):
+                continue
+            if key in BILL_TOTAL_FIELDS or key not in merged:
+                merged[key] = value
+    merged["items"] = [item for page in pages for item in (page.get("items") or [])]
+    confidences = [page["confidence"] for page in pages if page.get("confidence") is not None]
+    if confidences:
+        merged["confidence"] = min(confidences)
+    merged["pages"] = len(pages)
+    return merged
+
+
+class BillProcessingError(Exception):
+    """Bill pipeline failure carrying the API error code returned to clients."""
+
+    def __init__(self, code: str, message: str, retryable: bool = False) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.retryable = retryable
+
+
+def process_bill(
+    pool: ConnectionPool,
+    bill_id: int,
+    user_id: int,
+    local_path: Path,
+    progress: Callable[[str], None] | None = None,
+) -> dict:
+    """
+    Run OCR + structured extraction for a stored bill and persist the results.
+    Shared by the inline upload handler and the background worker; ``progress``
+    is called with the name of each stage as it starts.
+    """
+    ocr_text, structured, processing_ms = run_bill_pipeline(local_path, progress)
+    return save_bill_result(
+        pool, bill_id, user_id, ocr_text, structured,
+        processing_ms=processing_ms,
+        progress=progress,
+    )
+
+
+def mark_bill_failed(pool: ConnectionPool, bill_id: int) -> None:
+    """Fail a bill its own request could not process, so the worker's orphan sweep skips it."""
+    with pool.connection() as conn:
+        conn.execute("UPDATE bills SET status = 'failed' WHERE id = ? AND status = 'processing'", (bill_id,))
+
+
+def run_bill_pipeline(
+    local_path: Path,
+    progress: Callable[[str], None] | None = None,
+) -> tuple[str, dict, float]:
+    """OCR + structured extraction for a stored bill file, without touching the DB.
+
+    Returns ``(ocr_text, structured, processing_ms)``.
+    """
+    def stage(name: str) -> None:
+        if progress is not None:
+            progress(name)
+
+    started = time.perf_counter()
+    engine = get_ocr_engine()
+    try:
+        file_bytes = local_path.read_bytes()
+    except OSError as e:
+        raise BillProcessingError("ocr_failed", f"Failed to read image/PDF: {e}")
+
+    is_pdf = local_path.suffix.lower() == ".pdf"
+    page_count = 1
+    page_texts: list[str] = []
+    page_results: list[dict] = []
+    einvoice_fields: dict | None = None
+
+    def read_qr(load_images: Callable[[], list[bytes]]) -> None:
+        # A signed GST e-invoice QR already holds GSTIN, number, date and total;
+        # an image that can't be read or decoded just means no QR.
+        nonlocal einvoice_fields
+        stage("qr")
+        try:
+            with metrics.stage("qr"):
+                for image in load_images():
+                    einvoice_fields = find_einvoice(engine.qr_codes(image))
+                    if einvoice_fields is not None:
+                        break
+        except Exception as e:
+            print(f"[ledgerly] QR decode failed: {e}")
+
+    def structure(image_bytes: bytes | None, page_text: str, number: int, count: int) -> None:
+        # Use Gemini Vision to structure each page (optional; not needed for e-invoices)
+        if GEMINI_API_KEY and einvoice_fields is None:
+            stage("extract" if count == 1 else f"extract {number}/{count}")
+            page_result = run_gemini_structured(image_bytes, page_text)
+            if page_result:
+                page_results.append(page_result)
+
+    try:
+        # Digital PDFs carry a text layer: read it directly, no rasterising or OCR
+        if is_pdf:
+            with metrics.stage("pdf_text"):
+                page_count = engine.pdf_page_count(file_bytes)
+                text_layer = engine.pdf_text(file_bytes, page_count)
+        else:
+            text_layer = None
+        if text_layer is not None:
+            # Rendering page 1 costs what the text layer saved, so only for invoices
+            # that say they are e-invoices (their QR may be vector-drawn); other
+            # PDFs are checked for a QR pasted in as an image
+            if looks_like_einvoice(text_layer[0] if text_layer else ""):
+                read_qr(lambda: [engine.pdf_first_page(file_bytes)])
+            else:
+                read_qr(lambda: engine.pdf_first_page_images(file_bytes))
+            stage("pdf_text")
+            for number, page_text in enumerate(text_layer, start=1):
+                page_texts.append(page_text)
+                structure(None, page_text, number, len(text_layer))
+        else:
+            # Scanned PDFs are rasterised, OCR'd and extracted one page at a time so
+            # memory stays flat however many pages they have; images are one page.
+            if is_pdf:
+                stage("pdf_to_image")
+                pages = metrics.timed_iter(engine.pdf_pages(file_bytes, page_count), "pdf_to_image")
+            else:
+                pages = iter([(1, 1, file_bytes)])
+            del file_bytes
+
+            for number, count, image_bytes in pages:
+                if number == 1:
+                    read_qr(lambda: [image_bytes])
+                # Run Tesseract OCR in the process pool
+                stage("ocr" if count == 1 else f"ocr {number}/{count}")
+                with metrics.stage("tesseract"):
+                    page_text = engine.ocr(image_bytes)
+                page_texts.append(page_text)
+                structure(image_bytes, page_text, number, count)
+    except PdfConversionFailed as e:
+        print(f"[ledgerly] PDF conversion failed: {e}")
+        raise BillProcessingError(
+            "pdf_conversion_failed",
+            "Could not convert PDF to image. Install Poppler and set POPPLER_PATH to its bin folder, "
+            "then restart the server.",
+        )
+    except TesseractMissing:
+        raise BillProcessingError(
+            "tesseract_missing",
+            "Tesseract executable not found. Set TESSERACT_CMD to your tesseract.exe path "
+            "or add it to PATH, then restart the server.",
+        )
+    except OcrTimeout as e:
+        raise BillProcessingError("ocr_timeout", str(e), retryable=True)
+    except Exception as e:
+        raise BillProcessingError("ocr_failed", f"Failed to read image/PDF: {e}")
+
+    ocr_text = "\n".join(page_texts)
+    if not GEMINI_API_KEY:
+        stage("extract")
+    if einvoice_fields is not None:
+        # E-invoice QR fields are exact; the OCR text only fills what the QR lacks (vendor name)
+        structured = _fallback_extract_from_ocr(ocr_text)
+        structured.update({key: value for key, value in einvoice_fields.items() if value is not None})
+        structured["confidence"] = QR_CONFIDENCE
+    else:
+        structured = merge_bill_pages(page_results)
+
+        # If LLM/gemini returned nothing useful, fall back to OCR regex extraction
+        if not structured or (structured.get("total_amount") in (None, 0) and not structured.get("items")):
+            structured = _fallback_extract_from_ocr(ocr_text)
+
+    structured["text_source"] = "pdf_text" if text_layer is not None else "ocr"
+    # Pages past LEDGERLY_PDF_MAX_PAGES are not read: say so, the totals may be incomplete
+    structured["page_count"] = page_count
+    structured["pages_processed"] = len(page_texts)
+    structured["truncated"] = len(page_texts) < page_count
+    if structured["truncated"]:
+        print(f"[ledgerly] {local_path.name}: processed {len(page_texts)} of {page_count} pages")
+
+    # Minimal item spotting heuristic: if no items but we have a total, create a single inferred line item
+    if structured.get("items") in (None, [], ()):  # empty items
+        total_val = structured.get("total_amount") or structured.get("detected_amount")
+        if total_val:
+            structured["items"] = [{
+                "description": "Inferred item",
+                "hsn_code": None,
+                "quantity": 1,
+                "rate": total_val,
+                "amount": total_val
+            }]
+
+    return ocr_text, structured, (time.perf_counter() - started) * 1000
+
+
+def bill_result_fields(ocr_text: str, structured: dict) -> dict:
+    """Flatten a structured extraction into the bill/entry columns (plus the API fields)."""
+    cgst_amount = structured.get("cgst_amount")
+    sgst_amount = structured.get("sgst_amount")
+    igst_amount = structured.get("igst_amount")
+    items = structured.get("items")
+    return {
+        "vendor_name": structured.get("vendor_name"),
+        "vendor_gstin": structured.get("vendor_gstin"),
+        "bill_number": structured.get("bill_number"),
+        "bill_date": structured.get("bill_date"),
+        "total_amount": structured.get("total_amount"),
+        "subtotal": structured.get("subtotal"),  # Taxable value
+        "cgst_amount": cgst_amount,
+        "sgst_amount": sgst_amount,
+        "igst_amount": igst_amount,
+        "gst_amount": (cgst_amount or 0) + (sgst_amount or 0) + (igst_amount or 0),
+        "items": items,
+        "items_json": json.dumps(items) if items is not None else None,
+        "confidence": structured.get("confidence"),
+        "page_count": structured.get("page_count"),
+        "truncated": bool(structured.get("truncated")),
+        # Best amount candidate from the OCR text (shared, memoised scan)
+        "detected_amount": extract_ocr_fields(ocr_text).best_amount(),
+    }
+
+
+def bill_entry_params(user_id: int, fields: dict) -> tuple | None:
+    """INSERT parameters for the expense entry auto-created from a bill, or None without a total."""
+    total_amount = fields["total_amount"]
+    if not total_amount or total_amount <= 0:
+        return None
+    return (
+        user_id, total_amount, f"Bill from {fields['vendor_name'] or 'Unknown Vendor'}",
+        fields["vendor_name"], fields["vendor_gstin"], fields["bill_number"], fields["bill_date"],
+        fields["subtotal"], fields["cgst_amount"], fields["sgst_amount"], fields["igst_amount"],
+    )
+
+
+BILL_ENTRY_INSERT = """INSERT INTO entries (
+    user_id, entry_type, amount, note,
+    vendor_name, vendor_gstin, bill_number, bill_date,
+    taxable_amount, cgst_amount, sgst_amount, igst_amount
+) VALUES (?, 'expense', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def bill_api_result(ocr_text: str, fields: dict) -> dict:
+    return {
+        "ocr_text": ocr_text,
+        "detected_amount": fields["detected_amount"],
+        "vendor_name": fields["vendor_name"],
+        "bill_date": fields["bill_date"],
+        "total_amount": fields["total_amount"],
+        "gst_amount": fields["gst_amount"],
+        "items": fields["items"],
+        "confidence": fields["confidence"],
+        "page_count": fields["page_count"],
+        "truncated": fields["truncated"],
+        "status": "done",
+    }
+
+
+def save_bill_result(
+    pool: ConnectionPool,
+    bill_id: int,
+    user_id: int,
+    ocr_text: str,
+    structured: dict,
+    processing_ms: float | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> dict:
+    """
+    Persist OCR text + structured extraction on a 'processing' bill and create its
+    ledger entry. Used by the pipeline and by dedup cache hits that copy a result.
+    """
+    fields = bill_result_fields(ocr_text, structured)
+
+    # Update bill record and auto-create the ledger entry atomically. The status
+    # guard makes a retried job (or a racing worker) a no-op instead of a duplicate entry.
+    if progress is not None:
+        progress("db_write")
+    with metrics.stage("db_write"), pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(
+            """UPDATE bills SET ocr_text = ?, detected_amount = ?, vendor_name = ?, bill_date = ?,
+                   total_amount = ?, gst_amount = ?, items_json = ?, confidence = ?,
+                   structured_json = ?, processing_ms = COALESCE(?, processing_ms), status = 'done'
+               WHERE id = ? AND status = 'processing'""",
+            (ocr_text, fields["detected_amount"], fields["vendor_name"], fields["bill_date"],
+             fields["total_amount"], fields["gst_amount"], fields["items_json"], fields["confidence"],
+             json.dumps(structured), processing_ms, bill_id),
+        )
+
+        # Auto-create ledger entry if we have a valid total amount
+        entry = bill_entry_params(user_id, fields)
+        if cur.rowcount == 1 and entry is not None:
+            exec_one(conn, BILL_ENTRY_INSERT, entry)
+
+    return bill_api_result(ocr_text, fields)
+
+
+def expand_batch_uploads(files: list) -> tuple[list[dict], list[dict]]:
+    """
+    Flatten uploaded files (and the members of any ``.zip`` among them) into
+    ``{"filename", "data"}`` items. Returns ``(accepted, rejected)``; rejected
+    items carry an ``error`` code instead of data.
+    """
+    accepted: list[dict] = []
+    rejected: list[dict] = []
+
+    def add(name: str, data: bytes) -> None:
+        if not allowed_file(name):
+            rejected.append({"filename": name, "error": "invalid_file_type"})
+        elif len(data) > BATCH_MAX_FILE_BYTES:
+            rejected.append({"filename": name, "error": "file_too_large"})
+        elif not data:
+            rejected.append({"filename": name, "error": "empty_file"})
+        else:
+            accepted.append({"filename": name, "data": data})
+
+    for file in files:
+        if not file.filename:
+            continue
+        if file.filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(file.read()))
+            except zipfile.BadZipFile:
+                rejected.append({"filename": file.filename, "error": "invalid_zip"})
+                continue
+            with archive:
+                for info in archive.infolist():
+                    name = info.filename.rsplit("/", 1)[-1]
+                    if info.is_dir() or not name or name.startswith(".") or info.filename.startswith("__MACOSX/"):
+                        continue
+                    if info.file_size > BATCH_MAX_FILE_BYTES:
+                        rejected.append({"filename": name, "error": "file_too_large"})
+                        continue
+                    # Read one byte past the limit so a lying header can't inflate unbounded
+                    with archive.open(info) as member:
+                        add(name, member.read(BATCH_MAX_FILE_BYTES + 1))
+        else:
+            add(file.filename, file.read())
+    return accepted, rejected
+
+
 FRONTEND_DIR = Path(__file__).resolve().parents[1]
 PAGES_DIR = FRONTEND_DIR / "pages"
 STYLES_DIR = FRONTEND_DIR / "styles"
@@ -438,9 +809,12 @@ def create_app() -> Flask:
     db_path = Path(os.environ.get("LEDGERLY_DB_PATH", str(default_db_path())))
     init_db(db_path)
     BILLS_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    pool = get_pool(db_path)
+    # Request latency, SQL per request, bill stages and LLM usage at GET /metrics
+    metrics.install_flask(app, "app")
 
     def ensure_demo_user() -> None:
-        with connect(db_path) as conn:
+        with pool.connection() as conn:
             existing = query_one(conn, "SELECT id FROM users WHERE email = ?", ("demo@ledgerly.in",))
             if existing is None:
                 pwd_hash = generate_password_hash("Ledgerly@123")
@@ -452,15 +826,29 @@ def create_app() -> Flask:
 
     ensure_demo_user()
 
+    assets = AssetPipeline(PAGES_DIR, {"styles": STYLES_DIR, "script": SCRIPTS_DIR, "uploads": UPLOADS_DIR})
+    assets.warm()
+    compressor = StaticCompressor()
+    compressor.precompress_in_background([PAGES_DIR, STYLES_DIR, SCRIPTS_DIR])
+
     @app.after_request
     def add_header(response):
+        # Fingerprinted assets are immutable; everything else (HTML, API) is revalidated
+        if response.headers.get("Cache-Control") == ASSET_CACHE_CONTROL:
+            return response
         response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
         response.headers["Pragma"] = "no-cache"
         response.headers["Expires"] = "0"
         return response
 
+    @app.after_request
+    def compress_json(response):
+        # Large JSON (entries, bills, snapshots); static files are compressed in send_asset/send_page
+        return compress_response(response, request.headers.get("Accept-Encoding"))
+
     def get_conn():
-        return connect(db_path)
+        # Pooled, pre-configured connection; commits on exit like ``with sqlite3.connect()``.
+        return pool.connection()
 
     def current_user_id() -> int | None:
         user_id = session.get("user_id")
@@ -475,17 +863,42 @@ def create_app() -> Flask:
     # -------------------------
     # Frontend file serving
     # -------------------------
+    def compressed(mimetype: str | None, path: Path | None = None, data: bytes | None = None, key: str | None = None):
+        return precompressed_response(compressor, request.headers.get("Accept-Encoding"), mimetype,
+                                      path=path, data=data, key=key)
+
+    def send_page(name: str):
+        # Pages with their asset URLs rewritten to fingerprinted names
+        body = assets.page(name)
+        if body is None:
+            page_path = safe_join(str(PAGES_DIR), name)
+            response = compressed("text/html", path=Path(page_path)) if page_path else None
+            return response or send_from_directory(PAGES_DIR, name)
+        return compressed("text/html", data=body, key=f"page:{name}") or Response(body, mimetype="text/html")
+
+    def send_asset(directory: Path, prefix: str, inner: str):
+        hashed = assets.resolve(prefix, inner)
+        if hashed is None:
+            plain = safe_join(str(directory), inner)
+            response = compressed(mimetypes.guess_type(inner)[0], path=Path(plain)) if plain else None
+            return response or send_from_directory(directory, inner)
+        response = compressed(mimetypes.guess_type(hashed.name)[0], path=hashed)
+        if response is None:
+            response = send_from_directory(directory, hashed.relative_to(directory).as_posix(), max_age=31536000)
+        response.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+        return response
+
     @app.get("/")
     def serve_index():
-        return send_from_directory(PAGES_DIR, "index.html")
+        return send_page("index.html")
 
     @app.get("/dashboard")
     def serve_dashboard():
-        return send_from_directory(PAGES_DIR, "dashboard.html")
+        return send_page("dashboard.html")
 
     @app.get("/insights")
     def serve_insights():
-        return send_from_directory(PAGES_DIR, "insights.html")
+        return send_page("insights.html")
 
     @app.get("/<path:path>")
     def serve_static(path: str):
@@ -495,19 +908,19 @@ def create_app() -> Flask:
 
         if path.startswith("styles/"):
             inner = path.split("/", 1)[1]
-            return send_from_directory(STYLES_DIR, inner)
+            return send_asset(STYLES_DIR, "styles", inner)
 
         if path.startswith("script/"):
             inner = path.split("/", 1)[1]
-            return send_from_directory(SCRIPTS_DIR, inner)
+            return send_asset(SCRIPTS_DIR, "script", inner)
 
         if path.startswith("uploads/"):
             inner = path.split("/", 1)[1]
-            return send_from_directory(UPLOADS_DIR, inner)
+            return send_asset(UPLOADS_DIR, "uploads", inner)
 
         page_candidate = PAGES_DIR / path
         if page_candidate.is_file():
-            return send_from_directory(PAGES_DIR, path)
+            return send_page(path)
 
         full_path = FRONTEND_DIR / path
         if full_path.is_file():
@@ -613,14 +1026,16 @@ def create_app() -> Flask:
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
+        try:
+            before_id, limit = parse_page_args(request.args)
+            fields = parse_fields(request.args.get("fields"), ENTRY_FIELDS, ENTRY_DEFAULT_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
         with get_conn() as conn:
-            rows = query_all(
-                conn,
-                "SELECT id, entry_type, amount, note, created_at FROM entries WHERE user_id = ? ORDER BY id DESC",
-                (user_id,),
-            )
+            entries, next_before_id = keyset_page(conn, "entries", fields, user_id, before_id, limit)
 
-        return jsonify({"ok": True, "entries": [dict(r) for r in rows]})
+        return jsonify({"ok": True, "entries": entries, "next_before_id": next_before_id})
 
     @app.post("/api/entries")
     def api_create_entry():
@@ -652,6 +1067,70 @@ def create_app() -> Flask:
             )
 
         return jsonify({"ok": True, "entry": {"id": entry_id, "entry_type": entry_type, "amount": amount_val, "note": note}})
+
+    @app.post("/api/entries/import")
+    def api_import_entries():
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        # Raw CSV/NDJSON body, or a multipart ``file`` (spooled to disk by werkzeug);
+        # either way it is read in chunks, never whole
+        upload = request.files.get("file") if request.mimetype == "multipart/form-data" else None
+        stream = upload.stream if upload is not None else request.stream
+        try:
+            fmt = ledger_import.detect_format(
+                request.args.get("format"),
+                upload.mimetype if upload is not None else request.mimetype,
+                upload.filename if upload is not None else None,
+            )
+            tz = resolve_timezone(request.args.get("tz") or DEFAULT_TIMEZONE)
+        except ValueError as e:
+            return jsonify({"error": "invalid_query", "message": str(e)}), 400
+        dry_run = (request.args.get("dry_run") or "").lower() in ("1", "true", "yes")
+
+        try:
+            result = ledger_import.import_stream(pool, user_id, stream, fmt, tz, dry_run=dry_run)
+        except ValueError as e:
+            return jsonify({"error": "import_invalid", "message": str(e)}), 400
+
+        print(f"[ledgerly] import user={user_id} {fmt}: {result.imported} imported, {result.failed} failed"
+              + (" (dry run)" if dry_run else "") + (f", aborted: {result.aborted}" if result.aborted else ""))
+        return jsonify({"ok": True, "dry_run": dry_run, "import": result.as_dict()})
+
+    @app.get("/api/entries/export")
+    def api_export_entries():
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        # ?from=&to= are inclusive local days in ?tz=, as for the snapshot; both optional
+        fmt = (request.args.get("format") or "csv").lower()
+        try:
+            if fmt not in ledger_export.FORMATS:
+                raise ValueError(f"format must be one of: {', '.join(ledger_export.FORMATS)}")
+            tz = resolve_timezone(request.args.get("tz") or DEFAULT_TIMEZONE)
+            from_date = date.fromisoformat(request.args["from"]) if request.args.get("from") else None
+            to_date = date.fromisoformat(request.args["to"]) if request.args.get("to") else None
+            if from_date and to_date and from_date > to_date:
+                raise ValueError("from must not be after to")
+        except ValueError as e:
+            return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
+        stamp = "%Y-%m-%d %H:%M:%S"
+        start_utc = local_day_start_utc(from_date, tz).strftime(stamp) if from_date else None
+        end_utc = local_day_start_utc(to_date + timedelta(days=1), tz).strftime(stamp) if to_date else None
+        body = ledger_export.export_chunks(pool.db_path, user_id, fmt, tz, start_utc, end_utc)
+
+        filename = "-".join(["ledgerly-entries", *(str(d) for d in (from_date, to_date) if d)]) + f".{fmt}"
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+        # XLSX is already a zip; CSV/NDJSON shrink ~5x
+        encoding = negotiate(request.headers.get("Accept-Encoding")) if fmt != "xlsx" else None
+        if encoding is not None:
+            body = compress_chunks(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Vary"] = "Accept-Encoding"
+        return Response(body, mimetype=ledger_export.FORMATS[fmt], headers=headers)
     
     # -------------------------
     # Billing Snapshot API
@@ -662,50 +1141,31 @@ def create_app() -> Flask:
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
-        # Get range parameter (week or month)
+        # Local calendar days: ?from=&to= (YYYY-MM-DD, inclusive) or range=week|month
+        # ending today, in ?tz= (default LEDGERLY_TIMEZONE)
         range_param = request.args.get("range", "week").lower()
-        
+        tz_name = request.args.get("tz") or DEFAULT_TIMEZONE
+        try:
+            tz = resolve_timezone(tz_name)
+            to_date = date.fromisoformat(request.args["to"]) if request.args.get("to") else datetime.now(tz).date()
+            if request.args.get("from"):
+                from_date = date.fromisoformat(request.args["from"])
+                range_param = "custom"
+            else:
+                from_date = to_date - timedelta(days=(30 if range_param == "month" else 7) - 1)  # Default to week
+            if from_date > to_date:
+                raise ValueError("from must not be after to")
+        except ValueError as e:
+            return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
+        # Aggregated in SQL: whole UTC days from the daily rollup, the partial
+        # days at the edges from entries via its (user_id, created_at) index
         with get_conn() as conn:
-            # Get all entries for the user
-            rows = query_all(
-                conn,
-                "SELECT id, entry_type, amount, created_at FROM entries WHERE user_id = ? ORDER BY created_at DESC",
-                (user_id,),
+            totals = rollup.range_totals(
+                conn, user_id, local_day_start_utc(from_date, tz), local_day_start_utc(to_date + timedelta(days=1), tz)
             )
-
-        # Filter by range and calculate metrics
-        from datetime import datetime, timedelta
-        
-        now = datetime.now()
-        if range_param == "week":
-            cutoff_date = now - timedelta(days=7)
-        elif range_param == "month":
-            cutoff_date = now - timedelta(days=30)
-        else:
-            cutoff_date = now - timedelta(days=7)  # Default to week
-
-        total_income = 0
-        total_expenses = 0
-        total_collections = 0
-        total_payables = 0
-        due_receivables = 0
-
-        for row in rows:
-            entry_date = datetime.fromisoformat(row["created_at"].replace(" ", "T"))
-            
-            # Include all entries for income/expense tracking
-            amount = float(row["amount"])
-            if row["entry_type"] == "income":
-                total_income += amount
-            else:
-                total_expenses += amount
-
-            # For this range
-            if entry_date >= cutoff_date:
-                if row["entry_type"] == "income":
-                    total_collections += amount
-                else:
-                    total_payables += amount
+        total_collections = totals["income"]["amount"]
+        total_payables = totals["expense"]["amount"]
 
         # Due receivables is 30% of collections (placeholder logic)
         due_receivables = total_collections * 0.3
@@ -718,8 +1178,103 @@ def create_app() -> Flask:
                 "total_payables": total_payables,
                 "due_receivables": due_receivables,
                 "range": range_param,
+                "from": from_date.isoformat(),
+                "to": to_date.isoformat(),
+                "timezone": tz_name,
+                "income_count": totals["income"]["entry_count"],
+                "expense_count": totals["expense"]["entry_count"],
             }
         })
+
+    # -------------------------
+    # Search
+    # -------------------------
+    @app.get("/api/search")
+    def api_search():
+        """Ranked full-text search over the user's bills and entries (see search.py)."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        text = request.args.get("q") or ""
+        kind = (request.args.get("type") or "all").lower()
+        try:
+            limit = int(request.args.get("limit") or search.SEARCH_DEFAULT_LIMIT)
+            offset = int(request.args.get("offset") or 0)
+        except ValueError:
+            return jsonify({"error": "invalid_query", "message": "limit and offset must be integers"}), 400
+        if kind not in search.TYPES:
+            return jsonify({"error": "invalid_query", "message": f"type must be one of: {', '.join(search.TYPES)}"}), 400
+        if not 1 <= limit <= search.SEARCH_MAX_LIMIT or not 0 <= offset <= search.SEARCH_MAX_OFFSET:
+            return jsonify({"error": "invalid_query", "message": f"limit must be 1-{search.SEARCH_MAX_LIMIT} "
+                                                                 f"and offset 0-{search.SEARCH_MAX_OFFSET}"}), 400
+
+        query = search.parse_query(text, datetime.now(resolve_timezone(DEFAULT_TIMEZONE)).date())
+        if not query.terms and query.month is None:
+            return jsonify({"error": "query_required", "message": "Type a word to search for."}), 400
+
+        try:
+            with get_conn() as conn:
+                if query.terms:
+                    hits, next_offset = search.search(conn, user_id, query, kind, limit, offset)
+                else:
+                    hits, next_offset = search.recent_in_month(conn, user_id, query, kind, limit, offset)
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            return jsonify({"error": "search_unavailable", "message": "Full-text search needs SQLite with FTS5."}), 503
+
+        return jsonify({
+            "ok": True,
+            "query": {"terms": list(query.terms), "month": "%d-%02d" % query.month if query.month else None},
+            "results": hits,
+            "next_offset": next_offset,
+        })
+
+    # -------------------------
+    # GST reports
+    # -------------------------
+    @app.get("/api/gst/summary")
+    def api_gst_summary():
+        """Live GST summary for ?period=YYYY-MM or a financial-year quarter (2024-25-Q1)."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        period = request.args.get("period") or datetime.now(resolve_timezone(DEFAULT_TIMEZONE)).strftime("%Y-%m")
+        try:
+            gst_report.period_months(period)
+        except ValueError as e:
+            return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
+        with get_conn() as conn:
+            report = gst_report.gst_summary(conn, user_id, period)
+        return jsonify({"ok": True, "report": report})
+
+    @app.get("/api/gst/reports")
+    def api_gst_reports():
+        """Reports stored by the nightly ``gst_report.py build``, newest period first."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        with get_conn() as conn:
+            rows = query_all(
+                conn, "SELECT period, generated_at FROM gst_reports WHERE user_id = ? ORDER BY period DESC", (user_id,)
+            )
+        return jsonify({"ok": True, "reports": [dict(r) for r in rows]})
+
+    @app.get("/api/gst/reports/<period>")
+    def api_gst_stored_report(period: str):
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        with get_conn() as conn:
+            report = gst_report.stored_report(conn, user_id, period)
+        if report is None:
+            return jsonify({"error": "not_found"}), 404
+        return jsonify({"ok": True, "report": report})
     
     @app.get("/api/schedule")
     def api_schedule():
@@ -865,7 +1420,9 @@ def create_app() -> Flask:
                     model_name = GEMINI_MODEL if 'GEMINI_MODEL' in globals() else "gemini-1.5-flash"
                     model = genai.GenerativeModel(model_name)
                     # Helper for response handling
-                    response = model.generate_content(prompt)
+                    with metrics.llm_call("gemini", model_name, "voice_entry") as call:
+                        response = model.generate_content(prompt)
+                        call.usage_from(response)
                     raw = response.text or ""
                     cleaned = _clean_json_text(raw)
                     extracted = json.loads(cleaned)
@@ -885,13 +1442,7 @@ def create_app() -> Flask:
             amount = extracted.get("amount", 0)
             if not amount or amount <= 0:
                 # Try to extract amount from transcript directly
-                import re
-                amount_match = re.search(r"([\d,]+\.?\d*)", transcript)
-                if amount_match:
-                    try:
-                        amount = float(amount_match.group(1).replace(",", ""))
-                    except ValueError:
-                        pass
+                amount = first_number(transcript) or 0
 
             if amount <= 0:
                 return jsonify({"error": "amount_not_found", "message": "Could not extract amount from transcript."}), 400
@@ -1092,7 +1643,28 @@ def create_app() -> Flask:
         if not allowed_file(file.filename):
             return jsonify({"error": "invalid_file_type", "message": "Only image files (PNG, JPG, PDF, etc.) are allowed."}), 400
 
+        bill_id = job_id = None
         try:
+            # Hash the upload once; previously processed content reuses the stored result
+            data = file.read()
+            digest = bill_cache.content_hash(data)
+            scope = bill_cache.dedup_scope()
+            force = (request.values.get("force") or "").lower() in ("1", "true", "yes")
+            cached = None
+            if not force and scope != "off":
+                with get_conn() as conn:
+                    cached = bill_cache.lookup(conn, digest, user_id, scope)
+                    if cached is not None and not cached["structured_json"]:
+                        cached = None
+                    bill_cache.record_lookup(conn, scope, cached is not None, (cached["processing_ms"] or 0) if cached else 0)
+
+            # Re-upload of the user's own bill: return it as-is, no duplicate bill or expense
+            if cached is not None and int(cached["user_id"]) == user_id:
+                with get_conn() as conn:
+                    payload = bill_status_payload(conn, int(cached["id"]), user_id)
+                payload.update({"cached": True, "duplicate_of": payload["id"]})
+                return jsonify({"ok": True, "bill": payload})
+
             # Secure the filename and create unique storage key
             original_filename = secure_filename(file.filename)
             unique_id = uuid.uuid4().hex
@@ -1101,127 +1673,64 @@ def create_app() -> Flask:
             public_url = f"/uploads/bills/{stored_filename}"
 
             # Save locally
-            file.save(local_path)
+            with metrics.stage("save"):
+                local_path.write_bytes(data)
 
-            # Insert bill record with status 'processing'
+            # Insert bill record with status 'processing' (and queue it in the same transaction)
+            job_id = None
+            run_async = BILLS_ASYNC and cached is None
             with get_conn() as conn:
+                conn.execute("BEGIN IMMEDIATE")
                 bill_id = exec_one(
                     conn,
-                    """INSERT INTO bills (user_id, filename, s3_key, s3_url, status)
-                       VALUES (?, ?, ?, ?, 'processing')""",
-                    (user_id, original_filename, str(local_path), public_url),
+                    """INSERT INTO bills (user_id, filename, s3_key, s3_url, content_hash, status)
+                       VALUES (?, ?, ?, ?, ?, 'processing')""",
+                    (user_id, original_filename, str(local_path), public_url, digest),
                 )
+                if run_async:
+                    job_id = enqueue(
+                        conn,
+                        KIND_PROCESS_BILL,
+                        {"bill_id": bill_id, "user_id": user_id, "path": str(local_path)},
+                        bill_id=bill_id,
+                    )
 
-                # Ensure image path (convert PDF first pages to image)
-                image_path = pdf_to_image(local_path) if local_path.suffix.lower() == ".pdf" else local_path
-
-                # If conversion failed (still PDF), return clear error about Poppler setup
-                if image_path.suffix.lower() == ".pdf":
-                    return jsonify({
-                        "error": "pdf_conversion_failed",
-                        "message": (
-                            "Could not convert PDF to image. Install Poppler and set POPPLER_PATH to its bin folder, "
-                            "then restart the server."
-                        )
-                    }), 500
-
-                # Run Tesseract OCR on local file
-                try:
-                    image = Image.open(image_path)
-                    ocr_text = pytesseract.image_to_string(image)
-                except pytesseract.TesseractNotFoundError:
-                    return jsonify({
-                        "error": "tesseract_missing",
-                        "message": (
-                            "Tesseract executable not found. Set TESSERACT_CMD to your tesseract.exe path "
-                            "or add it to PATH, then restart the server."
-                        )
-                    }), 500
-                except Exception as e:
-                    return jsonify({
-                        "error": "ocr_failed",
-                        "message": f"Failed to read image/PDF: {e}"
-                    }), 500
-
-            # Use Gemini Vision to structure data (optional)
-            structured = run_gemini_structured(image_path, ocr_text) or {}
-
-            # If LLM/gemini returned nothing useful, fall back to OCR regex extraction
-            if not structured or (structured.get("total_amount") in (None, 0) and not structured.get("items")):
-                structured = _fallback_extract_from_ocr(ocr_text)
-
-            # Minimal item spotting heuristic: if no items but we have a total, create a single inferred line item
-            if structured.get("items") in (None, [], ()):  # empty items
-                total_val = structured.get("total_amount") or structured.get("detected_amount")
-                if total_val:
-                    structured["items"] = [{
-                        "description": "Inferred item",
-                        "hsn_code": None,
-                        "quantity": 1,
-                        "rate": total_val,
-                        "amount": total_val
-                    }]
-            
-            vendor_name = structured.get("vendor_name")
-            vendor_gstin = structured.get("vendor_gstin")
-            bill_number = structured.get("bill_number")
-            bill_date = structured.get("bill_date")
-            total_amount = structured.get("total_amount")
-            subtotal = structured.get("subtotal")  # Taxable value
-            cgst_amount = structured.get("cgst_amount")
-            sgst_amount = structured.get("sgst_amount")
-            igst_amount = structured.get("igst_amount")
-            gst_amount = (cgst_amount or 0) + (sgst_amount or 0) + (igst_amount or 0)
-            items = structured.get("items")
-            confidence = structured.get("confidence")
-            items_json = json.dumps(items) if items is not None else None
-
-            # Extract amount from OCR text (basic regex for Indian currency patterns)
-            detected_amount = None
-            # Match patterns like ₹1,234.56 or Rs. 1234 or 1,234.00 or just numbers
-            amount_patterns = [
-                r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",  # ₹1,234 or Rs. 1234
-                r"Total[:\s]*([\d,]+\.?\d*)",          # Total: 1234
-                r"Amount[:\s]*([\d,]+\.?\d*)",         # Amount: 1234
-                r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",  # Grand Total: 1234
-                r"\b([\d,]+\.\d{2})\b",                # Generic decimal like 1234.00
-            ]
-            for pattern in amount_patterns:
-                match = re.search(pattern, ocr_text, re.IGNORECASE)
-                if match:
-                    amount_str = match.group(1).replace(",", "")
-                    try:
-                        detected_amount = float(amount_str)
-                        break
-                    except ValueError:
-                        continue
-
-            # Update bill record with OCR results
-            with get_conn() as conn:
-                conn.execute(
-                    """UPDATE bills SET ocr_text = ?, detected_amount = ?, vendor_name = ?, bill_date = ?,
-                           total_amount = ?, gst_amount = ?, items_json = ?, status = 'done'
-                       WHERE id = ?""",
-                    (ocr_text, detected_amount, vendor_name, bill_date, total_amount, gst_amount, items_json, bill_id),
+            # Same content already processed for another shop (global scope): copy its result
+            if cached is not None:
+                result = save_bill_result(
+                    pool, bill_id, user_id, cached["ocr_text"] or "", json.loads(cached["structured_json"])
                 )
+                return jsonify({
+                    "ok": True,
+                    "bill": {
+                        "id": bill_id,
+                        "filename": original_filename,
+                        "s3_url": public_url,
+                        **result,
+                        "cached": True,
+                    }
+                })
+
+            if run_async:
+                # The worker (backend/worker.py) picks it up; clients poll the status URL.
+                return jsonify({
+                    "ok": True,
+                    "bill": {
+                        "id": bill_id,
+                        "filename": original_filename,
+                        "s3_url": public_url,
+                        "status": "processing",
+                    },
+                    "job_id": job_id,
+                    "status_url": f"/api/bills/{bill_id}/status",
+                    "events_url": f"/api/bills/{bill_id}/events",
+                }), 202
 
-            # Auto-create ledger entry if we have a valid total amount
-            if total_amount and total_amount > 0:
-                with get_conn() as conn:
-                    note = f"Bill from {vendor_name or 'Unknown Vendor'}"
-                    exec_one(
-                        conn,
-                        """INSERT INTO entries (
-                            user_id, entry_type, amount, note, 
-                            vendor_name, vendor_gstin, bill_number, bill_date,
-                            taxable_amount, cgst_amount, sgst_amount, igst_amount
-                        ) VALUES (?, 'expense', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (
-                            user_id, total_amount, note,
-                            vendor_name, vendor_gstin, bill_number, bill_date,
-                            subtotal, cgst_amount, sgst_amount, igst_amount
-                        )
-                    )
+            try:
+                result = process_bill(pool, bill_id, user_id, local_path)
+            except BillProcessingError as e:
+                mark_bill_failed(pool, bill_id)
+                return jsonify({"error": e.code, "message": e.message}), 500
 
             return jsonify({
                 "ok": True,
@@ -1229,15 +1738,7 @@ def create_app() -> Flask:
                     "id": bill_id,
                     "filename": original_filename,
                     "s3_url": public_url,
-                    "ocr_text": ocr_text,
-                    "detected_amount": detected_amount,
-                    "vendor_name": vendor_name,
-                    "bill_date": bill_date,
-                    "total_amount": total_amount,
-                    "gst_amount": gst_amount,
-                    "items": items,
-                    "confidence": confidence,
-                    "status": "done",
+                    **result,
                 }
             })
         except Exception as e:
@@ -1245,25 +1746,252 @@ def create_app() -> Flask:
             import traceback
             print("[ledgerly] upload_failed:", e)
             traceback.print_exc()
+            if bill_id is not None and job_id is None:
+                mark_bill_failed(pool, bill_id)
             return jsonify({"error": "upload_failed", "message": str(e)}), 500
 
+    @app.post("/api/bills/batch")
+    def api_upload_bills_batch():
+        """
+        Upload several bills at once (multiple ``files`` fields and/or ZIP archives).
+
+        Bills are OCR'd in parallel (LEDGERLY_BATCH_CONCURRENCY at a time) and one
+        result per file is streamed as it finishes: NDJSON by default, or
+        Server-Sent Events with ``?format=sse``. All new bills and their expense
+        entries are written in a single transaction at the end, and a final
+        ``summary`` line maps each file index to its bill id. If the client goes
+        away, bills not yet started are saved as 'processing' and queued for the
+        background worker.
+        """
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        files = request.files.getlist("files") or request.files.getlist("file")
+        if not files:
+            return jsonify({"error": "no_file"}), 400
+
+        uploads, rejected = expand_batch_uploads(files)
+        if len(uploads) + len(rejected) > BATCH_MAX_FILES:
+            return jsonify({
+                "error": "too_many_files",
+                "message": f"A batch can contain at most {BATCH_MAX_FILES} files.",
+            }), 400
+        if not uploads and not rejected:
+            return jsonify({"error": "no_file"}), 400
+
+        sse = request.args.get("format") == "sse"
+        force = (request.values.get("force") or "").lower() in ("1", "true", "yes")
+        scope = bill_cache.dedup_scope()
+
+        def emit(kind: str, payload: dict) -> str:
+            if sse:
+                return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+            return json.dumps({"type": kind, **payload}) + "\n"
+
+        # Hash everything up front: own re-uploads and repeats within the batch
+        # return immediately, other users' identical bills (global scope) are copied.
+        immediate: list[str] = []
+        pending: list[dict] = []  # need the pipeline
+        copied: dict[int, tuple[str, dict, float]] = {}  # index -> result reused from the cache
+        seen: dict[str, int] = {}
+        items = [{"index": i, **item} for i, item in enumerate(uploads)]
+        for offset, item in enumerate(rejected, start=len(uploads)):
+            immediate.append(emit("result", {
+                "index": offset, "filename": item["filename"], "ok": False, "error": item["error"],
+            }))
+
+        with get_conn() as conn:
+            for item in items:
+                item["digest"] = digest = bill_cache.content_hash(item["data"])
+                if digest in seen:
+                    immediate.append(emit("result", {
+                        "index": item["index"], "filename": item["filename"], "ok": True,
+                        "duplicate_of_index": seen[digest],
+                    }))
+                    item["skip"] = True
+                    continue
+                seen[digest] = item["index"]
+                cached = None
+                if not force and scope != "off":
+                    cached = bill_cache.lookup(conn, digest, user_id, scope)
+                    if cached is not None and not cached["structured_json"]:
+                        cached = None
+                    bill_cache.record_lookup(conn, scope, cached is not None, (cached["processing_ms"] or 0) if cached else 0)
+                if cached is not None and int(cached["user_id"]) == user_id:
+                    payload = bill_status_payload(conn, int(cached["id"]), user_id)
+                    payload.update({"cached": True, "duplicate_of": payload["id"]})
+                    immediate.append(emit("result", {
+                        "index": item["index"], "filename": item["filename"], "ok": True, "bill": payload,
+                    }))
+                    item["skip"] = True
+                elif cached is not None:
+                    copied[item["index"]] = (cached["ocr_text"] or "", json.loads(cached["structured_json"]), 0.0)
+
+        # Store the new files; only these become bills
+        for item in items:
+            if item.get("skip"):
+                continue
+            original_filename = secure_filename(item["filename"]) or "bill"
+            stored_filename = f"{uuid.uuid4().hex}_{original_filename}"
+            item["filename"] = original_filename
+            item["path"] = BILLS_UPLOAD_DIR / stored_filename
+            item["url"] = f"/uploads/bills/{stored_filename}"
+            with metrics.stage("save"):
+                item["path"].write_bytes(item["data"])
+            item["data"] = None
+            if item["index"] in copied:
+                ocr_text, structured, _ = copied[item["index"]]
+                immediate.append(emit("result", {
+                    "index": item["index"], "filename": original_filename, "ok": True, "cached": True,
+                    "bill": {"filename": original_filename, "s3_url": item["url"],
+                             **bill_api_result(ocr_text, bill_result_fields(ocr_text, structured))},
+                }))
+            else:
+                pending.append(item)
+
+        stored = [item for item in items if not item.get("skip")]
+
+        def persist(results: dict) -> tuple[dict[int, int], int, int]:
+            """Insert every stored bill and its entry in one transaction; queue the unprocessed ones.
+
+            Returns ``(bill ids by index, entries created, bills queued)``.
+            """
+            bill_rows, entry_rows, queued = [], [], []
+            for item in stored:
+                result = results.get(item["index"])
+                if isinstance(result, tuple):
+                    ocr_text, structured, processing_ms = result
+                    fields = bill_result_fields(ocr_text, structured)
+                    bill_rows.append((
+                        user_id, item["filename"], str(item["path"]), item["url"], item["digest"], "done",
+                        ocr_text, fields["detected_amount"], fields["vendor_name"], fields["bill_date"],
+                        fields["total_amount"], fields["gst_amount"], fields["items_json"],
+                        fields["confidence"], json.dumps(structured), processing_ms,
+                    ))
+                    entry = bill_entry_params(user_id, fields)
+                    if entry is not None:
+                        entry_rows.append(entry)
+                else:
+                    # Failed (the file is kept), or never started because the client went away (queued)
+                    bill_rows.append((
+                        user_id, item["filename"], str(item["path"]), item["url"], item["digest"],
+                        "failed" if result is not None else "processing",
+                        None, None, None, None, None, None, None, None, None, None,
+                    ))
+                    if result is None:
+                        queued.append(item)
+            if not bill_rows:
+                return {}, 0, 0
+            with get_conn() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    """INSERT INTO bills (user_id, filename, s3_key, s3_url, content_hash, status,
+                                          ocr_text, detected_amount, vendor_name, bill_date, total_amount,
+                                          gst_amount, items_json, confidence, structured_json, processing_ms)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    bill_rows,
+                )
+                if entry_rows:
+                    conn.executemany(BILL_ENTRY_INSERT, entry_rows)
+                keys = [row[2] for row in bill_rows]
+                placeholders = ",".join("?" * len(keys))
+                ids = {
+                    r["s3_key"]: int(r["id"])
+                    for r in query_all(
+                        conn,
+                        f"SELECT id, s3_key FROM bills WHERE user_id = ? AND s3_key IN ({placeholders})",
+                        (user_id, *keys),
+                    )
+                }
+                for item in queued:
+                    bill_id = ids[str(item["path"])]
+                    enqueue(
+                        conn,
+                        KIND_PROCESS_BILL,
+                        {"bill_id": bill_id, "user_id": user_id, "path": str(item["path"])},
+                        bill_id=bill_id,
+                    )
+            return {item["index"]: ids[str(item["path"])] for item in stored}, len(entry_rows), len(queued)
+
+        def outcome(future, item: dict) -> tuple | BillProcessingError:
+            try:
+                return future.result()
+            except BillProcessingError as e:
+                return e
+            except Exception as e:
+                print(f"[ledgerly] batch item {item['filename']} failed: {e}")
+                return BillProcessingError("ocr_failed", str(e))
+
+        def stream():
+            started = time.perf_counter()
+            results: dict[int, tuple | BillProcessingError] = dict(copied)
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(BATCH_CONCURRENCY, len(pending))), thread_name_prefix="ledgerly-batch"
+            )
+            futures = {}
+            try:
+                yield from immediate
+                futures = {executor.submit(run_bill_pipeline, item["path"]): item for item in pending}
+                for future in as_completed(futures):
+                    item = futures[future]
+                    result = results[item["index"]] = outcome(future, item)
+                    if isinstance(result, BillProcessingError):
+                        yield emit("result", {
+                            "index": item["index"], "filename": item["filename"], "ok": False,
+                            "error": result.code, "message": result.message,
+                        })
+                        continue
+                    ocr_text, structured, _ = result
+                    yield emit("result", {
+                        "index": item["index"], "filename": item["filename"], "ok": True,
+                        "bill": {"filename": item["filename"], "s3_url": item["url"],
+                                 **bill_api_result(ocr_text, bill_result_fields(ocr_text, structured))},
+                    })
+            finally:
+                # Runs on client disconnect too, so no work is lost: bills already being
+                # processed are waited for and saved, the ones not started go to the worker queue
+                executor.shutdown(wait=True, cancel_futures=True)
+                for future, item in futures.items():
+                    if item["index"] not in results and not future.cancelled():
+                        results[item["index"]] = outcome(future, item)
+                bill_ids, entries_created, queued = persist(results)
+
+            succeeded = sum(1 for r in results.values() if isinstance(r, tuple))
+            yield emit("summary", {
+                "ok": True,
+                "files": len(uploads) + len(rejected),
+                "processed": succeeded,
+                "queued": queued,
+                "failed": len(rejected) + len(stored) - succeeded - queued,
+                "bill_ids": {str(index): bill_id for index, bill_id in bill_ids.items()},
+                "entries_created": entries_created,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+        return Response(
+            stream(),
+            mimetype="text/event-stream" if sse else "application/x-ndjson",
+            headers={"X-Accel-Buffering": "no"},
+        )
+
     @app.get("/api/bills")
     def api_list_bills():
-        """List all bills for the current user."""
+        """List the current user's bills, newest first (paginated)."""
         user_id = require_login()
         if not user_id:
             return jsonify({"error": "unauthorized"}), 401
 
+        try:
+            before_id, limit = parse_page_args(request.args)
+            fields = parse_fields(request.args.get("fields"), BILL_FIELDS, BILL_DEFAULT_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
         with get_conn() as conn:
-            rows = query_all(
-                conn,
-                """SELECT id, filename, s3_url, ocr_text, detected_amount, vendor_name, bill_date,
-                          total_amount, gst_amount, items_json, status, created_at
-                   FROM bills WHERE user_id = ? ORDER BY id DESC""",
-                (user_id,),
-            )
+            bills, next_before_id = keyset_page(conn, "bills", fields, user_id, before_id, limit)
 
-        return jsonify({"ok": True, "bills": [dict(r) for r in rows]})
+        return jsonify({"ok": True, "bills": bills, "next_before_id": next_before_id})
 
     @app.get("/api/bills/<int:bill_id>")
     def api_get_bill(bill_id: int):
@@ -1286,6 +2014,111 @@ def create_app() -> Flask:
 
         return jsonify({"ok": True, "bill": dict(row)})
 
+    def job_status(job) -> str | None:
+        # None: no job was queued; "dead": its last lease ran out with no attempts left,
+        # so nothing will pick it up again (the reaper marks it failed later)
+        if job is None:
+            return None
+        if (job["status"] == "running" and job["locked_until"] is not None
+                and job["locked_until"] < time.time() and job["attempts"] >= job["max_attempts"]):
+            return "dead"
+        return job["status"]
+
+    def bill_status_payload(conn, bill_id: int, user_id: int) -> dict | None:
+        row = query_one(
+            conn,
+            """SELECT id, filename, s3_url, status, ocr_text, detected_amount, vendor_name, bill_date,
+                      total_amount, gst_amount, items_json, confidence,
+                      json_extract(structured_json, '$.page_count') AS page_count,
+                      json_extract(structured_json, '$.truncated') AS truncated
+               FROM bills WHERE id = ? AND user_id = ?""",
+            (bill_id, user_id),
+        )
+        if row is None:
+            return None
+        job = latest_for_bill(conn, bill_id)
+        payload = {
+            "id": int(row["id"]),
+            "filename": row["filename"],
+            "s3_url": row["s3_url"],
+            "status": row["status"],
+            "stage": job["progress"] if job else None,
+            "attempts": job["attempts"] if job else 0,
+            "error": job["last_error"] if job else None,
+            "job_status": job_status(job),
+        }
+        if row["status"] == "done":
+            payload.update({
+                "ocr_text": row["ocr_text"],
+                "detected_amount": row["detected_amount"],
+                "vendor_name": row["vendor_name"],
+                "bill_date": row["bill_date"],
+                "total_amount": row["total_amount"],
+                "gst_amount": row["gst_amount"],
+                "items": json.loads(row["items_json"]) if row["items_json"] else None,
+                "confidence": row["confidence"],
+                "page_count": row["page_count"],
+                "truncated": bool(row["truncated"]),
+            })
+        return payload
+
+    @app.get("/api/bills/cache/stats")
+    def api_bill_cache_stats():
+        """Dedup cache hit rate and pipeline time saved (all workers, all users)."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        with get_conn() as conn:
+            stats = bill_cache.stats(conn)
+
+        return jsonify({"ok": True, "cache": stats})
+
+    @app.get("/api/bills/<int:bill_id>/status")
+    def api_bill_status(bill_id: int):
+        """Poll the processing state of an uploaded bill."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        with get_conn() as conn:
+            payload = bill_status_payload(conn, bill_id, user_id)
+
+        if payload is None:
+            return jsonify({"error": "not_found"}), 404
+
+        return jsonify({"ok": True, "bill": payload})
+
+    @app.get("/api/bills/<int:bill_id>/events")
+    def api_bill_events(bill_id: int):
+        """Stream processing progress for a bill as Server-Sent Events until it finishes."""
+        user_id = require_login()
+        if not user_id:
+            return jsonify({"error": "unauthorized"}), 401
+
+        with get_conn() as conn:
+            if bill_status_payload(conn, bill_id, user_id) is None:
+                return jsonify({"error": "not_found"}), 404
+
+        def stream():
+            last = None
+            deadline = time.monotonic() + BILL_EVENTS_MAX_SECONDS
+            while time.monotonic() < deadline:
+                with get_conn() as conn:
+                    payload = bill_status_payload(conn, bill_id, user_id)
+                if payload is None:
+                    return
+                marker = (payload["status"], payload["stage"], payload["attempts"])
+                if marker != last:
+                    last = marker
+                    yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+                if payload["status"] in ("done", "failed"):
+                    return
+                time.sleep(1.0)
+            yield "event: timeout\ndata: {}\n\n"
+
+        return Response(stream(), mimetype="text/event-stream", headers={"X-Accel-Buffering": "no"})
+
     return app
 
 
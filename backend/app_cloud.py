@@ -5,6 +5,7 @@ Simplified for Render/Vercel deployment (no OCR/CV dependencies)
 from __future__ import annotations
 
 import json
+import mimetypes
 import os
 import re
 import uuid
@@ -16,9 +17,11 @@ load_dotenv(Path(__file__).parent / ".env")
 
 from flask import Flask, jsonify, request, session, send_from_directory
 from flask_cors import CORS
-from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
 
-from db import connect, default_db_path, init_db, query_one, query_all, exec_one
+import metrics
+from compression import StaticCompressor, compress_response, precompressed_response
+from db import default_db_path, get_pool, init_db, query_one, query_all, exec_one
 
 # Optional: Gemini API (won't crash if not available)
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
@@ -47,9 +50,27 @@ def create_app(db_path: str | None = None):
     # Database setup
     _db_path = db_path or os.environ.get("LEDGERLY_DB", default_db_path())
     init_db(_db_path)
+    pool = get_pool(_db_path)
+    metrics.install_flask(app, "app_cloud")
 
     def get_conn():
-        return connect(_db_path)
+        return pool.connection()
+
+    compressor = StaticCompressor()
+    compressor.precompress_in_background([FRONTEND_DIR, STYLES_DIR, SCRIPTS_DIR])
+
+    @app.after_request
+    def compress_json(response):
+        return compress_response(response, request.headers.get("Accept-Encoding"))
+
+    def send_static(directory: Path, filename: str):
+        # gzip/brotli variant when the browser accepts one
+        path = safe_join(str(directory), filename)
+        response = None
+        if path:
+            response = precompressed_response(compressor, request.headers.get("Accept-Encoding"),
+                                              mimetypes.guess_type(filename)[0], path=Path(path))
+        return response or send_from_directory(directory, filename)
 
     # ============ AUTH HELPERS ============
     def require_login():
@@ -59,19 +80,19 @@ def create_app(db_path: str | None = None):
     # ============ SERVE FRONTEND ============
     @app.route("/")
     def home():
-        return send_from_directory(FRONTEND_DIR, "index.html")
+        return send_static(FRONTEND_DIR, "index.html")
 
     @app.route("/<path:filename>.html")
     def serve_page(filename):
-        return send_from_directory(FRONTEND_DIR, f"{filename}.html")
+        return send_static(FRONTEND_DIR, f"{filename}.html")
 
     @app.route("/styles/<path:filename>")
     def serve_styles(filename):
-        return send_from_directory(STYLES_DIR, filename)
+        return send_static(STYLES_DIR, filename)
 
     @app.route("/script/<path:filename>")
     def serve_scripts(filename):
-        return send_from_directory(SCRIPTS_DIR, filename)
+        return send_static(SCRIPTS_DIR, filename)
 
     @app.route("/api/health")
     def health():
@@ -261,8 +282,10 @@ User question: {question}
 Provide a helpful, concise response. If asked about finances, use the transaction data above."""
 
             model = genai.GenerativeModel("gemini-1.5-flash")
-            response = model.generate_content(prompt)
-            
+            with metrics.llm_call("gemini", "gemini-1.5-flash", "chat") as call:
+                response = model.generate_content(prompt)
+                call.usage_from(response)
+
             return jsonify({"ok": True, "answer": response.text})
 
         except Exception as e:
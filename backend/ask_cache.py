@@ -0,0 +1,279 @@
+"""Cache of OpenAI question -> ``{sql, chart, title}`` translations for /ask.
+
+Questions are keyed by ``intent_parser.cache_key`` (case, punctuation,
+transliteration variants and particles folded); a question whose key is
+empty is never cached. Only answers whose SQL passed validation are stored.
+
+Two tiers:
+- an in-process LRU for the hot questions,
+- a SQLite table (``LEDGERLY_ASK_CACHE_DB``) shared by every worker process and
+  kept across restarts, bounded to ``LEDGERLY_ASK_CACHE_SIZE`` rows by least
+  recent use.
+
+Entries expire ``LEDGERLY_ASK_CACHE_TTL`` seconds after they were fetched.
+Concurrent misses for the same key in one process wait for a single upstream
+call instead of each calling OpenAI (single flight), in both the threaded
+and the async request paths.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from intent_parser import cache_key
+
+DEFAULT_TTL_S = 7 * 86400
+DEFAULT_MAX_ENTRIES = 2000
+# A memory hit refreshes the shared row's last_used at most this often
+TOUCH_INTERVAL_S = 60.0
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: dict | None = None
+        self.error: BaseException | None = None
+
+
+class AskCache:
+    def __init__(self, db_path: Path, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S,
+                 memory_entries: int = 256) -> None:
+        self.db_path = Path(db_path)
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self.memory_entries = max(1, memory_entries)
+        self._memory: OrderedDict[str, list] = OrderedDict()  # key -> [value, fetched_at, touched_at]
+        self._lock = threading.Lock()
+        self._inflight: dict[str, _Flight] = {}
+        self._inflight_async: dict[str, asyncio.Future] = {}  # used from the event loop thread only
+        self._local = threading.local()
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0}
+        with self._conn() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS ask_cache (
+                       key TEXT PRIMARY KEY,
+                       value TEXT NOT NULL,
+                       fetched_at REAL NOT NULL,
+                       last_used REAL NOT NULL,
+                       hits INTEGER NOT NULL DEFAULT 0
+                   )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ask_cache_last_used ON ask_cache(last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        touch = False
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, fetched_at, touched_at = entry
+                if now - fetched_at < self.ttl_s:
+                    self._memory.move_to_end(key)
+                    touch = now - touched_at >= TOUCH_INTERVAL_S
+                    if touch:
+                        entry[2] = now
+                else:
+                    del self._memory[key]
+                    entry = None
+        if entry is not None:
+            if touch:
+                try:
+                    self._conn().execute("UPDATE ask_cache SET last_used = ? WHERE key = ?", (now, key))
+                except sqlite3.OperationalError:
+                    pass  # only eviction order, retried on a later hit
+            return value
+
+        try:
+            # fetchall: the implicit write transaction only ends once the statement is done
+            rows = self._conn().execute(
+                "UPDATE ask_cache SET last_used = ?, hits = hits + 1 WHERE key = ? AND fetched_at > ? "
+                "RETURNING value, fetched_at",
+                (now, key, now - self.ttl_s),
+            ).fetchall()
+        except sqlite3.OperationalError as exc:
+            print(f"[ledgerly] ask cache read failed: {exc}")
+            return None
+        if not rows:
+            return None
+        value = json.loads(rows[0][0])
+        self._remember(key, value, rows[0][1], now)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        now = time.time()
+        self._remember(key, value, now, now)
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """INSERT INTO ask_cache (key, value, fetched_at, last_used) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                           fetched_at = excluded.fetched_at, last_used = excluded.last_used""",
+                    (key, json.dumps(value), now, now),
+                )
+                conn.execute("DELETE FROM ask_cache WHERE fetched_at <= ?", (now - self.ttl_s,))
+                conn.execute(
+                    """DELETE FROM ask_cache WHERE key IN (
+                           SELECT key FROM ask_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                    (self.max_entries,),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as exc:
+            # The in-process copy still serves this worker
+            print(f"[ledgerly] ask cache write failed: {exc}")
+
+    def _remember(self, key: str, value: dict, fetched_at: float, now: float) -> None:
+        with self._lock:
+            self._memory[key] = [value, fetched_at, now]
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_or_compute(self, question: str, compute: Callable[[str], dict]) -> tuple[dict, str]:
+        """Cached answer for ``question`` or ``compute(question)``; returns ``(answer, source)``.
+
+        ``source`` is ``"cache"`` for a hit (including waiting on another
+        request's call) and ``"openai"`` when this call ran ``compute``.
+        ``compute`` must raise for answers that should not be cached.
+        """
+        key = cache_key(question)
+        if not key:
+            self._count("misses")
+            return compute(question), "openai"
+        value = self.get(key)
+        if value is not None:
+            self._count("hits")
+            return value, "cache"
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            self._count("coalesced")
+            return flight.value, "cache"
+
+        try:
+            # Another flight may have finished between our miss and taking the lead
+            value = self.get(key)
+            if value is not None:
+                self._count("hits")
+                flight.value = value
+                return value, "cache"
+            self._count("misses")
+            value = compute(question)
+            self.put(key, value)
+            flight.value = value
+            return value, "openai"
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    async def get_or_compute_async(self, question: str,
+                                   compute: Callable[[str], Awaitable[dict]]) -> tuple[dict, str]:
+        """get_or_compute for the async /ask path; ``compute`` is a coroutine function.
+
+        SQLite lookups and writes run in a worker thread so they never stall
+        the event loop; concurrent misses await the leader's future.
+        """
+        key = cache_key(question)
+        if not key:
+            self._count("misses")
+            return await compute(question), "openai"
+        value = await asyncio.to_thread(self.get, key)
+        if value is not None:
+            self._count("hits")
+            return value, "cache"
+
+        flight = self._inflight_async.get(key)
+        if flight is not None:
+            value = await asyncio.shield(flight)
+            self._count("coalesced")
+            return value, "cache"
+
+        flight = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        try:
+            self._count("misses")
+            value = await compute(question)
+            await asyncio.to_thread(self.put, key, value)
+            flight.set_result(value)
+            return value, "openai"
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            flight.exception()  # retrieved here, so an unawaited failure isn't logged again
+            raise
+        finally:
+            del self._inflight_async[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            memory = len(self._memory)
+        try:
+            row = self._conn().execute("SELECT COUNT(*) FROM ask_cache WHERE fetched_at > ?",
+                                       (time.time() - self.ttl_s,)).fetchone()
+            entries = row[0]
+        except sqlite3.OperationalError:
+            entries = None
+        served = counters["hits"] + counters["coalesced"]
+        lookups = served + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+        }
+
+
+_cache: AskCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> AskCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AskCache(
+                Path(os.environ.get("LEDGERLY_ASK_CACHE_DB", str(Path(__file__).resolve().parent / "ask_cache.db"))),
+                max_entries=int(os.environ.get("LEDGERLY_ASK_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES))),
+                ttl_s=float(os.environ.get("LEDGERLY_ASK_CACHE_TTL", str(DEFAULT_TTL_S))),
+            )
+        return _cache
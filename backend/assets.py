@@ -0,0 +1,139 @@
+"""Content-hashed URLs for the frontend's CSS, JS and images.
+
+Pages are served with every local ``href``/``src`` pointing at
+``styles/``, ``script/`` or ``uploads/`` rewritten to a fingerprinted name,
+e.g. ``/styles/dashboard.css`` -> ``/styles/dashboard.3f9a1c2b4d.css``. The
+fingerprint is the start of the file's SHA-256, so the URL changes whenever
+the content does and the asset can be cached as ``immutable`` for a year;
+the HTML itself stays ``no-cache`` and picks up new fingerprints at once.
+
+Rewritten pages are built at startup and rebuilt when a page or one of its
+assets changes on disk (checked by mtime/size), so editing a file during
+development needs no restart. Plain, unhashed URLs keep working and are
+served uncached. Set LEDGERLY_ASSET_FINGERPRINT=0 to serve pages untouched.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+HASH_LENGTH = 10
+
+_REF_RE = re.compile(
+    r"""(?P<attr>\b(?:href|src))=(?P<quote>["'])(?P<prefix>/|\.\./)(?P<dir>styles|script|uploads)/"""
+    r"""(?P<name>[^"'?#]+)(?P=quote)"""
+)
+_HASHED_RE = re.compile(rf"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[A-Za-z0-9]+)$")
+
+
+def fingerprint_enabled() -> bool:
+    return os.environ.get("LEDGERLY_ASSET_FINGERPRINT", "1").strip() != "0"
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class AssetPipeline:
+    def __init__(self, pages_dir: Path, asset_dirs: dict[str, Path]) -> None:
+        self.pages_dir = pages_dir
+        self.asset_dirs = asset_dirs
+        self._lock = threading.Lock()
+        self._digests: dict[Path, tuple[tuple[int, int], str]] = {}
+        # page name -> (page stat, {asset path: stat}, rewritten html)
+        self._pages: dict[str, tuple[tuple[int, int], dict[Path, tuple[int, int] | None], bytes]] = {}
+
+    def _digest(self, path: Path) -> str | None:
+        key = _stat_key(path)
+        if key is None:
+            return None
+        cached = self._digests.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:HASH_LENGTH]
+        self._digests[path] = (key, digest)
+        return digest
+
+    def _asset_path(self, directory: str, name: str) -> Path | None:
+        base = self.asset_dirs.get(directory)
+        if base is None or ".." in Path(name).parts:
+            return None
+        path = base / name
+        # uploads/ also holds user bills: only top-level files (logos) are static assets
+        if directory == "uploads" and "/" in name:
+            return None
+        return path if path.is_file() else None
+
+    def hashed_url(self, directory: str, name: str) -> str | None:
+        """``/dir/name.<hash>.ext`` for an existing asset."""
+        path = self._asset_path(directory, name)
+        digest = self._digest(path) if path is not None else None
+        if digest is None:
+            return None
+        stem, dot, ext = name.rpartition(".")
+        if not dot or not stem:
+            return None
+        return f"/{directory}/{stem}.{digest}.{ext}"
+
+    def _build(self, html: str) -> tuple[str, dict[Path, tuple[int, int] | None]]:
+        deps: dict[Path, tuple[int, int] | None] = {}
+
+        def rewrite(m: re.Match) -> str:
+            directory, name = m.group("dir"), m.group("name")
+            url = self.hashed_url(directory, name)
+            if url is None:
+                return m.group(0)
+            path = self._asset_path(directory, name)
+            deps[path] = _stat_key(path)
+            return f"{m.group('attr')}={m.group('quote')}{url}{m.group('quote')}"
+
+        return _REF_RE.sub(rewrite, html), deps
+
+    def page(self, name: str) -> bytes | None:
+        """Rewritten HTML for ``pages/<name>``, or None to serve the file as is."""
+        if not fingerprint_enabled():
+            return None
+        path = self.pages_dir / name
+        if ".." in Path(name).parts or not name.endswith(".html"):
+            return None
+        key = _stat_key(path)
+        if key is None:
+            return None
+        with self._lock:
+            cached = self._pages.get(name)
+            if cached is not None and cached[0] == key and all(
+                _stat_key(dep) == stat for dep, stat in cached[1].items()
+            ):
+                return cached[2]
+            html, deps = self._build(path.read_text(encoding="utf-8"))
+            body = html.encode("utf-8")
+            self._pages[name] = (key, deps, body)
+            return body
+
+    def resolve(self, directory: str, name: str) -> Path | None:
+        """File behind a fingerprinted ``name``; None if unhashed or the hash is stale."""
+        m = _HASHED_RE.match(name)
+        if m is None:
+            return None
+        path = self._asset_path(directory, m.group("stem") + m.group("ext"))
+        if path is None:
+            return None
+        with self._lock:
+            current = self._digest(path)
+        # A stale hash must not be served the new content under an immutable header
+        return path if current == m.group("digest") else None
+
+    def warm(self) -> int:
+        """Build every page up front; returns the number of pages."""
+        names = [p.name for p in self.pages_dir.glob("*.html")]
+        for name in names:
+            self.page(name)
+        return len(names)
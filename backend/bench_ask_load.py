@@ -0,0 +1,147 @@
+"""
+Load test: concurrent /ask throughput, threadpool vs async OpenAI path.
+
+Starts a stand-in OpenAI chat-completions endpoint with a fixed latency, then
+runs main.py under uvicorn twice (LEDGERLY_ASK_ASYNC=0, the blocking client
+on uvicorn's threadpool, and =1, the async client) and fires concurrent
+/ask requests at each. Every question is unique and outside the local
+intent parser, so each one really goes "upstream".
+
+Needs fastapi, uvicorn, sqlalchemy, aiosqlite and openai installed.
+
+    python bench_ask_load.py --requests 400 --concurrency 200 --openai-ms 800
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def start_fake_openai(latency_ms: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            content = json.dumps({"sql": "SELECT payment_mode, SUM(amount) FROM transactions GROUP BY payment_mode",
+                                  "chart": "bar", "title": "Sales by Payment Mode"})
+            body = json.dumps({
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_api(port: int, async_mode: bool, openai_port: int, workdir: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "LEDGERLY_ASK_ASYNC": "1" if async_mode else "0",
+        "LEDGERLY_ASK_CACHE_DB": str(workdir / f"ask_cache_{int(async_mode)}.db"),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--backlog", "2048"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"uvicorn did not start:\n{proc.stderr.read().decode(errors='replace')}")
+
+
+def ask(port: int, question: str) -> tuple[float, int]:
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.request("POST", "/ask", body=json.dumps({"question": question}),
+                 headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    return (time.perf_counter() - started) * 1000, resp.status
+
+
+def run_load(port: int, requests: int, concurrency: int, tag: str) -> dict:
+    # Unique, non-template questions: every one misses intent_parser and ask_cache
+    questions = [f"cash vs upi comparison {tag} {i}" for i in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda q: ask(port, q), questions))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(ms for ms, _ in results)
+    errors = sum(1 for _, status in results if status != 200)
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--openai-ms", type=float, default=800, help="simulated OpenAI response time")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    fake = start_fake_openai(args.openai_ms)
+    workdir = Path(tempfile.mkdtemp(prefix="ledgerly-bench-"))
+    print(f"{args.requests} unique /ask requests, {args.concurrency} concurrent, "
+          f"OpenAI latency {args.openai_ms:.0f} ms\n")
+    print(f"{'mode':<22} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    rows = {}
+    for async_mode in (False, True):
+        proc = start_api(args.port, async_mode, fake.server_address[1], workdir)
+        try:
+            run_load(args.port, min(20, args.requests), min(20, args.concurrency), "warmup")
+            rows[async_mode] = r = run_load(args.port, args.requests, args.concurrency, "run")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+        label = "async client" if async_mode else "threadpool (sync)"
+        print(f"{label:<22} {r['rps']:>8.1f} {r['p50']:>9.0f} {r['p95']:>9.0f} {r['errors']:>7}")
+    fake.shutdown()
+    print(f"\nthroughput: {rows[True]['rps'] / rows[False]['rps']:.1f}x with the async path")
+
+
+if __name__ == "__main__":
+    main()
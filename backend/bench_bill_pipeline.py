@@ -0,0 +1,478 @@
+"""
+Benchmark: the bill upload pipeline end to end, per stage.
+
+Generates a corpus of synthetic GST bills (PNG/JPEG photos and scanned PDFs
+rendered at several resolutions and skew angles, plus digital text PDFs, with
+1..n pages), uploads each one through /api/bills/upload on Flask's test
+client with inline processing, and reports:
+
+- upload latency p50/p95 and throughput, overall and per corpus case,
+- per pipeline stage (save, qr, pdf_text, pdf_to_image, tesseract,
+  preprocess, gemini_extract, gemini_verify, validate, db_write): p50/p95,
+  throughput and peak Python heap growth (tracemalloc),
+- peak RSS of the web process and of the OCR process pool.
+
+Gemini is replaced by a deterministic local fake (fixed latency, answers
+built from the OCR text), so runs are offline and repeatable; OCR, PDF
+rasterisation, preprocessing and SQLite are real. Needs Pillow, OpenCV,
+Tesseract and Poppler like the app itself.
+
+Results are written as JSON; compare two runs (e.g. two commits) with
+--compare:
+
+    python bench_bill_pipeline.py --out before.json
+    git checkout my-branch
+    python bench_bill_pipeline.py --out after.json --compare before.json
+    python bench_bill_pipeline.py --compare before.json after.json   # no run
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND_DIR = Path(__file__).resolve().parent
+RESULT_VERSION = 1
+STAGES = ("save", "qr", "pdf_text", "pdf_to_image", "tesseract", "preprocess",
+          "gemini_extract", "gemini_verify", "validate", "db_write")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+def bill_pages(rng: random.Random, pages: int, lines_per_page: int) -> list[list[str]]:
+    """Lines of one synthetic bill split into ``pages`` pages (padded with more items)."""
+    from bench_extraction import synthetic_bill
+
+    lines = synthetic_bill(rng).split("\n")
+    header, body, footer = lines[:4], lines[4:-5], lines[-5:]
+    while len(header) + len(body) + len(footer) < lines_per_page * (pages - 1) + 10:
+        body.append(rng.choice(body))
+    lines = header + body + footer
+    return [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)][:pages]
+
+
+def _font(px: int):
+    from PIL import ImageFont
+
+    for name in ("DejaVuSansMono.ttf", "DejaVuSans.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(name, px)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=px)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def render_page(lines: list[str], dpi: int, skew: float, rng: random.Random):
+    """An A4 'scan' of ``lines``: 9 pt text at ``dpi``, rotated by ``skew`` degrees, light noise."""
+    from PIL import Image, ImageDraw
+
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    px = max(8, round(dpi * 9 / 72))
+    font = _font(px)
+    x, y = int(0.6 * dpi), int(0.6 * dpi)
+    for line in lines:
+        draw.text((x, y), line, fill=0, font=font)
+        y += int(px * 1.45)
+    for _ in range(width * height // 4000):  # specks, like a cheap scanner
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=rng.randint(120, 200))
+    if skew:
+        image = image.rotate(skew, resample=Image.BICUBIC, expand=False, fillcolor=255)
+    return image
+
+
+def make_document(kind: str, dpi: int, skew: float, pages: int, rng: random.Random) -> tuple[str, bytes]:
+    """``(filename, bytes)`` for one synthetic bill of the given kind."""
+    if kind == "text_pdf":
+        from bench_pdf_text import LINES_PER_PAGE, text_pdf
+
+        return "bill.pdf", text_pdf(bill_pages(rng, pages, LINES_PER_PAGE))
+    images = [render_page(lines, dpi, skew, rng) for lines in bill_pages(rng, pages, 60)]
+    out = io.BytesIO()
+    if kind == "png":
+        images[0].save(out, "PNG", dpi=(dpi, dpi))
+        return "bill.png", out.getvalue()
+    if kind == "jpeg":
+        images[0].convert("RGB").save(out, "JPEG", quality=85, dpi=(dpi, dpi))
+        return "bill.jpg", out.getvalue()
+    if kind == "scanned_pdf":
+        # Image-only PDF: no text layer, so it is rasterised and OCR'd
+        images[0].save(out, "PDF", resolution=float(dpi), save_all=True, append_images=images[1:])
+        return "bill.pdf", out.getvalue()
+    raise ValueError(f"unknown document kind: {kind}")
+
+
+def corpus_cases(kinds: list[str], dpis: list[int], skews: list[float], pages: list[int]) -> list[dict]:
+    cases = []
+    for kind in kinds:
+        for page_count in (pages if kind.endswith("pdf") else [1]):
+            # Digital PDFs have no resolution or skew
+            for dpi in (dpis if kind != "text_pdf" else [0]):
+                for skew in (skews if kind != "text_pdf" else [0.0]):
+                    name = kind if kind == "text_pdf" else f"{kind}/{dpi}dpi/skew{skew:g}"
+                    cases.append({"name": f"{name}/{page_count}p", "kind": kind, "dpi": dpi,
+                                  "skew": skew, "pages": page_count})
+    return cases
+
+
+# ---------------------------------------------------------------------------
+# Deterministic Gemini stand-in
+# ---------------------------------------------------------------------------
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int, completion_tokens: int) -> None:
+        self.text = text
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": prompt_tokens, "candidates_token_count": completion_tokens,
+        })()
+
+
+class FakeGemini:
+    """Drop-in for ``google.generativeai``: answers from the OCR text, after a fixed delay."""
+
+    def __init__(self, latency_ms: float) -> None:
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def GenerativeModel(self, model_name: str):  # noqa: N802 - mirrors the genai API
+        return FakeModel(self)
+
+
+class FakeModel:
+    def __init__(self, owner: FakeGemini) -> None:
+        self.owner = owner
+        self.last: str | None = None
+
+    def generate_content(self, parts) -> FakeResponse:
+        from extraction import extract
+
+        self.owner.calls += 1
+        prompt = parts[0] if isinstance(parts, list) else parts
+        time.sleep(self.owner.latency_ms / 1000)
+        if self.last is not None and "auditor" in prompt:
+            text = self.last  # the verification pass confirms the first answer
+        else:
+            ocr_text = prompt.split("<<<", 1)[-1].rsplit(">>>", 1)[0]
+            fields = extract(ocr_text)
+            lines = [line.strip() for line in ocr_text.splitlines() if line.strip()]
+            total = fields.best_amount()
+            text = self.last = json.dumps({
+                "vendor_name": lines[0] if lines else None,
+                "vendor_gstin": None, "bill_number": None, "bill_date": None,
+                "items": [], "subtotal": None, "cgst_amount": None, "sgst_amount": None,
+                "igst_amount": None, "total_amount": total, "confidence": 0.9,
+            })
+        return FakeResponse(text, len(prompt) // 4, len(text) // 4)
+
+
+# ---------------------------------------------------------------------------
+# Stage recording (hooks the pipeline's metrics.stage / metrics.timed_iter)
+# ---------------------------------------------------------------------------
+class StageRecorder:
+    def __init__(self, track_memory: bool) -> None:
+        self.track_memory = track_memory
+        self.reset()
+
+    def reset(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+        self.peaks: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+
+    def _record(self, name: str, seconds: float, peak: int, ok: bool) -> None:
+        self.samples.setdefault(name, []).append(seconds * 1000)
+        self.peaks[name] = max(self.peaks.get(name, 0), peak)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def _begin(self) -> tuple[float, int]:
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            return time.perf_counter(), tracemalloc.get_traced_memory()[0]
+        return time.perf_counter(), 0
+
+    def _end(self, name: str, started: tuple[float, int], ok: bool) -> None:
+        seconds = time.perf_counter() - started[0]
+        peak = tracemalloc.get_traced_memory()[1] - started[1] if self.track_memory else 0
+        self._record(name, seconds, peak, ok)
+
+    @contextmanager
+    def stage(self, name: str):
+        started, ok = self._begin(), False
+        try:
+            yield
+            ok = True
+        finally:
+            self._end(name, started, ok)
+
+    def timed_iter(self, iterable, name: str):
+        iterator = iter(iterable)
+        while True:
+            started = self._begin()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except BaseException:
+                self._end(name, started, False)
+                raise
+            self._end(name, started, True)
+            yield item
+
+
+def _vm_hwm_kb(pid: int) -> int | None:
+    """Peak RSS of a live process (Linux /proc), in KiB."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def ocr_pool_peak_kb(engine) -> int | None:
+    executor = getattr(engine, "_executor", None)
+    processes = getattr(executor, "_processes", None) or {}
+    peaks = [kb for kb in (_vm_hwm_kb(pid) for pid in processes) if kb is not None]
+    return max(peaks) if peaks else None
+
+
+def git_revision() -> dict:
+    def git(*args: str) -> str | None:
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+# ---------------------------------------------------------------------------
+# Run, summarise, compare
+# ---------------------------------------------------------------------------
+def summarise(latencies: list[float]) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="ledgerly-bench-"))
+    # Point the app at a throwaway DB before it is imported
+    os.environ["LEDGERLY_DB_PATH"] = str(workdir / "bench.db")
+    os.environ["LEDGERLY_BILLS_ASYNC"] = "0"
+    os.environ["LEDGERLY_BILL_DEDUP_SCOPE"] = "off"
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import app as ledgerly
+    import metrics
+    from ocr_engine import get_engine
+
+    recorder = StageRecorder(track_memory=not args.no_memory)
+    if recorder.track_memory:
+        tracemalloc.start()
+    metrics.stage = recorder.stage
+    metrics.timed_iter = recorder.timed_iter
+    gemini = FakeGemini(args.gemini_ms)
+    ledgerly.genai = gemini
+    ledgerly.GEMINI_API_KEY = "bench-fake"
+    ledgerly.BILLS_ASYNC = False
+    ledgerly.BILLS_UPLOAD_DIR = workdir / "bills"  # keep the repo's uploads/ clean
+
+    flask_app = ledgerly.create_app()
+    client = flask_app.test_client()
+    login = client.post("/api/login", json={"identifier": "demo@ledgerly.in", "password": "Ledgerly@123"})
+    assert login.status_code == 200, login.get_data(as_text=True)
+
+    rng = random.Random(args.seed)
+    cases = corpus_cases(args.kinds, args.dpis, args.skews, args.pages)
+    documents = [(case, *make_document(case["kind"], case["dpi"], case["skew"], case["pages"], rng))
+                 for case in cases for _ in range(args.bills_per_case)]
+    rng.shuffle(documents)
+    engine = get_engine()
+    print(f"{len(documents)} bills in {len(cases)} cases, OCR workers={engine.workers}, "
+          f"pdf dpi={engine.pdf_dpi}, fake Gemini {args.gemini_ms:.0f} ms/call\n")
+
+    def upload(filename: str, data: bytes) -> tuple[float, int, str | None]:
+        started = time.perf_counter()
+        resp = client.post("/api/bills/upload", data={"file": (io.BytesIO(data), filename), "force": "1"},
+                           content_type="multipart/form-data")
+        elapsed = (time.perf_counter() - started) * 1000
+        body = resp.get_json(silent=True) or {}
+        return elapsed, resp.status_code, body.get("error")
+
+    # Warm-up: starts the OCR process pool and the SQLite connections
+    for case, filename, data in documents[:args.warmup]:
+        upload(filename, data)
+    recorder.reset()
+
+    by_case: dict[str, list[float]] = {}
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    started = time.perf_counter()
+    for case, filename, data in documents:
+        elapsed, status, error = upload(filename, data)
+        if status != 200:
+            errors[error or str(status)] = errors.get(error or str(status), 0) + 1
+            if args.verbose:
+                print(f"  {case['name']}: {status} {error}")
+            continue
+        latencies.append(elapsed)
+        by_case.setdefault(case["name"], []).append(elapsed)
+    wall_s = time.perf_counter() - started
+    if recorder.track_memory:
+        tracemalloc.stop()
+    if not latencies:
+        raise SystemExit(f"every upload failed: {errors}")
+
+    stages = {}
+    for name in sorted(recorder.samples, key=lambda n: STAGES.index(n) if n in STAGES else len(STAGES)):
+        samples = recorder.samples[name]
+        stages[name] = {
+            **summarise(samples),
+            "total_s": round(sum(samples) / 1000, 3),
+            "throughput_per_s": round(len(samples) / (sum(samples) / 1000), 2) if sum(samples) else None,
+            "peak_heap_kb": round(recorder.peaks[name] / 1024) if recorder.track_memory else None,
+            "errors": recorder.errors.get(name, 0),
+        }
+    result = {
+        "version": RESULT_VERSION,
+        "meta": {
+            **git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ocr_workers": engine.workers,
+            "pdf_dpi": engine.pdf_dpi,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "overall": {
+            **summarise(latencies),
+            "errors": errors,
+            "wall_s": round(wall_s, 3),
+            "throughput_per_s": round(len(latencies) / wall_s, 3),
+            "gemini_calls": gemini.calls,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+            "ocr_pool_peak_rss_kb": ocr_pool_peak_kb(engine),
+        },
+        "stages": stages,
+        "cases": {name: summarise(values) for name, values in sorted(by_case.items())},
+    }
+    engine.shutdown()
+    return result
+
+
+def print_result(result: dict) -> None:
+    overall = result["overall"]
+    print(f"uploads  n={overall['count']:<5} p50={overall['p50_ms']:9.1f} ms  p95={overall['p95_ms']:9.1f} ms  "
+          f"{overall['throughput_per_s']:.2f} bills/s  errors={sum(overall['errors'].values())}")
+    rss = [f"{label} {kb / 1024:.0f} MiB" for label, kb in
+           (("web", overall["peak_rss_kb"]), ("OCR worker", overall["ocr_pool_peak_rss_kb"])) if kb]
+    print(f"peak RSS: {', '.join(rss) or 'n/a'}\n")
+    print(f"{'stage':<16} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'per s':>8} {'heap KiB':>9}")
+    for name, s in result["stages"].items():
+        heap = f"{s['peak_heap_kb']:>9,}" if s["peak_heap_kb"] is not None else f"{'-':>9}"
+        per_s = f"{s['throughput_per_s']:>8.1f}" if s["throughput_per_s"] else f"{'-':>8}"
+        print(f"{name:<16} {s['count']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {per_s} {heap}")
+    print(f"\n{'case':<34} {'n':>4} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, s in result["cases"].items():
+        print(f"{name:<34} {s['count']:>4} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f}")
+
+
+def compare(base: dict, new: dict) -> None:
+    def label(result: dict) -> str:
+        meta = result["meta"]
+        return f"{meta.get('commit') or '?'}{'+dirty' if meta.get('dirty') else ''}"
+
+    def change(old: float | None, cur: float | None) -> str:
+        if not old or cur is None:
+            return f"{'':>8}"
+        return f"{100 * (cur - old) / old:>+7.1f}%"
+
+    if base["meta"].get("args") != new["meta"].get("args"):
+        print("warning: the runs used different corpus/settings; compare with care")
+    print(f"\n{label(base)} -> {label(new)}")
+    print(f"{'ms':<16} {'base p50':>9} {'new p50':>9} {'':>8} {'base p95':>9} {'new p95':>9}")
+    rows = [("uploads", base["overall"], new["overall"])]
+    rows += [(name, base["stages"].get(name), stats) for name, stats in new["stages"].items()]
+    for name, old, cur in rows:
+        old = old or {}
+        print(f"{name:<16} {old.get('p50_ms', float('nan')):>9.1f} {cur['p50_ms']:>9.1f} "
+              f"{change(old.get('p50_ms'), cur['p50_ms'])} "
+              f"{old.get('p95_ms', float('nan')):>9.1f} {cur['p95_ms']:>9.1f} {change(old.get('p95_ms'), cur['p95_ms'])}")
+    print(f"throughput: {base['overall']['throughput_per_s']:.2f} -> {new['overall']['throughput_per_s']:.2f} bills/s "
+          f"{change(base['overall']['throughput_per_s'], new['overall']['throughput_per_s']).strip()}")
+
+
+def _csv(kind):
+    return lambda raw: [kind(part) for part in raw.split(",") if part.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", type=_csv(str), default=["png", "jpeg", "scanned_pdf", "text_pdf"],
+                        help="comma-separated: png, jpeg, scanned_pdf, text_pdf")
+    parser.add_argument("--dpis", type=_csv(int), default=[150, 300], help="scan resolutions")
+    parser.add_argument("--skews", type=_csv(float), default=[0.0, 3.0], help="rotation in degrees")
+    parser.add_argument("--pages", type=_csv(int), default=[1, 3], help="page counts for PDFs")
+    parser.add_argument("--bills-per-case", type=int, default=2)
+    parser.add_argument("--warmup", type=int, default=2, help="uploads before measuring")
+    parser.add_argument("--gemini-ms", type=float, default=0.0, help="fake Gemini latency per call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (lower overhead)")
+    parser.add_argument("--out", default="bench_bill_pipeline.json", help="where to write the JSON result")
+    parser.add_argument("--compare", nargs="+", metavar="RESULT.json",
+                        help="baseline to compare this run against, or two result files to compare without running")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        base, new = (json.loads(Path(path).read_text()) for path in args.compare)
+        compare(base, new)
+        return
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one baseline, or two result files")
+
+    result = run(args)
+    print_result(result)
+    Path(args.out).write_text(json.dumps(result, indent=2) + "\n")
+    print(f"\nwrote {args.out}")
+    if args.compare:
+        compare(json.loads(Path(args.compare[0]).read_text()), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: inline vs queued bill uploads.
+
+Drives /api/bills/upload through Flask's test client with the OCR/LLM pipeline
+replaced by a fixed-latency fake, then reports request latency and how long
+the web worker was occupied per upload in each mode.
+
+    python bench_bill_queue.py --uploads 20 --pipeline-ms 1500
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+# Point the app at a throwaway DB before it is imported.
+_tmpdir = tempfile.mkdtemp(prefix="ledgerly-bench-")
+os.environ["LEDGERLY_DB_PATH"] = str(Path(_tmpdir) / "bench.db")
+
+import app as ledgerly  # noqa: E402
+from db import get_pool  # noqa: E402
+from worker import run_worker  # noqa: E402
+
+
+def make_fake_pipeline(pipeline_ms: float):
+    def fake_process_bill(pool, bill_id, user_id, local_path, progress=None):
+        for stage in ("pdf_to_image", "ocr", "extract", "db_write"):
+            if progress is not None:
+                progress(stage)
+            time.sleep(pipeline_ms / 4000.0)
+        with pool.connection() as conn:
+            conn.execute(
+                "UPDATE bills SET status = 'done', total_amount = 100 WHERE id = ? AND status = 'processing'",
+                (bill_id,),
+            )
+        return {"status": "done", "total_amount": 100}
+
+    return fake_process_bill
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run_uploads(client, uploads: int) -> list[float]:
+    latencies = []
+    for i in range(uploads):
+        data = {"file": (io.BytesIO(b"\x89PNG fake bill %d" % i), f"bill_{i}.png")}
+        started = time.perf_counter()
+        resp = client.post("/api/bills/upload", data=data, content_type="multipart/form-data")
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert resp.status_code in (200, 202), resp.get_data(as_text=True)
+    return latencies
+
+
+def report(label: str, latencies: list[float], wall_s: float) -> None:
+    busy_s = sum(latencies) / 1000
+    print(f"{label:<8} p50={statistics.median(latencies):8.1f} ms  p95={percentile(latencies, 95):8.1f} ms  "
+          f"web-worker busy={busy_s:6.2f} s over {wall_s:6.2f} s "
+          f"({busy_s / len(latencies) * 1000:7.1f} ms/upload)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--pipeline-ms", type=float, default=1500.0, help="simulated OCR+LLM time per bill")
+    args = parser.parse_args()
+
+    fake = make_fake_pipeline(args.pipeline_ms)
+    ledgerly.process_bill = fake
+    flask_app = ledgerly.create_app()
+    client = flask_app.test_client()
+    login = client.post("/api/login", json={"identifier": "demo@ledgerly.in", "password": "Ledgerly@123"})
+    assert login.status_code == 200, login.get_data(as_text=True)
+
+    print(f"{args.uploads} uploads, simulated pipeline {args.pipeline_ms:.0f} ms\n")
+
+    ledgerly.BILLS_ASYNC = False
+    started = time.perf_counter()
+    inline = run_uploads(client, args.uploads)
+    report("inline", inline, time.perf_counter() - started)
+
+    ledgerly.BILLS_ASYNC = True
+    started = time.perf_counter()
+    queued = run_uploads(client, args.uploads)
+    report("queued", queued, time.perf_counter() - started)
+
+    drain_started = time.perf_counter()
+    handled = run_worker(Path(os.environ["LEDGERLY_DB_PATH"]), once=True, processor=fake)
+    drain_s = time.perf_counter() - drain_started
+    with get_pool(os.environ["LEDGERLY_DB_PATH"]).connection() as conn:
+        pending = conn.execute("SELECT COUNT(*) FROM bills WHERE status = 'processing'").fetchone()[0]
+    print(f"\nworker drained {handled} job(s) in {drain_s:.2f} s; {pending} bill(s) still processing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: bytes on the wire for a typical dashboard load.
+
+Adds up what a first visit to /dashboard transfers: the page (with
+fingerprinted asset URLs), every stylesheet, script and logo it references,
+and the JSON the dashboard fetches on load (/api/me, /api/entries?limit=50,
+the full entry history in 500-row pages, /api/billing/snapshot), with
+synthetic entries shaped like the real responses. Reports identity, gzip
+and, if the ``brotli`` package is installed, brotli sizes, using the same
+settings as the server (max level for static files, cheaper for JSON).
+
+    python bench_compression.py --entries 1500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from assets import AssetPipeline
+from compression import MIN_BYTES, encode, supported_encodings
+
+FRONTEND_DIR = Path(__file__).resolve().parents[1]
+ASSET_DIRS = {name: FRONTEND_DIR / name for name in ("styles", "script", "uploads")}
+_ASSET_URL_RE = re.compile(r"""(?:href|src)=["']/(styles|script|uploads)/([^"'?#]+)["']""")
+
+
+def static_payloads(page: str) -> list[tuple[str, bytes]]:
+    pipeline = AssetPipeline(FRONTEND_DIR / "pages", ASSET_DIRS)
+    html = pipeline.page(page)
+    payloads = {f"/{page}": html}
+    for directory, name in _ASSET_URL_RE.findall(html.decode("utf-8")):
+        real = pipeline.resolve(directory, name) or ASSET_DIRS[directory] / name
+        if real.is_file():
+            payloads[f"/{directory}/{name}"] = real.read_bytes()
+    return list(payloads.items())
+
+
+def json_payloads(entries: int, rng: random.Random) -> list[tuple[str, bytes]]:
+    now = datetime(2025, 3, 31, 18, 0, 0)
+    notes = ["Sale - cash", "UPI payment", "Bill: Sharma Traders", "Rent", "Electricity bill",
+             "Voice entry: 2 kg atta", "Card payment", "Supplier: Gupta Wholesale"]
+    rows = [{
+        "id": entries - i,
+        "entry_type": rng.choice(("income", "income", "expense")),
+        "amount": round(rng.uniform(20, 25000), 2),
+        "note": rng.choice(notes),
+        "created_at": (now - timedelta(minutes=37 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+    } for i in range(entries)]
+
+    def body(payload: dict) -> bytes:
+        return json.dumps(payload, separators=(",", ":")).encode()  # jsonify output outside debug mode
+
+    out = [
+        ("/api/me", body({"ok": True, "user": {"id": 1, "username": "Demo Owner", "email": "demo@ledgerly.in"}})),
+        ("/api/entries?limit=50", body({"ok": True, "entries": rows[:50], "next_before_id": rows[49]["id"]})),
+    ]
+    for start in range(0, entries, 500):
+        page = rows[start:start + 500]
+        next_id = page[-1]["id"] if start + 500 < entries else None
+        out.append((f"/api/entries?limit=500 (page {start // 500 + 1})",
+                    body({"ok": True, "entries": page, "next_before_id": next_id})))
+    out.append(("/api/billing/snapshot?range=week", body({"ok": True, "snapshot": {
+        "total_collections": 184250.5, "payments_received": 184250.5, "total_payables": 61210.0,
+        "due_receivables": 55275.15, "range": "week", "from": "2025-03-25", "to": "2025-03-31",
+        "timezone": "+05:30", "income_count": 143, "expense_count": 38}})))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1500, help="entries in the user's history")
+    parser.add_argument("--page", default="dashboard.html")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="print every request")
+    args = parser.parse_args()
+
+    encodings = supported_encodings()
+    groups = {"static": static_payloads(args.page), "json": json_payloads(args.entries, random.Random(args.seed))}
+    totals = {group: dict.fromkeys(("identity",) + encodings, 0) for group in groups}
+    for group, payloads in groups.items():
+        for url, data in payloads:
+            sizes = {"identity": len(data)}
+            for encoding in encodings:
+                # The server leaves small JSON bodies alone
+                small = group == "json" and len(data) < MIN_BYTES
+                sizes[encoding] = len(data) if small else len(encode(data, encoding, static=group == "static"))
+            for name, size in sizes.items():
+                totals[group][name] += size
+            if args.verbose:
+                print(f"{url:<48} " + "  ".join(f"{name} {size:>8,}" for name, size in sizes.items()))
+
+    print(f"\n{args.page} first load, {args.entries} entries"
+          + ("" if "br" in encodings else " (brotli not installed: gzip only)"))
+    header = f"{'':<8}" + "".join(f"{name:>14}" for name in ("identity",) + encodings)
+    print(header)
+    grand = dict.fromkeys(("identity",) + encodings, 0)
+    for group, sizes in totals.items():
+        print(f"{group:<8}" + "".join(f"{size:>14,}" for size in sizes.values()))
+        for name, size in sizes.items():
+            grand[name] += size
+    print(f"{'total':<8}" + "".join(f"{size:>14,}" for size in grand.values()))
+    for encoding in encodings:
+        print(f"{encoding}: {100 * (1 - grand[encoding] / grand['identity']):.1f}% fewer bytes on the wire")
+
+
+if __name__ == "__main__":
+    main()
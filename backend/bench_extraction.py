@@ -0,0 +1,151 @@
+"""
+Microbenchmark: OCR field extraction.
+
+Runs on a corpus of synthetic GST bill texts and compares:
+- the old first-match search (ad hoc patterns, run in the fallback extractor
+  and again in the upload handler),
+- precompiled per-pattern scans collecting every candidate,
+- extraction.extract, alone and as shared by both consumers via its memo.
+
+    python bench_extraction.py --bills 2000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from extraction import extract
+
+VENDORS = ["Shree Ganesh Traders", "Om Sai Kirana Stores", "Balaji Hardware & Paints", "Patel Agencies",
+           "Lakshmi Cement Depot", "New India Electricals", "Gupta General Store", "Sharma Dairy Products"]
+ITEMS = ["Cement 50kg", "TMT Bar 12mm", "Basmati Rice 25kg", "Toor Dal 1kg", "Sunflower Oil 15L",
+         "PVC Pipe 4in", "LED Bulb 9W", "Copper Wire 90m", "Paint 20L", "Sugar 50kg"]
+
+
+def synthetic_bill(rng: random.Random) -> str:
+    lines = [rng.choice(VENDORS).upper(), f"{rng.randint(1, 999)}, Main Bazaar Road, Pune"]
+    gstin = f"{rng.randint(10, 37)}{''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(5))}" \
+            f"{rng.randint(1000, 9999)}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}1Z{rng.choice('0123456789ABC')}"
+    lines.append(f"GSTIN: {gstin}")
+    lines.append(f"Invoice No: INV-{rng.randint(100, 99999)}   Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024")
+    subtotal = 0.0
+    for _ in range(rng.randint(3, 25)):
+        qty, rate = rng.randint(1, 50), round(rng.uniform(10, 2500), 2)
+        subtotal += qty * rate
+        lines.append(f"{rng.choice(ITEMS):<22} {rng.randint(1000, 9999)}  {qty:>3}  {rate:>9,.2f}  {qty * rate:>11,.2f}")
+    gst = round(subtotal * 0.09, 2)
+    lines += [
+        f"Sub Total: {subtotal:,.2f}",
+        f"CGST 9%  {gst:,.2f}",
+        f"SGST 9%  {gst:,.2f}",
+        f"Grand Total: Rs. {subtotal + 2 * gst:,.2f}",
+        "Thank you for your business!",
+    ]
+    return "\n".join(lines)
+
+
+def legacy_extract(ocr_text: str) -> tuple:
+    """The pre-extraction-module behaviour: ad hoc patterns, one full scan per pattern."""
+    amount_patterns = [
+        r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",
+        r"Total[:\s]*([\d,]+\.?\d*)",
+        r"Amount[:\s]*([\d,]+\.?\d*)",
+        r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",
+        r"\b([\d,]+\.\d{2})\b",
+    ]
+    amount = None
+    for pattern in amount_patterns:
+        m = re.search(pattern, ocr_text, re.IGNORECASE)
+        if m:
+            try:
+                amount = float(m.group(1).replace(",", ""))
+                break
+            except ValueError:
+                continue
+    bill_date = None
+    for pattern in [r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4})", r"(\d{4}[\-/]\d{1,2}[\-/]\d{1,2})"]:
+        m = re.search(pattern, ocr_text)
+        if m:
+            bill_date = m.group(1)
+            break
+    vendor = None
+    for line in ocr_text.splitlines():
+        line = line.strip()
+        if line and not any(label in line.lower() for label in ["invoice", "bill", "date", "gst", "total", "amount"]):
+            vendor = line
+            break
+    # The upload handler then re-ran the amount patterns for detected_amount
+    for pattern in amount_patterns:
+        if re.search(pattern, ocr_text, re.IGNORECASE):
+            break
+    return amount, bill_date, vendor
+
+
+_LEGACY_ALL = [re.compile(p, re.IGNORECASE) for p in (
+    r"(?:₹|Rs\.?|INR)\s*([\d,]+\.?\d*)",
+    r"Total[:\s]*([\d,]+\.?\d*)",
+    r"Amount[:\s]*([\d,]+\.?\d*)",
+    r"Grand\s*Total[:\s]*([\d,]+\.?\d*)",
+    r"\b([\d,]+\.\d{2})\b",
+    r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4})",
+    r"(\d{4}[\-/]\d{1,2}[\-/]\d{1,2})",
+    r"\b(\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z])\b",
+)]
+
+
+def legacy_all_candidates(ocr_text: str) -> list:
+    """Precompiled per-pattern scans collecting every match (what extract returns)."""
+    found = [(m.start(), m.group(1)) for pattern in _LEGACY_ALL for m in pattern.finditer(ocr_text)]
+    vendors = [line.strip() for line in ocr_text.splitlines()
+               if line.strip() and not any(k in line.lower() for k in ("invoice", "bill", "date", "gst", "total", "amount"))][:5]
+    return found + vendors
+
+
+def timed(label: str, fn, corpus: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    per_doc_us = best / len(corpus) * 1e6
+    print(f"{label:<34} {per_doc_us:9.1f} µs/bill  ({len(corpus) / best:10.0f} bills/s)")
+    return per_doc_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [synthetic_bill(rng) for _ in range(args.bills)]
+    avg_len = sum(map(len, corpus)) / len(corpus)
+    print(f"{len(corpus)} synthetic bills, avg {avg_len:.0f} chars, best of {args.repeat}\n")
+
+    def engine(text: str) -> tuple:
+        fields = extract.__wrapped__(text)  # bypass the memo so every bill is really scanned
+        return fields.best_amount(), fields.best_date(), fields.best_vendor(), fields.best_gstin()
+
+    def engine_shared(text: str) -> tuple:
+        # Fallback extractor + upload handler on the same OCR text: the second call hits the memo
+        extract.cache_clear()
+        first = extract(text)
+        second = extract(text)
+        return first.best_amount(), first.best_date(), first.best_vendor(), second.best_amount()
+
+    legacy = timed("legacy first match (2 consumers)", legacy_extract, corpus, args.repeat)
+    legacy_all = timed("legacy per-pattern, all matches", legacy_all_candidates, corpus, args.repeat)
+    single = timed("extract, single pass", engine, corpus, args.repeat)
+    shared = timed("extract, 2 consumers (memoised)", engine_shared, corpus, args.repeat)
+    print(f"\nall-candidates speedup vs per-pattern scans: {legacy_all / single:.2f}x")
+    print(f"vs legacy first-match search:              {legacy / shared:.2f}x "
+          "(legacy stops at the first hit and finds no GSTIN or alternatives)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: /ask intent parsing, local templates vs OpenAI.
+
+Runs a corpus of everyday Hinglish/English questions (the ones the OpenAI
+system prompt lists, plus spelling variants) through intent_parser and
+reports how many it answers locally and how long that takes. Every local
+answer is executed against a scratch ``transactions`` table (db_new schema)
+to make sure the SQL is valid.
+
+With --openai (needs OPENAI_API_KEY) the same questions are also sent to
+openai_helper.ask_openai to compare round-trip latency.
+
+    python bench_intents.py --repeat 1000
+    python bench_intents.py --openai
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+from datetime import date, timedelta
+
+import intent_parser
+
+QUESTIONS = [
+    # Listed in openai_helper.SYSTEM_PROMPT
+    "Kal ka galla", "Aaj kitna", "Aaj ka sales", "Cash me kitna", "UPI se kitna", "GST kitna laga",
+    "Last 7 days", "Payment mode wise breakdown", "This month", "Yesterday's transactions", "Total revenue",
+    # Variants
+    "aaj ka sale?", "aj ka galla", "kal kitna hua", "kl ka sale", "parso ka galla", "aaj ki bikri",
+    "today's sales", "yesterday sales", "upi payments today", "aaj upi se kitna aaya", "cash kitna mila kal",
+    "card se kitna", "gpay me kitna aaya", "total gst collected", "aaj ka gst", "is mahine ka gst",
+    "pichle 30 din", "last 30 days sales", "last week", "weekly trend", "this week sales", "last month",
+    "last month total sale", "mode wise", "payment breakdown", "aaj mode wise", "day wise sales",
+    "aaj kitne transactions", "total transactions", "average sale", "is hafte ka average",
+    "आज कितना", "कल की बिक्री",
+    # Left to the model
+    "cash vs upi this month", "which day had the highest sales", "top 5 descriptions by amount",
+    "sales growth compared to last month", "how many transactions above 1000",
+]
+
+SCHEMA = """CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY, date DATE NOT NULL, amount FLOAT NOT NULL, gst_amount FLOAT DEFAULT 0,
+    payment_mode TEXT NOT NULL, description TEXT, created_at DATETIME, updated_at DATETIME)"""
+
+
+def scratch_db(rows: int, rng: random.Random) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(SCHEMA)
+    today = date.today()
+    conn.executemany(
+        "INSERT INTO transactions (date, amount, gst_amount, payment_mode) VALUES (?, ?, ?, ?)",
+        [((today - timedelta(days=rng.randrange(90))).isoformat(), amount := round(rng.uniform(50, 5000), 2),
+          round(amount * 0.18, 2), rng.choice(("cash", "upi", "card"))) for _ in range(rows)],
+    )
+    return conn
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=1000, help="parse each question this many times")
+    parser.add_argument("--openai", action="store_true", help="also time ask_openai on every question")
+    parser.add_argument("--verbose", action="store_true", help="print each question's answer")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = scratch_db(5000, random.Random(args.seed))
+    local_us, hits = [], 0
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            answer = intent_parser.parse_question(question)
+        local_us.append((time.perf_counter() - started) / args.repeat * 1e6)
+        if answer is not None:
+            hits += 1
+            conn.execute(answer["sql"]).fetchall()  # raises on invalid SQL
+        if args.verbose:
+            print(f"{question!r:<40} -> {answer['title'] + ' [' + answer['chart'] + ']' if answer else 'openai'}")
+
+    print(f"{len(QUESTIONS)} questions: {hits} answered locally ({hits / len(QUESTIONS):.0%}), "
+          f"{len(QUESTIONS) - hits} left to OpenAI")
+    print(f"local parse   median {statistics.median(local_us):8.1f} us   max {max(local_us):8.1f} us")
+
+    if args.openai:
+        from openai_helper import ask_openai
+
+        remote_ms = []
+        for question in QUESTIONS:
+            started = time.perf_counter()
+            ask_openai(question)
+            remote_ms.append((time.perf_counter() - started) * 1000)
+        median_ms = statistics.median(remote_ms)
+        print(f"openai        median {median_ms:8.1f} ms   max {max(remote_ms):8.1f} ms")
+        # Expected time to a SQL query per question, given the local hit rate
+        rate = hits / len(QUESTIONS)
+        blended = rate * statistics.median(local_us) / 1000 + (1 - rate) * median_ms
+        print(f"\nper question: {blended:.1f} ms with the local fast path vs {median_ms:.1f} ms OpenAI-only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Load test: replay dashboard sessions against the Flask app.
+
+Each virtual user logs in as a different shop from generate_dataset.py
+(``shop<N>@ledgerly.test``) and repeats what the dashboard does on a visit:
+the page, /api/me, the week's snapshot, the latest entries, bills and the
+schedule; then, some of the time, the month's snapshot, scrolling back
+through older entries, adding an entry, opening the profile or a bill.
+Reports throughput and p50/p95/p99 latency per endpoint.
+
+By default requests go through ``create_app()`` on Flask's test client, in
+this process (app + SQLite cost, no network, one GIL). Pass --url to drive
+a running server instead (e.g. gunicorn with several workers).
+
+    python generate_dataset.py --users 2000 --entries 2000000
+    python bench_load.py --users 16 --duration 60
+    python bench_load.py --url http://127.0.0.1:5000 --users 64 --duration 60 --json load.json
+"""
+from __future__ import annotations
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from db import default_db_path
+from generate_dataset import EMAIL_DOMAIN, PASSWORD
+
+BILL_LIST_FIELDS = "id,filename,vendor_name,total_amount,status,created_at"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class TestClient:
+    """Requests through Flask's test client (one per virtual user, for its own session cookie)."""
+
+    def __init__(self, flask_app) -> None:
+        self.client = flask_app.test_client()
+
+    def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, dict | None]:
+        resp = self.client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_json(silent=True)
+
+
+class HttpClient:
+    """Requests to a running server, with a cookie jar per virtual user."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, dict | None]:
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with self.opener.open(req, timeout=60) as resp:
+                status, raw, ctype = resp.status, resp.read(), resp.headers.get("Content-Type", "")
+        except urllib.error.HTTPError as e:
+            status, raw, ctype = e.code, e.read(), e.headers.get("Content-Type", "")
+        if "json" not in ctype:
+            return status, None
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, label: str, ms: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(label, []).append(ms)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+
+def timed(client, recorder: Recorder, label: str, method: str, path: str,
+          body: dict | None = None) -> dict | None:
+    started = time.perf_counter()
+    try:
+        status, payload = client.request(method, path, body)
+    except OSError:
+        status, payload = 0, None
+    recorder.record(label, (time.perf_counter() - started) * 1000, 200 <= status < 300)
+    return payload
+
+
+def dashboard_session(client, recorder: Recorder, rng: random.Random) -> None:
+    """One dashboard visit, with the optional follow-ups a shop owner might do."""
+    timed(client, recorder, "GET /dashboard", "GET", "/dashboard")
+    timed(client, recorder, "GET /api/me", "GET", "/api/me")
+    timed(client, recorder, "GET /api/billing/snapshot (week)", "GET", "/api/billing/snapshot?range=week")
+    entries = timed(client, recorder, "GET /api/entries", "GET", "/api/entries?limit=50") or {}
+    bills = timed(client, recorder, "GET /api/bills", "GET", f"/api/bills?limit=20&fields={BILL_LIST_FIELDS}") or {}
+    timed(client, recorder, "GET /api/schedule", "GET", "/api/schedule")
+
+    if rng.random() < 0.5:
+        timed(client, recorder, "GET /api/billing/snapshot (month)", "GET", "/api/billing/snapshot?range=month")
+    if rng.random() < 0.3:
+        before_id = entries.get("next_before_id")
+        for _ in range(rng.randint(1, 3)):
+            if not before_id:
+                break
+            page = timed(client, recorder, "GET /api/entries (older page)", "GET",
+                         f"/api/entries?limit=50&before_id={before_id}") or {}
+            before_id = page.get("next_before_id")
+    if rng.random() < 0.15:
+        entry_type = "income" if rng.random() < 0.75 else "expense"
+        timed(client, recorder, "POST /api/entries", "POST", "/api/entries",
+              {"entry_type": entry_type, "amount": round(rng.lognormvariate(6.5, 1.0), 2), "note": "Load test entry"})
+    if rng.random() < 0.1:
+        timed(client, recorder, "GET /api/profile", "GET", "/api/profile")
+    bill_list = bills.get("bills") or []
+    if bill_list and rng.random() < 0.05:
+        bill_id = rng.choice(bill_list)["id"]
+        timed(client, recorder, "GET /api/bills/<id>", "GET", f"/api/bills/{bill_id}")
+
+
+def shop_emails(db_path: Path) -> list[str]:
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT email FROM users WHERE email LIKE ? ORDER BY id", (f"%@{EMAIL_DOMAIN}",))]
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=Path(os.environ.get("LEDGERLY_DB_PATH", str(default_db_path()))),
+                        help="database filled by generate_dataset.py (to pick shops, and for the in-process app)")
+    parser.add_argument("--url", help="base URL of a running server instead of the in-process test client")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between sessions")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="also write the results to this file")
+    args = parser.parse_args()
+
+    emails = shop_emails(args.db)
+    if not emails:
+        raise SystemExit(f"no generated shops in {args.db}; run generate_dataset.py first")
+    rng = random.Random(args.seed)
+    shops = rng.sample(emails, min(args.users, len(emails)))
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+    else:
+        os.environ["LEDGERLY_DB_PATH"] = str(args.db)
+        import app as ledgerly
+
+        flask_app = ledgerly.create_app()
+        make_client = lambda: TestClient(flask_app)  # noqa: E731
+
+    recorder = Recorder()
+    sessions = [0] * len(shops)
+    stop_at = time.perf_counter() + args.duration
+
+    def virtual_user(slot: int, email: str) -> None:
+        user_rng = random.Random(f"{args.seed}:{slot}")
+        client = make_client()
+        payload = timed(client, recorder, "POST /api/login", "POST", "/api/login",
+                        {"identifier": email, "password": PASSWORD})
+        if not (payload or {}).get("ok"):
+            print(f"[ledgerly] login failed for {email}")
+            return
+        while time.perf_counter() < stop_at:
+            dashboard_session(client, recorder, user_rng)
+            sessions[slot] += 1
+            if args.think_ms:
+                time.sleep(args.think_ms / 1000)
+
+    target = args.url or f"create_app() on {args.db}"
+    print(f"{len(shops)} virtual users for {args.duration:.0f} s against {target}\n")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=virtual_user, args=(slot, email), daemon=True)
+               for slot, email in enumerate(shops)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    rows = {}
+    for label, values in sorted(recorder.latencies.items()):
+        rows[label] = {
+            "count": len(values),
+            "rps": round(len(values) / wall, 2),
+            "p50_ms": round(statistics.median(values), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(max(values), 2),
+            "errors": recorder.errors.get(label, 0),
+        }
+    every = [ms for values in recorder.latencies.values() for ms in values]
+    if not every:
+        raise SystemExit("no requests completed")
+    overall = {
+        "count": len(every), "rps": round(len(every) / wall, 2),
+        "p50_ms": round(statistics.median(every), 2), "p95_ms": round(percentile(every, 95), 2),
+        "p99_ms": round(percentile(every, 99), 2), "max_ms": round(max(every), 2),
+        "errors": sum(recorder.errors.values()), "sessions": sum(sessions),
+    }
+
+    print(f"{'endpoint':<36} {'n':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'err':>5}")
+    for label, r in rows.items():
+        print(f"{label:<36} {r['count']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['max_ms']:>8.1f} {r['errors']:>5}")
+    print(f"{'all':<36} {overall['count']:>7} {overall['rps']:>8.1f} {overall['p50_ms']:>8.1f} "
+          f"{overall['p95_ms']:>8.1f} {overall['p99_ms']:>8.1f} {overall['max_ms']:>8.1f} {overall['errors']:>5}")
+    print(f"\n{overall['sessions']} dashboard sessions ({overall['sessions'] / wall:.1f}/s)")
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps({
+            "target": target, "users": len(shops), "duration_s": round(wall, 3), "seed": args.seed,
+            "overall": overall, "endpoints": rows,
+        }, indent=2) + "\n")
+        print(f"wrote {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: digital PDF bills, text layer vs rasterise + OCR.
+
+Builds synthetic multi-page GST invoices as real text PDFs (Helvetica, one
+line per text row) and times, per document:
+- OcrEngine.pdf_text: Poppler's pdftotext on the embedded text layer,
+- OcrEngine.pdf_pages + ocr: pdftoppm rasterisation and Tesseract per page
+  (what every PDF went through before).
+Also reports how often both paths agree on the extracted bill total.
+
+Needs Poppler (pdfinfo/pdftotext/pdftoppm) and Tesseract on PATH or
+POPPLER_PATH / TESSERACT_CMD, like the app itself.
+
+    python bench_pdf_text.py --docs 20 --pages 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from bench_extraction import synthetic_bill
+from extraction import extract
+from ocr_engine import get_engine
+
+LINES_PER_PAGE = 48
+
+
+def _pdf_string(text: str) -> str:
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def text_pdf(pages: list[list[str]]) -> bytes:
+    """Minimal PDF 1.4 with one Helvetica text block per page (A4)."""
+    objects: list[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        ops += [f"{_pdf_string(line)} Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_invoice(rng: random.Random, pages: int) -> bytes:
+    lines = synthetic_bill(rng).split("\n")
+    # Pad with more line items so the bill really spans ``pages`` pages
+    header, footer = lines[:4], lines[-5:]
+    body = lines[4:-5]
+    while len(header) + len(body) + len(footer) < LINES_PER_PAGE * (pages - 1) + 10:
+        body.append(rng.choice(body))
+    lines = header + body + footer
+    return text_pdf([lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = [synthetic_invoice(rng, args.pages) for _ in range(args.docs)]
+    engine = get_engine()
+    print(f"{len(docs)} digital PDFs, ~{args.pages} pages each, OCR workers={engine.workers}, dpi={engine.pdf_dpi}\n")
+
+    text_ms, ocr_ms, agree = [], [], 0
+    for data in docs:
+        started = time.perf_counter()
+        pages = engine.pdf_text(data)
+        text_ms.append((time.perf_counter() - started) * 1000)
+        if pages is None:
+            raise SystemExit("pdftotext found no text layer; is Poppler installed?")
+
+        started = time.perf_counter()
+        ocr_pages = [engine.ocr(png) for _, _, png in engine.pdf_pages(data)]
+        ocr_ms.append((time.perf_counter() - started) * 1000)
+
+        agree += extract("\n".join(pages)).best_amount() == extract("\n".join(ocr_pages)).best_amount()
+
+    for label, samples in (("text layer (pdftotext)", text_ms), ("rasterise + OCR", ocr_ms)):
+        print(f"{label:<24} median {statistics.median(samples):9.1f} ms/doc   max {max(samples):9.1f} ms/doc")
+    print(f"\nspeedup: {statistics.median(ocr_ms) / statistics.median(text_ms):.1f}x; "
+          f"bill totals agree on {agree}/{len(docs)} documents")
+    engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Benchmark: full-text search over a million bills.
+
+Fills a scratch database with generate_dataset.py (1,000,000 bills across
+2,000 shops by default; an existing file with enough bills is reused) and
+reports:
+
+- the size of the FTS indexes next to the tables they cover,
+- /api/search latency (p50/p95/p99 through search.search) for a mix of
+  queries -- vendor and item words, a prefix, a month filter -- as random
+  shops and as the busiest one, against the ``LIKE '%term%'`` scan of the
+  shop's bills that searching would take without the index,
+- what keeping the index in sync costs: bills inserted, OCR text updated
+  and bills deleted per second with the search triggers on and off (in a
+  transaction that is rolled back),
+- with --rebuild, the time to rebuild both indexes from scratch.
+
+    python bench_search.py --db /tmp/ledgerly-search.db
+    python bench_search.py --db /tmp/ledgerly-search.db --bills 200000 --users 500 --rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import search
+from bench_extraction import VENDORS
+from db import SEARCH_INDEXES, connect, init_db, rebuild_search_index
+from generate_dataset import bill_record, gstin, load_ledgerly, utc_stamp
+
+QUERIES = [
+    ("vendor word", "cement"),
+    ("two vendor words", "ganesh traders"),
+    ("item words", "basmati rice"),
+    ("item and vendor", "copper wire electricals"),
+    ("prefix", "sunfl*"),
+    ("natural language", "that cement bill from March"),
+    ("no match", "xylophone"),
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def ensure_dataset(db_path: Path, bills: int, users: int, seed: int) -> None:
+    if db_path.exists():
+        conn = sqlite3.connect(db_path)
+        try:
+            have = conn.execute("SELECT COUNT(*) FROM bills").fetchone()[0]
+        except sqlite3.OperationalError:
+            have = 0
+        finally:
+            conn.close()
+        if have >= bills:
+            print(f"[ledgerly] reusing {db_path} ({have:,} bills)")
+            return
+    args = argparse.Namespace(users=users, bills=bills, entries=bills + bills // 2, schedules=0,
+                              batch_size=10_000, replace=True, progress=True)
+    end = date.today()
+    print(f"[ledgerly] generating {bills:,} bills for {users:,} shops in {db_path}")
+    started = time.perf_counter()
+    load_ledgerly(db_path, args, random.Random(seed), end - timedelta(days=729), end)
+    print(f"[ledgerly] generated in {time.perf_counter() - started:.0f} s")
+
+
+def index_sizes(conn: sqlite3.Connection) -> dict[str, int]:
+    sizes = {}
+    for table in SEARCH_INDEXES:
+        for name, pattern in ((table, table), (f"{table}_fts", f"{table}_fts%")):
+            sizes[name] = conn.execute(
+                "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name LIKE ?", (pattern,)
+            ).fetchone()[0]
+    return sizes
+
+
+def like_scan(conn: sqlite3.Connection, user_id: int, query: search.SearchQuery) -> list:
+    """What the search costs without an index: every term as a substring of the shop's bills."""
+    where = " AND ".join("(ocr_text LIKE ? OR vendor_name LIKE ?)" for _ in query.terms)
+    params = [value for term in query.terms for value in (f"%{term}%", f"%{term}%")]
+    month = query.month_range()
+    if month:
+        where += " AND created_at >= ? AND created_at < ?"
+        params += month
+    return conn.execute(
+        f"SELECT id FROM bills WHERE user_id = ? AND {where} ORDER BY id DESC LIMIT 20", (user_id, *params)
+    ).fetchall()
+
+
+def time_queries(conn, shops: list[int], today: date, rounds: int, rng: random.Random) -> dict:
+    results = {}
+    for label, text in QUERIES:
+        query = search.parse_query(text, today)
+        fts_ms, like_ms, hits = [], [], []
+        for _ in range(rounds):
+            user_id = rng.choice(shops)
+            started = time.perf_counter()
+            found, _ = search.search(conn, user_id, query, "bills")
+            fts_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            like_scan(conn, user_id, query)
+            like_ms.append((time.perf_counter() - started) * 1000)
+            hits.append(len(found))
+        results[label] = {
+            "query": text,
+            "fts_p50_ms": round(statistics.median(fts_ms), 2),
+            "fts_p95_ms": round(percentile(fts_ms, 95), 2),
+            "fts_p99_ms": round(percentile(fts_ms, 99), 2),
+            "like_p50_ms": round(statistics.median(like_ms), 2),
+            "like_p95_ms": round(percentile(like_ms, 95), 2),
+            "avg_hits": round(sum(hits) / len(hits), 1),
+        }
+    return results
+
+
+def time_maintenance(conn: sqlite3.Connection, user_id: int, count: int, rng: random.Random) -> dict:
+    """Bill insert/update/delete rates with and without the search triggers; rolled back."""
+    created = int(time.time())
+    records = [bill_record(rng, created, (rng.choice(VENDORS), gstin(rng))) for _ in range(count)]
+    rates = {}
+    for label, triggers in (("with index", True), ("without index", False)):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not triggers:
+                for name in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_bills_fts_%'"
+                ).fetchall():
+                    conn.execute(f'DROP TRIGGER "{name[0]}"')
+            started = time.perf_counter()
+            first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM bills").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO bills (user_id, filename, s3_key, vendor_name, status, created_at) "
+                "VALUES (?, 'bench.jpg', 'bench', ?, 'processing', ?)",
+                [(user_id, structured["vendor_name"], utc_stamp(created)) for structured, _ in records],
+            )
+            inserted = time.perf_counter()
+            # The pipeline fills in OCR text once the bill is processed
+            conn.executemany("UPDATE bills SET ocr_text = ?, status = 'done' WHERE id = ?",
+                             [(text, first + i) for i, (_, text) in enumerate(records)])
+            updated = time.perf_counter()
+            conn.execute("DELETE FROM bills WHERE id >= ?", (first,))
+            deleted = time.perf_counter()
+        finally:
+            conn.execute("ROLLBACK")
+        rates[label] = {
+            "insert_per_s": round(count / (inserted - started)),
+            "ocr_update_per_s": round(count / (updated - inserted)),
+            "delete_per_s": round(count / (deleted - updated)),
+        }
+    return rates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=Path("/tmp/ledgerly-search.db"))
+    parser.add_argument("--bills", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=200, help="runs of each query")
+    parser.add_argument("--writes", type=int, default=2000, help="bills for the sync-cost test")
+    parser.add_argument("--rebuild", action="store_true", help="also time rebuilding the indexes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out", help="also write the results to this file")
+    args = parser.parse_args()
+
+    ensure_dataset(args.db, args.bills, args.users, args.seed)
+    init_db(args.db)
+    conn = connect(args.db)
+    conn.row_factory = sqlite3.Row
+    rng = random.Random(args.seed)
+    report: dict = {"bills": conn.execute("SELECT COUNT(*) FROM bills").fetchone()[0],
+                    "entries": conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]}
+
+    if args.rebuild:
+        conn.execute("BEGIN IMMEDIATE")
+        started = time.perf_counter()
+        rebuild_search_index(conn)
+        conn.execute("COMMIT")
+        report["rebuild_s"] = round(time.perf_counter() - started, 1)
+        print(f"rebuilt both indexes in {report['rebuild_s']} s")
+
+    report["sizes_mb"] = {name: round(size / 1e6, 1) for name, size in index_sizes(conn).items()}
+    print(f"\n{report['bills']:,} bills, {report['entries']:,} entries; on disk (MB): "
+          + ", ".join(f"{name} {size}" for name, size in report["sizes_mb"].items()))
+
+    shops = [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM bills")]
+    busiest = conn.execute("SELECT user_id, COUNT(*) FROM bills GROUP BY user_id ORDER BY 2 DESC LIMIT 1").fetchone()
+    today = date.today()
+    report["random_shops"] = time_queries(conn, shops, today, args.rounds, rng)
+    report["busiest_shop"] = time_queries(conn, [busiest[0]], today, max(20, args.rounds // 5), rng)
+    for title, results in ((f"random shops ({len(shops):,})", report["random_shops"]),
+                           (f"busiest shop ({busiest[1]:,} bills)", report["busiest_shop"])):
+        print(f"\n{title}")
+        print(f"{'query':<22} {'fts p50':>8} {'p95':>7} {'p99':>7} {'LIKE p50':>9} {'p95':>8} {'hits':>6}")
+        for label, r in results.items():
+            print(f"{label:<22} {r['fts_p50_ms']:>8.2f} {r['fts_p95_ms']:>7.2f} {r['fts_p99_ms']:>7.2f} "
+                  f"{r['like_p50_ms']:>9.2f} {r['like_p95_ms']:>8.2f} {r['avg_hits']:>6}")
+
+    report["sync"] = time_maintenance(conn, busiest[0], args.writes, rng)
+    print(f"\nkeeping bills_fts in sync ({args.writes:,} bills, rolled back)")
+    for label, rates in report["sync"].items():
+        print(f"{label:<14} insert {rates['insert_per_s']:>8,}/s  OCR update {rates['ocr_update_per_s']:>8,}/s  "
+              f"delete {rates['delete_per_s']:>8,}/s")
+
+    conn.close()
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: billing snapshot for a user with a long history.
+
+Fills a scratch database with N entries for one user spread over several
+years (inserted through the real schema, so the rollup triggers fire) and
+times one snapshot for a week, a month and a year (IST day boundaries):
+- the old handler: every entry loaded into Python and parsed,
+- one SQL aggregate over entries using the (user_id, created_at) index,
+- rollup.range_totals: daily rollup for whole days, entries for the edges.
+
+    python bench_snapshot.py --entries 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import rollup
+from db import get_pool, init_db, query_all, query_one
+
+IST = timezone(timedelta(hours=5, minutes=30))
+STAMP = "%Y-%m-%d %H:%M:%S"
+
+
+def populate(conn, user_id: int, entries: int, years: int, rng: random.Random) -> None:
+    end = datetime(2025, 3, 31, 23, 59, 59)
+    span = years * 365 * 86400
+    batch = []
+    for _ in range(entries):
+        created = end - timedelta(seconds=rng.randrange(span))
+        batch.append((user_id, rng.choice(("income", "expense")), round(rng.uniform(10, 50000), 2),
+                      created.strftime(STAMP)))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO entries (user_id, entry_type, amount, created_at) VALUES (?, ?, ?, ?)", batch)
+            batch.clear()
+    conn.executemany("INSERT INTO entries (user_id, entry_type, amount, created_at) VALUES (?, ?, ?, ?)", batch)
+
+
+def utc_bounds(from_date: date, to_date: date) -> tuple[datetime, datetime]:
+    def start(day: date) -> datetime:
+        return datetime.combine(day, datetime.min.time(), tzinfo=IST).astimezone(timezone.utc).replace(tzinfo=None)
+    return start(from_date), start(to_date + timedelta(days=1))
+
+
+def legacy(conn, user_id: int, start: datetime, end: datetime) -> float:
+    rows = query_all(conn, "SELECT id, entry_type, amount, created_at FROM entries WHERE user_id = ? ORDER BY created_at DESC",
+                     (user_id,))
+    collections = 0.0
+    for row in rows:
+        created = datetime.fromisoformat(row["created_at"].replace(" ", "T"))
+        if start <= created < end and row["entry_type"] == "income":
+            collections += float(row["amount"])
+    return collections
+
+
+def sql_entries(conn, user_id: int, start: datetime, end: datetime) -> float:
+    row = query_one(
+        conn,
+        """SELECT TOTAL(CASE WHEN entry_type = 'income' THEN amount END) AS collections
+           FROM entries WHERE user_id = ? AND created_at >= ? AND created_at < ?""",
+        (user_id, start.strftime(STAMP), end.strftime(STAMP)),
+    )
+    return row["collections"]
+
+
+def hybrid(conn, user_id: int, start: datetime, end: datetime) -> float:
+    return rollup.range_totals(conn, user_id, start, end)["income"]["amount"]
+
+
+def timed(fn, conn, user_id: int, start: datetime, end: datetime, repeat: int) -> tuple[float, float]:
+    best, result = float("inf"), 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(conn, user_id, start, end)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp(prefix="ledgerly-bench-")) / "bench.db"
+    init_db(db_path)
+    pool = get_pool(db_path)
+    with pool.connection() as conn:
+        user_id = conn.execute(
+            "INSERT INTO users (username, email, password_hash) VALUES ('bench', 'bench@ledgerly.in', 'x')"
+        ).lastrowid
+        started = time.perf_counter()
+        populate(conn, user_id, args.entries, args.years, random.Random(args.seed))
+    with pool.connection() as conn:
+        conn.execute("ANALYZE")
+        days = query_one(conn, "SELECT COUNT(*) AS n FROM entry_daily_rollup")["n"]
+    print(f"{args.entries} entries over {args.years} years ({days} rollup rows), "
+          f"loaded in {time.perf_counter() - started:.1f}s -> {db_path}\n")
+
+    to_date = date(2025, 3, 31)
+    print(f"{'range':<7} {'legacy python loop':>20} {'sql over entries':>18} {'rollup + edges':>16}")
+    with pool.connection() as conn:
+        for label, span in (("week", 7), ("month", 30), ("year", 365)):
+            start, end = utc_bounds(to_date - timedelta(days=span - 1), to_date)
+            old_ms, old = timed(legacy, conn, user_id, start, end, 1)
+            sql_ms, via_sql = timed(sql_entries, conn, user_id, start, end, args.repeat)
+            new_ms, via_rollup = timed(hybrid, conn, user_id, start, end, args.repeat)
+            assert abs(old - via_sql) < 0.01 and abs(old - via_rollup) < 0.01, (old, via_sql, via_rollup)
+            print(f"{label:<7} {old_ms:>17.1f} ms {sql_ms:>15.2f} ms {new_ms:>13.2f} ms")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Content-hash dedup cache for uploaded bills.
+
+Uploads are keyed by the SHA-256 of their bytes (``bills.content_hash``). When
+the same content has already been processed, the stored OCR text and
+structured result are reused instead of running Tesseract + Gemini again.
+
+LEDGERLY_BILL_DEDUP_SCOPE selects where a hit may come from:
+- ``user`` (default): only the uploading user's own bills
+- ``global``: any user's bills (the result is copied into a new bill)
+- ``off``: never dedup
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+
+from db import query_one
+
+SCOPES = {"user", "global", "off"}
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def dedup_scope() -> str:
+    scope = os.environ.get("LEDGERLY_BILL_DEDUP_SCOPE", "user").strip().lower()
+    return scope if scope in SCOPES else "user"
+
+
+def lookup(conn: sqlite3.Connection, digest: str, user_id: int, scope: str) -> sqlite3.Row | None:
+    """Return the most recent finished bill with this content in ``scope`` (own bills first)."""
+    if scope == "off":
+        return None
+    if scope == "user":
+        return query_one(
+            conn,
+            """SELECT * FROM bills
+               WHERE content_hash = ? AND user_id = ? AND status = 'done'
+               ORDER BY id DESC LIMIT 1""",
+            (digest, user_id),
+        )
+    return query_one(
+        conn,
+        """SELECT * FROM bills
+           WHERE content_hash = ? AND status = 'done'
+           ORDER BY user_id = ? DESC, id DESC LIMIT 1""",
+        (digest, user_id),
+    )
+
+
+def record_lookup(conn: sqlite3.Connection, scope: str, hit: bool, saved_ms: float = 0.0) -> None:
+    conn.execute(
+        """INSERT INTO bill_cache_stats (scope, lookups, hits, saved_ms) VALUES (?, 1, ?, ?)
+           ON CONFLICT(scope) DO UPDATE SET
+               lookups = lookups + 1,
+               hits = hits + excluded.hits,
+               saved_ms = saved_ms + excluded.saved_ms""",
+        (scope, 1 if hit else 0, saved_ms if hit else 0.0),
+    )
+
+
+def stats(conn: sqlite3.Connection) -> dict:
+    row = query_one(
+        conn,
+        """SELECT COALESCE(SUM(lookups), 0) AS lookups, COALESCE(SUM(hits), 0) AS hits,
+                  COALESCE(SUM(saved_ms), 0) AS saved_ms
+           FROM bill_cache_stats""",
+    )
+    lookups, hits = int(row["lookups"]), int(row["hits"])
+    return {
+        "scope": dedup_scope(),
+        "lookups": lookups,
+        "hits": hits,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "time_saved_s": round(float(row["saved_ms"]) / 1000, 3),
+    }
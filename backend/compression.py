@@ -0,0 +1,186 @@
+"""gzip/brotli for the Flask apps.
+
+Static text files (pages, styles, scripts, SVG logos) are compressed once
+per content version at maximum level and kept in memory, then picked by the
+request's Accept-Encoding. JSON API responses above
+LEDGERLY_COMPRESS_MIN_BYTES are compressed on the fly at a cheaper level.
+
+Brotli is used when the optional ``brotli`` package is installed; otherwise
+everything falls back to gzip.
+"""
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+import threading
+import zlib
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+    "application/json", "image/svg+xml",
+}
+# Below this the headers cost about as much as the savings
+MIN_BYTES = int(os.environ.get("LEDGERLY_COMPRESS_MIN_BYTES", "1024"))
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Best encoding the client accepts (q > 0), by server preference: br, then gzip."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def encode(data: bytes, encoding: str, static: bool) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if static else 5)
+    # mtime=0 keeps the output identical across restarts
+    return gzip.compress(data, compresslevel=9 if static else 6, mtime=0)
+
+
+def compress_chunks(chunks, encoding: str):
+    """Compress a streamed body chunk by chunk (for downloads too large to buffer)."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            # brotli returns b"" until it has a block worth emitting
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def is_compressible(mimetype: str | None) -> bool:
+    return (mimetype or "").split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+class StaticCompressor:
+    """Compressed variants of static content, built once per version and cached in memory."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: dict[tuple[str, str], tuple[object, bytes]] = {}
+
+    def variant(self, key: str, version, data: bytes, encoding: str) -> bytes:
+        with self._lock:
+            cached = self._cache.get((key, encoding))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        body = encode(data, encoding, static=True)
+        with self._lock:
+            self._cache[(key, encoding)] = (version, body)
+        return body
+
+    def bytes_variant(self, key: str, data: bytes, encoding: str) -> bytes:
+        return self.variant(key, (len(data), zlib.crc32(data)), data, encoding)
+
+    def file_variant(self, path: Path, encoding: str) -> bytes | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        version = (st.st_mtime_ns, st.st_size)
+        key = str(path)
+        with self._lock:
+            cached = self._cache.get((key, encoding))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        return self.variant(key, version, path.read_bytes(), encoding)
+
+    def precompress(self, directories: list[Path]) -> int:
+        """Compress every compressible file under ``directories``; returns the file count."""
+        count = 0
+        for directory in directories:
+            for path in directory.rglob("*"):
+                if path.is_file() and is_compressible(mimetypes.guess_type(path.name)[0]):
+                    for encoding in supported_encodings():
+                        self.file_variant(path, encoding)
+                    count += 1
+        return count
+
+    def precompress_in_background(self, directories: list[Path]) -> None:
+        threading.Thread(target=self.precompress, args=(directories,), daemon=True,
+                         name="ledgerly-precompress").start()
+
+
+def precompressed_response(compressor: StaticCompressor, accept_encoding: str | None, mimetype: str | None,
+                           path: Path | None = None, data: bytes | None = None, key: str | None = None):
+    """Response with the cached compressed variant of ``path`` (or ``data`` under ``key``).
+
+    None when the client accepts no supported encoding, the type isn't worth
+    compressing or the file is gone; the caller then sends it plainly.
+    """
+    encoding = negotiate(accept_encoding)
+    if encoding is None or not is_compressible(mimetype):
+        return None
+    if data is not None:
+        body = compressor.bytes_variant(key or "", data, encoding)
+    elif path is not None and path.is_file():
+        body = compressor.file_variant(path, encoding)
+    else:
+        body = None
+    if body is None:
+        return None
+    from werkzeug.wrappers import Response  # only needed when serving, not for bench_compression
+
+    response = Response(body, mimetype=mimetype)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def compress_response(response, accept_encoding: str | None, min_bytes: int = MIN_BYTES):
+    """Compress a buffered Flask/Werkzeug response in place if it is worth it.
+
+    Meant for ``after_request``: skips streamed and file responses, anything
+    already encoded, non-text types and bodies under ``min_bytes``.
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or not is_compressible(response.mimetype)
+    ):
+        return response
+    encoding = negotiate(accept_encoding)
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+    response.set_data(encode(data, encoding, static=False))
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import atexit
 import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
+
+# Connection class used by connect() when none is given (metrics.install_flask swaps in a timed one)
+_connection_factory: type[sqlite3.Connection] = sqlite3.Connection
 
 
 @dataclass(frozen=True)
@@ -18,9 +26,20 @@ def default_db_path() -> Path:
     return here / "ledgerly.db"
 
 
-def connect(db_path: Path) -> sqlite3.Connection:
+def set_connection_factory(factory: type[sqlite3.Connection]) -> None:
+    """Open every later connection (pooled ones included) as ``factory``."""
+    global _connection_factory
+    _connection_factory = factory
+
+
+def connect(
+    db_path: Path,
+    check_same_thread: bool = True,
+    factory: type[sqlite3.Connection] | None = None,
+) -> sqlite3.Connection:
     # Increase timeout to reduce "database is locked" errors under concurrent writes.
-    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=check_same_thread,
+                           factory=factory or _connection_factory)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")
@@ -29,6 +48,180 @@ def connect(db_path: Path) -> sqlite3.Connection:
     return conn
 
 
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection frees up within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of pre-configured SQLite connections.
+
+    Connections are opened lazily (PRAGMAs run once per connection, not per
+    request), handed out LIFO so hot connections stay warm, and pinned to the
+    checking-out thread for the duration of a ``with pool.connection()`` block.
+    Nested checkouts on the same thread reuse the outer connection.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_size: int = 8,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle: queue.LifoQueue[tuple[sqlite3.Connection, float]] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._opened = 0
+        self._closed = False
+        self._pid = os.getpid()
+
+    def _open(self) -> sqlite3.Connection:
+        # Pooled connections migrate between threads, so relax sqlite3's same-thread check.
+        return connect(self.db_path, check_same_thread=False)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _reset_after_fork(self) -> None:
+        # Connections must not cross a fork (gunicorn --preload); start afresh in the child.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._idle = queue.LifoQueue()
+            self._local = threading.local()
+            self._opened = 0
+            self._pid = os.getpid()
+
+    def _healthy(self, conn: sqlite3.Connection, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._opened < self.max_size
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        return self._open()
+                    except Exception:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No SQLite connection available after {self.timeout}s")
+                try:
+                    conn, idle_since = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+            if self._healthy(conn, idle_since):
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        if self._closed:
+            self._discard(conn)
+            return
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                self._discard(conn)
+                return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection; commit on success, roll back on error (like ``with conn``)."""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._checkin(conn)
+
+    def stats(self) -> dict[str, int]:
+        return {"max_size": self.max_size, "opened": self._opened, "idle": self._idle.qsize()}
+
+    def close(self) -> None:
+        """Close idle connections and refuse new checkouts; busy ones close on checkin."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+_pools: dict[Path, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: Path | str) -> ConnectionPool:
+    """Return the process-wide pool for ``db_path``, creating it on first use."""
+    key = Path(db_path).resolve()
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(
+                key,
+                max_size=int(os.environ.get("LEDGERLY_DB_POOL_SIZE", "8")),
+                timeout=float(os.environ.get("LEDGERLY_DB_POOL_TIMEOUT", "30")),
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
+
+
 def init_db(db_path: Path) -> None:
     db_path.parent.mkdir(parents=True, exist_ok=True)
     with connect(db_path) as conn:
@@ -62,7 +255,8 @@ def init_db(db_path: Path) -> None:
                 FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
             );
 
-            CREATE INDEX IF NOT EXISTS idx_entries_user_id ON entries(user_id);
+            CREATE INDEX IF NOT EXISTS idx_entries_user_id_id ON entries(user_id, id);
+            CREATE INDEX IF NOT EXISTS idx_entries_user_created ON entries(user_id, created_at);
 
             CREATE TABLE IF NOT EXISTS bills (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -77,12 +271,16 @@ def init_db(db_path: Path) -> None:
                 total_amount REAL,
                 gst_amount REAL,
                 items_json TEXT,
+                confidence REAL,
+                structured_json TEXT,
+                content_hash TEXT,
+                processing_ms REAL,
                 status TEXT NOT NULL DEFAULT 'processing',
                 created_at TEXT NOT NULL DEFAULT (datetime('now')),
                 FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
             );
 
-            CREATE INDEX IF NOT EXISTS idx_bills_user_id ON bills(user_id);
+            CREATE INDEX IF NOT EXISTS idx_bills_user_id_id ON bills(user_id, id);
 
             CREATE TABLE IF NOT EXISTS business_profiles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -122,6 +320,27 @@ def init_db(db_path: Path) -> None:
             
             CREATE INDEX IF NOT EXISTS idx_schedules_user_id ON schedules(user_id);
             CREATE INDEX IF NOT EXISTS idx_schedules_date ON schedules(schedule_date);
+
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                bill_id INTEGER,
+                status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued','running','done','failed')),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                run_after REAL NOT NULL,
+                locked_by TEXT,
+                locked_until REAL,
+                progress TEXT,
+                last_error TEXT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+                FOREIGN KEY(bill_id) REFERENCES bills(id) ON DELETE CASCADE
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON jobs(status, run_after);
+            CREATE INDEX IF NOT EXISTS idx_jobs_bill_id ON jobs(bill_id);
             """
         )
 
@@ -136,6 +355,20 @@ def init_db(db_path: Path) -> None:
         add_column_if_missing("bills", "total_amount", "REAL")
         add_column_if_missing("bills", "gst_amount", "REAL")
         add_column_if_missing("bills", "items_json", "TEXT")
+        add_column_if_missing("bills", "confidence", "REAL")
+        add_column_if_missing("bills", "structured_json", "TEXT")
+        add_column_if_missing("bills", "content_hash", "TEXT")
+        add_column_if_missing("bills", "processing_ms", "REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bills_content_hash ON bills(content_hash, user_id)")
+
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS bill_cache_stats (
+                   scope TEXT PRIMARY KEY,
+                   lookups INTEGER NOT NULL DEFAULT 0,
+                   hits INTEGER NOT NULL DEFAULT 0,
+                   saved_ms REAL NOT NULL DEFAULT 0
+               )"""
+        )
 
         # Entries table migrations (for GST ledger)
         add_column_if_missing("entries", "vendor_name", "TEXT")
@@ -147,6 +380,299 @@ def init_db(db_path: Path) -> None:
         add_column_if_missing("entries", "sgst_amount", "REAL")
         add_column_if_missing("entries", "igst_amount", "REAL")
 
+        # Per-user, per-day (UTC) totals of entries, kept current by triggers so
+        # dashboards aggregate O(days) rows instead of the whole history.
+        # rollup.py has the backfill and consistency check.
+        rollup_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entry_daily_rollup'"
+        ).fetchone()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entry_daily_rollup (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                entry_type TEXT NOT NULL,
+                amount REAL NOT NULL DEFAULT 0,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                taxable_amount REAL NOT NULL DEFAULT 0,
+                cgst_amount REAL NOT NULL DEFAULT 0,
+                sgst_amount REAL NOT NULL DEFAULT 0,
+                igst_amount REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day, entry_type)
+            ) WITHOUT ROWID;
+
+            CREATE TRIGGER IF NOT EXISTS trg_entries_rollup_insert AFTER INSERT ON entries
+            BEGIN
+                INSERT INTO entry_daily_rollup (user_id, day, entry_type, amount, entry_count,
+                                                taxable_amount, cgst_amount, sgst_amount, igst_amount)
+                VALUES (NEW.user_id, date(NEW.created_at), NEW.entry_type, NEW.amount, 1,
+                        COALESCE(NEW.taxable_amount, 0), COALESCE(NEW.cgst_amount, 0),
+                        COALESCE(NEW.sgst_amount, 0), COALESCE(NEW.igst_amount, 0))
+                ON CONFLICT(user_id, day, entry_type) DO UPDATE SET
+                    amount = amount + excluded.amount,
+                    entry_count = entry_count + 1,
+                    taxable_amount = taxable_amount + excluded.taxable_amount,
+                    cgst_amount = cgst_amount + excluded.cgst_amount,
+                    sgst_amount = sgst_amount + excluded.sgst_amount,
+                    igst_amount = igst_amount + excluded.igst_amount;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_entries_rollup_delete AFTER DELETE ON entries
+            BEGIN
+                UPDATE entry_daily_rollup SET
+                    amount = amount - OLD.amount,
+                    entry_count = entry_count - 1,
+                    taxable_amount = taxable_amount - COALESCE(OLD.taxable_amount, 0),
+                    cgst_amount = cgst_amount - COALESCE(OLD.cgst_amount, 0),
+                    sgst_amount = sgst_amount - COALESCE(OLD.sgst_amount, 0),
+                    igst_amount = igst_amount - COALESCE(OLD.igst_amount, 0)
+                WHERE user_id = OLD.user_id AND day = date(OLD.created_at) AND entry_type = OLD.entry_type;
+                DELETE FROM entry_daily_rollup
+                WHERE user_id = OLD.user_id AND day = date(OLD.created_at) AND entry_type = OLD.entry_type
+                  AND entry_count <= 0;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_entries_rollup_update
+            AFTER UPDATE OF user_id, entry_type, amount, created_at,
+                            taxable_amount, cgst_amount, sgst_amount, igst_amount ON entries
+            BEGIN
+                UPDATE entry_daily_rollup SET
+                    amount = amount - OLD.amount,
+                    entry_count = entry_count - 1,
+                    taxable_amount = taxable_amount - COALESCE(OLD.taxable_amount, 0),
+                    cgst_amount = cgst_amount - COALESCE(OLD.cgst_amount, 0),
+                    sgst_amount = sgst_amount - COALESCE(OLD.sgst_amount, 0),
+                    igst_amount = igst_amount - COALESCE(OLD.igst_amount, 0)
+                WHERE user_id = OLD.user_id AND day = date(OLD.created_at) AND entry_type = OLD.entry_type;
+                DELETE FROM entry_daily_rollup
+                WHERE user_id = OLD.user_id AND day = date(OLD.created_at) AND entry_type = OLD.entry_type
+                  AND entry_count <= 0;
+                INSERT INTO entry_daily_rollup (user_id, day, entry_type, amount, entry_count,
+                                                taxable_amount, cgst_amount, sgst_amount, igst_amount)
+                VALUES (NEW.user_id, date(NEW.created_at), NEW.entry_type, NEW.amount, 1,
+                        COALESCE(NEW.taxable_amount, 0), COALESCE(NEW.cgst_amount, 0),
+                        COALESCE(NEW.sgst_amount, 0), COALESCE(NEW.igst_amount, 0))
+                ON CONFLICT(user_id, day, entry_type) DO UPDATE SET
+                    amount = amount + excluded.amount,
+                    entry_count = entry_count + 1,
+                    taxable_amount = taxable_amount + excluded.taxable_amount,
+                    cgst_amount = cgst_amount + excluded.cgst_amount,
+                    sgst_amount = sgst_amount + excluded.sgst_amount,
+                    igst_amount = igst_amount + excluded.igst_amount;
+            END;
+            """
+        )
+        if rollup_exists is None:
+            # First start with the rollup: seed it from the existing entries
+            rebuild_rollup(conn)
+
+        # Per-user, per-GST-month totals by vendor GSTIN, kept current by triggers
+        # so a month's or quarter's GST summary is a handful of primary-key reads
+        # (gst_report.py builds the reports).
+        gst_rollup_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'gst_period_rollup'"
+        ).fetchone()
+        conn.executescript(GST_ROLLUP_DDL)
+        if gst_rollup_exists is None:
+            rebuild_gst_rollup(conn)
+
+        # Listings page with ``WHERE user_id = ? AND id < ? ORDER BY id DESC``; the
+        # composite indexes above replace the old single-column ones.
+        conn.execute("DROP INDEX IF EXISTS idx_entries_user_id")
+        conn.execute("DROP INDEX IF EXISTS idx_bills_user_id")
+
+        # Full-text search (/api/search, see search.py): FTS5 indexes over bills and
+        # entries kept in sync by triggers, seeded on first start.
+        search_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bills_fts'"
+        ).fetchone()
+        try:
+            conn.executescript(SEARCH_DDL)
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: everything but /api/search still works
+            print(f"[ledgerly] full-text search disabled: {e}")
+        else:
+            if search_exists is None:
+                rebuild_search_index(conn)
+
+
+def gst_period_sql(row: str) -> str:
+    """SQL for an entry's GST month (``YYYY-MM``): its invoice date if that parses
+    (ISO, or DD/MM/YYYY as on e-invoices and most printed bills), else the UTC
+    month of ``created_at``."""
+    bill_date = f"{row}.bill_date"
+    return f"""(CASE
+        WHEN {bill_date} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+             AND substr({bill_date}, 6, 2) BETWEEN '01' AND '12'
+            THEN substr({bill_date}, 1, 7)
+        WHEN {bill_date} GLOB '[0-9][0-9][/-][0-9][0-9][/-][0-9][0-9][0-9][0-9]*'
+             AND substr({bill_date}, 4, 2) BETWEEN '01' AND '12'
+            THEN substr({bill_date}, 7, 4) || '-' || substr({bill_date}, 4, 2)
+        ELSE strftime('%Y-%m', {row}.created_at) END)"""
+
+
+def _gst_vendor_sql(row: str) -> str:
+    # '' groups entries without a GSTIN (unregistered vendors, cash sales)
+    return f"COALESCE(UPPER(TRIM({row}.vendor_gstin)), '')"
+
+
+def _gst_add_sql(row: str) -> str:
+    return f"""INSERT INTO gst_period_rollup (user_id, month, entry_type, vendor_gstin, vendor_name, entry_count,
+                                                 amount, taxable_amount, cgst_amount, sgst_amount, igst_amount)
+                VALUES ({row}.user_id, {gst_period_sql(row)}, {row}.entry_type, {_gst_vendor_sql(row)},
+                        {row}.vendor_name, 1, {row}.amount, COALESCE({row}.taxable_amount, 0),
+                        COALESCE({row}.cgst_amount, 0), COALESCE({row}.sgst_amount, 0),
+                        COALESCE({row}.igst_amount, 0))
+                ON CONFLICT(user_id, month, entry_type, vendor_gstin) DO UPDATE SET
+                    vendor_name = COALESCE(excluded.vendor_name, vendor_name),
+                    entry_count = entry_count + 1,
+                    amount = amount + excluded.amount,
+                    taxable_amount = taxable_amount + excluded.taxable_amount,
+                    cgst_amount = cgst_amount + excluded.cgst_amount,
+                    sgst_amount = sgst_amount + excluded.sgst_amount,
+                    igst_amount = igst_amount + excluded.igst_amount;"""
+
+
+def _gst_subtract_sql(row: str) -> str:
+    key = (f"user_id = {row}.user_id AND month = {gst_period_sql(row)} AND entry_type = {row}.entry_type"
+           f" AND vendor_gstin = {_gst_vendor_sql(row)}")
+    return f"""UPDATE gst_period_rollup SET
+                    entry_count = entry_count - 1,
+                    amount = amount - {row}.amount,
+                    taxable_amount = taxable_amount - COALESCE({row}.taxable_amount, 0),
+                    cgst_amount = cgst_amount - COALESCE({row}.cgst_amount, 0),
+                    sgst_amount = sgst_amount - COALESCE({row}.sgst_amount, 0),
+                    igst_amount = igst_amount - COALESCE({row}.igst_amount, 0)
+                WHERE {key};
+                DELETE FROM gst_period_rollup WHERE {key} AND entry_count <= 0;"""
+
+
+GST_ROLLUP_DDL = f"""
+    CREATE TABLE IF NOT EXISTS gst_period_rollup (
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        entry_type TEXT NOT NULL,
+        vendor_gstin TEXT NOT NULL,
+        vendor_name TEXT,
+        entry_count INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        taxable_amount REAL NOT NULL DEFAULT 0,
+        cgst_amount REAL NOT NULL DEFAULT 0,
+        sgst_amount REAL NOT NULL DEFAULT 0,
+        igst_amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, month, entry_type, vendor_gstin)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS gst_reports (
+        user_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        report_json TEXT NOT NULL,
+        generated_at TEXT NOT NULL DEFAULT (datetime('now')),
+        PRIMARY KEY (user_id, period),
+        FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_entries_gst_insert AFTER INSERT ON entries
+    BEGIN
+        {_gst_add_sql("NEW")}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_entries_gst_delete AFTER DELETE ON entries
+    BEGIN
+        {_gst_subtract_sql("OLD")}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_entries_gst_update
+    AFTER UPDATE OF user_id, entry_type, amount, created_at, vendor_name, vendor_gstin, bill_date,
+                    taxable_amount, cgst_amount, sgst_amount, igst_amount ON entries
+    BEGIN
+        {_gst_subtract_sql("OLD")}
+        {_gst_add_sql("NEW")}
+    END;
+"""
+
+
+# Table -> the text column indexed as ``body`` next to ``vendor_name``. The FTS
+# tables use the tables themselves as external content, through views that add
+# ``owner`` (``u<user_id>``), the token every search is scoped with.
+SEARCH_INDEXES = {"bills": "ocr_text", "entries": "note"}
+
+
+def _search_ddl(table: str, body: str) -> str:
+    fts = f"{table}_fts"
+    add = (f"INSERT INTO {fts} (rowid, vendor_name, body, owner) "
+           f"VALUES (NEW.id, NEW.vendor_name, NEW.{body}, 'u' || NEW.user_id);")
+    remove = (f"INSERT INTO {fts} ({fts}, rowid, vendor_name, body, owner) "
+              f"VALUES ('delete', OLD.id, OLD.vendor_name, OLD.{body}, 'u' || OLD.user_id);")
+    return f"""
+    CREATE VIEW IF NOT EXISTS {table}_search_source AS
+        SELECT id, vendor_name, {body} AS body, 'u' || user_id AS owner FROM {table};
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+        vendor_name, body, owner,
+        content='{table}_search_source', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table}
+    BEGIN
+        {add}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table}
+    BEGIN
+        {remove}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF user_id, vendor_name, {body} ON {table}
+    BEGIN
+        {remove}
+        {add}
+    END;
+"""
+
+
+SEARCH_DDL = "".join(_search_ddl(table, body) for table, body in SEARCH_INDEXES.items())
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> None:
+    """Re-read ``bills_fts`` and ``entries_fts`` from their tables."""
+    for table in SEARCH_INDEXES:
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+def rebuild_gst_rollup(conn: sqlite3.Connection, user_id: int | None = None) -> int:
+    """Recompute ``gst_period_rollup`` from ``entries`` (one user or all). Returns rows written."""
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM gst_period_rollup {where}", params)
+    cur = conn.execute(
+        f"""INSERT INTO gst_period_rollup (user_id, month, entry_type, vendor_gstin, vendor_name, entry_count,
+                                           amount, taxable_amount, cgst_amount, sgst_amount, igst_amount)
+            SELECT user_id, {gst_period_sql("entries")} AS month, entry_type, {_gst_vendor_sql("entries")} AS vendor,
+                   MAX(vendor_name), COUNT(*), TOTAL(amount), TOTAL(taxable_amount), TOTAL(cgst_amount),
+                   TOTAL(sgst_amount), TOTAL(igst_amount)
+            FROM entries {where}
+            GROUP BY user_id, month, entry_type, vendor""",
+        params,
+    )
+    return cur.rowcount
+
+
+def rebuild_rollup(conn: sqlite3.Connection, user_id: int | None = None) -> int:
+    """Recompute ``entry_daily_rollup`` from ``entries`` (one user or all). Returns rows written."""
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM entry_daily_rollup {where}", params)
+    cur = conn.execute(
+        f"""INSERT INTO entry_daily_rollup (user_id, day, entry_type, amount, entry_count,
+                                            taxable_amount, cgst_amount, sgst_amount, igst_amount)
+            SELECT user_id, date(created_at), entry_type, TOTAL(amount), COUNT(*),
+                   TOTAL(taxable_amount), TOTAL(cgst_amount), TOTAL(sgst_amount), TOTAL(igst_amount)
+            FROM entries {where}
+            GROUP BY user_id, date(created_at), entry_type""",
+        params,
+    )
+    return cur.rowcount
+
 
 def query_one(conn: sqlite3.Connection, sql: str, params: Iterable[Any] = ()) -> sqlite3.Row | None:
     cur = conn.execute(sql, tuple(params))
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine, Column, Integer, Float, String, Date, DateTime
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime
 import os
 
@@ -13,6 +14,13 @@ engine = create_engine(
 )
 
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+# Same database through aiosqlite, for the async FastAPI routes
+async_engine = create_async_engine(
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    echo=engine.echo
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -44,6 +52,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for async FastAPI routes"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 if __name__ == "__main__":
     # Run once to initialize database
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,82 @@
+"""
+GST e-invoice QR codes.
+
+B2B e-invoices registered with the IRP carry a QR code holding a signed JWT
+(RS256). Its ``data`` claim is a JSON string with the seller GSTIN, document
+number/date, total invoice value, item count and IRN. The payload is decoded
+offline; the NIC signature is not verified (its public key is not shipped
+with the app), so the fields are trusted as much as a clean read of the
+printed invoice, which is what they are.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import re
+
+_GSTIN_RE = re.compile(r"^\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]$")
+
+# Printed on every IRP-registered invoice: the IRN label, "e-Invoice", "Signed QR Code",
+# or the IRN itself (a 64-character SHA-256 hex digest)
+_EINVOICE_TEXT_RE = re.compile(r"\bIRN\b|\be-?invoice\b|\bsigned\s+qr\b|\b[0-9a-f]{64}\b", re.IGNORECASE)
+
+# Structured bill confidence for QR-derived fields (the regex fallback uses 0.2-0.35)
+QR_CONFIDENCE = 0.95
+
+
+def _b64url_json(segment: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+
+
+def looks_like_einvoice(text: str) -> bool:
+    """Whether a PDF's text layer shows the marks of a registered e-invoice."""
+    return _EINVOICE_TEXT_RE.search(text) is not None
+
+
+def parse_signed_qr(text: str) -> dict | None:
+    """Decoded ``data`` claim of an e-invoice QR JWT, or None for any other QR."""
+    parts = text.strip().split(".")
+    if len(parts) != 3:
+        return None
+    claims = _b64url_json(parts[1])
+    if not isinstance(claims, dict):
+        return None
+    data = claims.get("data")
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return None
+    if not isinstance(data, dict) or not _GSTIN_RE.match(str(data.get("SellerGstin", ""))):
+        return None
+    return data
+
+
+def bill_fields(payload: dict) -> dict:
+    """Map an e-invoice payload onto the structured bill keys."""
+    try:
+        total = float(payload["TotInvVal"]) if payload.get("TotInvVal") not in (None, "") else None
+    except (TypeError, ValueError):
+        total = None
+    return {
+        "vendor_gstin": payload["SellerGstin"],
+        "bill_number": payload.get("DocNo") or None,
+        "bill_date": payload.get("DocDt") or None,
+        "total_amount": total,
+        "irn": payload.get("Irn") or None,
+        "item_count": payload.get("ItemCnt"),
+        "main_hsn_code": payload.get("MainHsnCode") or None,
+    }
+
+
+def find_einvoice(qr_texts: list[str]) -> dict | None:
+    """Structured fields from the first e-invoice QR among ``qr_texts``."""
+    for text in qr_texts:
+        payload = parse_signed_qr(text)
+        if payload is not None:
+            return bill_fields(payload)
+    return None
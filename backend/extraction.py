@@ -0,0 +1,177 @@
+"""
+Regex extraction engine for OCR and voice text.
+
+All patterns are compiled once at import. ``extract`` walks the OCR text a
+single time with one combined token regex and returns every
+candidate amount, date, GSTIN and vendor line with its character offsets;
+callers pick the best candidate with the ``best_*`` helpers. Results are
+memoised per text, so the fallback extractor and the upload handler share
+one scan of the same OCR output.
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+
+# One combined token regex, run over ASCII-lowercased text (cheaper than
+# re.IGNORECASE on literal alternations). Tokens only start at a word start;
+# the lookahead lets the engine skip other positions quickly. Order matters:
+# at a given position the first alternative that matches wins, so
+# labelled/currency amounts are claimed before the bare-decimal fallback and
+# before their label word is seen as a plain keyword.
+_TOKEN_RE = re.compile(
+    rf"""
+    (?<![a-z0-9])(?=[\d₹rigstabdc])
+    (?:
+      (?P<gstin>\d\d[a-z]{{5}}\d{{4}}[a-z][1-9a-z]z[0-9a-z]\b)
+    | (?P<date>(?:\d{{4}}[-/]\d{{1,2}}[-/]\d{{1,2}}|\d{{1,2}}[-/]\d{{1,2}}[-/]\d{{2,4}})\b)
+    | (?P<decimal>\d[\d,]*\.\d\d\b)
+    | (?P<currency>(?:₹|rs\.?|inr)\s*(?P<currency_value>{_NUMBER}))
+    | (?P<labeled>(?P<amount_label>grand\s*total|sub\s*-?\s*total|total|amount)[:\s]*(?P<labeled_value>{_NUMBER}))
+    | (?P<keyword>invoice|bill|date|[csi]?gst|total|amount)
+    )
+    """,
+    re.VERBOSE,
+)
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+VENDOR_CANDIDATES = 5
+
+# Lower rank wins; ties go to the earliest position in the text.
+AMOUNT_PRIORITY = {
+    "currency": 0,
+    "grand_total": 1,
+    "total": 1,
+    "amount": 2,
+    "subtotal": 3,
+    "decimal": 4,
+}
+
+_VOICE_AMOUNT_RES = (
+    re.compile(r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:rupaye|rupees|rupiya|rs\.?|₹)"),  # 500 rupaye
+    re.compile(r"(?:rupaye|rupees|rupiya|rs\.?|₹)\s*(\d+(?:,\d+)*(?:\.\d+)?)"),  # rs 500
+    re.compile(r"(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:ka|ke|ki|mein|me|में)"),  # 500 ka (Hindi pattern)
+)
+_ANY_NUMBER_RE = re.compile(r"(\d+(?:,\d+)*(?:\.\d+)?)")
+_LABEL_SEPARATOR_RE = re.compile(r"[\s-]+")
+
+
+class Candidate(NamedTuple):
+    kind: str  # "amount" | "date" | "gstin" | "vendor"
+    value: float | str
+    start: int
+    end: int
+    label: str | None = None  # amount source: currency/total/grand_total/subtotal/amount/decimal
+
+
+@dataclass(frozen=True)
+class OcrExtraction:
+    amounts: tuple[Candidate, ...]
+    dates: tuple[Candidate, ...]
+    gstins: tuple[Candidate, ...]
+    vendor_lines: tuple[Candidate, ...]
+
+    def best_amount(self) -> float | None:
+        if not self.amounts:
+            return None
+        best = min(self.amounts, key=lambda c: (AMOUNT_PRIORITY.get(c.label or "", 9), c.start))
+        return float(best.value)
+
+    def best_date(self) -> str | None:
+        return str(self.dates[0].value) if self.dates else None
+
+    def best_gstin(self) -> str | None:
+        return str(self.gstins[0].value) if self.gstins else None
+
+    def best_vendor(self) -> str | None:
+        return str(self.vendor_lines[0].value) if self.vendor_lines else None
+
+
+def _parse_number(raw: str) -> float | None:
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _amount_label(raw: str) -> str:
+    label = _LABEL_SEPARATOR_RE.sub("", raw.lower())
+    return {"grandtotal": "grand_total", "subtotal": "subtotal"}.get(label, label)
+
+
+@lru_cache(maxsize=64)
+def extract(text: str) -> OcrExtraction:
+    """Scan OCR text once and return all field candidates with their offsets."""
+    folded = text.translate(_ASCII_LOWER)  # same length, so offsets map 1:1 onto ``text``
+    lines = text.split("\n")
+    line_starts = [0]
+    for line in lines[:-1]:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+
+    amounts: list[Candidate] = []
+    dates: list[Candidate] = []
+    gstins: list[Candidate] = []
+    keyword_lines: set[int] = set()
+
+    for m in _TOKEN_RE.finditer(folded):
+        kind = m.lastgroup
+        start, end = m.span()
+        if kind == "decimal":
+            value = _parse_number(m.group("decimal"))
+            if value is not None:
+                amounts.append(Candidate("amount", value, start, end, "decimal"))
+        elif kind == "currency":
+            value = _parse_number(m.group("currency_value"))
+            if value is not None:
+                amounts.append(Candidate("amount", value, start, end, "currency"))
+        elif kind == "labeled":
+            keyword_lines.add(bisect_right(line_starts, start) - 1)
+            value = _parse_number(m.group("labeled_value"))
+            if value is not None:
+                amounts.append(Candidate("amount", value, start, end, _amount_label(m.group("amount_label"))))
+        elif kind == "date":
+            dates.append(Candidate("date", text[start:end], start, end))
+        elif kind == "gstin":
+            gstins.append(Candidate("gstin", text[start:end].upper(), start, end))
+        else:
+            keyword_lines.add(bisect_right(line_starts, start) - 1)
+
+    # Vendor lines: non-empty lines that aren't obviously a label (the shop
+    # name sits in the header, so only the first few are kept)
+    vendors: list[Candidate] = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped and index not in keyword_lines:
+            start = line_starts[index] + len(line) - len(line.lstrip())
+            vendors.append(Candidate("vendor", stripped, start, start + len(stripped)))
+            if len(vendors) == VENDOR_CANDIDATES:
+                break
+
+    return OcrExtraction(tuple(amounts), tuple(dates), tuple(gstins), tuple(vendors))
+
+
+def voice_amount(transcript: str) -> float:
+    """Amount spoken in a (Hinglish) voice transcript; 0 if none found.
+
+    Prefers numbers next to a currency word ("500 rupaye", "rs 500", "500 ka"),
+    then falls back to the largest number mentioned.
+    """
+    text_lower = transcript.lower()
+    for pattern in _VOICE_AMOUNT_RES:
+        m = pattern.search(text_lower)
+        if m:
+            value = _parse_number(m.group(1))
+            if value is not None:
+                return value
+    numbers = [v for v in (_parse_number(n) for n in _ANY_NUMBER_RE.findall(transcript)) if v is not None]
+    return max(numbers) if numbers else 0
+
+
+def first_number(text: str) -> float | None:
+    m = _ANY_NUMBER_RE.search(text)
+    return _parse_number(m.group(1)) if m else None
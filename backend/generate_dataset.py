@@ -0,0 +1,399 @@
+"""
+Generate a production-sized synthetic dataset.
+
+Bulk-loads realistic shops into the Flask app's database (``users``,
+``business_profiles``, ``schedules``, ``bills`` and their ledger
+``entries``) and sales into the /ask API's database (``transactions``):
+
+- shop sizes are skewed (a few busy shops, a long tail of small ones),
+- entries and bills follow shop hours in IST and are stored in UTC like the
+  app does; every processed bill carries OCR text and creates its expense
+  entry with GST columns, as the upload pipeline would,
+- rows go in through batched ``executemany`` inside one transaction per
+  database, with the rollup and search index triggers suspended during the
+  load and everything they maintain rebuilt once at the end.
+
+Output is a function of ``--seed`` and ``--end`` only. Every generated user
+can log in as ``shop<N>@ledgerly.test`` / ``Ledgerly@123`` (bench_load.py
+uses them).
+
+    python generate_dataset.py --users 2000 --entries 2000000 --bills 200000
+    python generate_dataset.py --replace --entries 5000000 --transactions 3000000
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from bench_extraction import ITEMS, VENDORS, synthetic_bill
+from db import connect, default_db_path, init_db, rebuild_gst_rollup, rebuild_rollup, rebuild_search_index
+
+PASSWORD = "Ledgerly@123"
+EMAIL_DOMAIN = "ledgerly.test"
+IST_OFFSET = 5 * 3600 + 30 * 60  # seconds
+STAMP = "%Y-%m-%d %H:%M:%S"
+
+FIRST_NAMES = ["Ramesh", "Suresh", "Priya", "Anita", "Vikram", "Sunita", "Amit", "Neha", "Rajesh", "Kavita",
+               "Manoj", "Pooja", "Arjun", "Deepa", "Sanjay", "Meena", "Rahul", "Lakshmi", "Imran", "Farah"]
+SHOP_NAMES = ["Kirana Store", "Traders", "General Store", "Hardware", "Medicals", "Electricals",
+              "Textiles", "Dairy", "Sweets", "Mobile Point", "Stationers", "Agencies"]
+CITIES = ["Pune", "Mumbai", "Nagpur", "Indore", "Jaipur", "Lucknow", "Surat", "Nashik", "Bhopal", "Kanpur"]
+INCOME_NOTES = ["Sale - cash", "UPI payment received", "Card payment", "Counter sale", "Wholesale order",
+                "Voice entry: 2 kg atta becha", "Online order", "Credit recovered"]
+EXPENSE_NOTES = ["Rent", "Electricity bill", "Staff salary", "Transport", "Tea and snacks", "Packaging",
+                 "Supplier payment", "Phone recharge", "Shop maintenance"]
+SCHEDULE_TITLES = {
+    "capture": ["Capture supplier bills", "Scan week's receipts"],
+    "compliance": ["GSTR-1 filing", "GSTR-3B payment", "TDS deposit", "Renew trade licence"],
+    "meeting": ["Meet distributor", "Bank visit", "CA meeting"],
+    "other": ["Stock count", "Festival display setup", "Collect dues"],
+}
+PAYMENT_MODES = ("cash", "upi", "card")
+PAYMENT_WEIGHTS = (0.45, 0.42, 0.13)
+GST_RATES = (0.0, 0.05, 0.12, 0.18, 0.28)
+GST_WEIGHTS = (0.15, 0.30, 0.15, 0.35, 0.05)
+# Relative activity per IST hour (shops open ~9:00-21:30, peak in the evening)
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 1, 2, 5, 7, 8, 8, 7, 6, 6, 7, 8, 10, 11, 10, 7, 3, 1]
+
+
+class Loader:
+    """Buffers rows per table and writes them with ``executemany`` in ``batch_size`` chunks.
+
+    Tables are flushed together in the order they were declared, so parents
+    (users, bills) always land before the rows that reference them.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int) -> None:
+        self.conn = conn
+        self.batch_size = batch_size
+        self._sql: dict[str, str] = {}
+        self._rows: dict[str, list[tuple]] = {}
+        self.counts: dict[str, int] = {}
+
+    def table(self, name: str, columns: tuple[str, ...]) -> None:
+        self._sql[name] = f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        self._rows[name] = []
+        self.counts[name] = 0
+
+    def add(self, name: str, row: tuple) -> None:
+        rows = self._rows[name]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, rows in self._rows.items():
+            if rows:
+                self.conn.executemany(self._sql[table], rows)
+                self.counts[table] += len(rows)
+                rows.clear()
+
+
+def bulk_pragmas(conn: sqlite3.Connection) -> None:
+    # Durability is pointless for a throwaway load; a big page cache keeps the indexes in memory
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")
+
+
+def finish(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA optimize")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def split_counts(total: int, weights: list[float]) -> list[int]:
+    """Distribute ``total`` over ``weights`` with integer counts that add up exactly."""
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    by_remainder = sorted(range(len(weights)), key=lambda i: weights[i] * scale - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def shop_weights(users: int, rng: random.Random) -> list[float]:
+    # Log-normal: the busiest shops have a few hundred times the entries of the quietest
+    return [rng.lognormvariate(0, 1.2) for _ in range(users)]
+
+
+def random_stamps(rng: random.Random, count: int, start: date, end: date) -> list[int]:
+    """``count`` sorted UTC epoch seconds within shop hours (IST) between ``start`` and ``end``."""
+    first = (start - date(1970, 1, 1)).days
+    days = (end - start).days + 1
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+    random_ = rng.random
+    # Plain ints and time.strftime: datetime objects would dominate a multi-million-row load
+    return sorted((first + int(random_() * days)) * 86400 + hour * 3600 + int(random_() * 3600) - IST_OFFSET
+                  for hour in hours)
+
+
+def utc_stamp(ts: int) -> str:
+    return time.strftime(STAMP, time.gmtime(ts))
+
+
+def ist_date(ts: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts + IST_OFFSET))
+
+
+def gstin(rng: random.Random) -> str:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return (f"{rng.randint(10, 37)}{''.join(rng.choice(letters) for _ in range(5))}{rng.randint(1000, 9999)}"
+            f"{rng.choice(letters)}1Z{rng.choice('0123456789ABC')}")
+
+
+def bill_record(rng: random.Random, created: int, supplier: tuple[str, str] | None = None) -> tuple[dict, str]:
+    """Structured extraction and OCR text of one processed purchase bill (from ``(name, gstin)``)."""
+    text = synthetic_bill(rng)
+    lines = text.split("\n")
+    if supplier is not None:
+        lines[0], lines[2] = supplier[0].upper(), f"GSTIN: {supplier[1]}"
+        text = "\n".join(lines)
+    vendor = lines[0].title()
+    items = []
+    for line in lines[4:-5]:
+        parts = line.rsplit(None, 4)
+        if len(parts) == 5:
+            desc, hsn, qty, rate, amount = parts
+            items.append({"description": desc.strip(), "hsn_code": hsn, "quantity": int(qty),
+                          "rate": float(rate.replace(",", "")), "amount": float(amount.replace(",", ""))})
+    subtotal = round(sum(item["amount"] for item in items), 2)
+    interstate = rng.random() < 0.2
+    tax = round(subtotal * 0.18, 2)
+    structured = {
+        "vendor_name": vendor,
+        "vendor_gstin": lines[2].split(": ", 1)[-1],
+        "bill_number": lines[3].split()[2],
+        "bill_date": ist_date(created - rng.randint(0, 3) * 86400),
+        "items": items,
+        "subtotal": subtotal,
+        "cgst_amount": None if interstate else round(tax / 2, 2),
+        "sgst_amount": None if interstate else round(tax / 2, 2),
+        "igst_amount": tax if interstate else None,
+        "total_amount": round(subtotal + tax, 2),
+        "confidence": round(rng.uniform(0.75, 0.98), 2),
+        "text_source": "ocr",
+    }
+    return structured, text
+
+
+def generate_ledgerly(conn: sqlite3.Connection, args, rng: random.Random, start: date, end: date,
+                      password_hash: str) -> dict[str, int]:
+    user_base = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]
+    weights = shop_weights(args.users, rng)
+    bills_per_user = split_counts(args.bills, weights)
+    # Bills create their own expense entries; the rest are manual income/expense
+    manual_per_user = split_counts(max(0, args.entries - args.bills), weights)
+    schedules_per_user = split_counts(args.schedules, [1.0] * args.users)
+
+    loader = Loader(conn, args.batch_size)
+    loader.table("users", ("id", "username", "email", "password_hash", "created_at"))
+    loader.table("business_profiles", ("user_id", "business_name", "gstin", "business_type", "address", "phone",
+                                       "profile_completion_pct", "created_at", "updated_at"))
+    loader.table("schedules", ("user_id", "title", "description", "schedule_date", "schedule_time",
+                               "schedule_type", "location", "created_at", "updated_at"))
+    loader.table("bills", ("id", "user_id", "filename", "s3_key", "s3_url", "ocr_text", "detected_amount",
+                           "vendor_name", "bill_date", "total_amount", "gst_amount", "items_json", "confidence",
+                           "structured_json", "content_hash", "processing_ms", "status", "created_at"))
+    loader.table("entries", ("user_id", "entry_type", "amount", "note", "vendor_name", "vendor_gstin",
+                             "bill_number", "bill_date", "taxable_amount", "cgst_amount", "sgst_amount",
+                             "igst_amount", "created_at"))
+    bill_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM bills").fetchone()[0]
+
+    for index in range(args.users):
+        user_id = user_base + index + 1
+        joined = datetime.combine(start, datetime.min.time()) - timedelta(days=rng.randint(0, 60))
+        owner = rng.choice(FIRST_NAMES)
+        shop = f"{owner} {rng.choice(SHOP_NAMES)}"
+        city = rng.choice(CITIES)
+        loader.add("users", (user_id, owner, f"shop{user_id}@{EMAIL_DOMAIN}", password_hash, joined.strftime(STAMP)))
+        loader.add("business_profiles", (
+            user_id, shop, gstin(rng), rng.choice(("retail", "retail", "wholesale", "services", "other")),
+            f"{rng.randint(1, 999)}, Main Bazaar Road, {city}", f"9{rng.randint(100000000, 999999999)}",
+            rng.choice((40, 60, 80, 100)), joined.strftime(STAMP), joined.strftime(STAMP),
+        ))
+
+        for _ in range(schedules_per_user[index]):
+            kind = rng.choice(tuple(SCHEDULE_TITLES))
+            day = end + timedelta(days=rng.randint(-60, 30))
+            loader.add("schedules", (
+                user_id, rng.choice(SCHEDULE_TITLES[kind]), None, day.isoformat(),
+                f"{rng.randint(9, 19):02d}:{rng.choice(('00', '30'))}", kind, city,
+                joined.strftime(STAMP), joined.strftime(STAMP),
+            ))
+
+        # (created_at, entry row) for this shop, written in time order so ids follow created_at
+        timeline: list[tuple[int, tuple]] = []
+        # A shop buys from the same few suppliers, a handful of them most of the time
+        suppliers = [(rng.choice(VENDORS), gstin(rng)) for _ in range(rng.randint(5, 40))]
+        supplier_weights = [1 / (rank + 1) for rank in range(len(suppliers))]
+        for created in random_stamps(rng, bills_per_user[index], start, end):
+            bill_id += 1
+            structured, text = bill_record(rng, created, rng.choices(suppliers, supplier_weights)[0])
+            stamp = utc_stamp(created)
+            gst = sum(structured[k] or 0 for k in ("cgst_amount", "sgst_amount", "igst_amount"))
+            name = f"bill_{bill_id}.jpg"
+            loader.add("bills", (
+                bill_id, user_id, name, f"synthetic/{name}", f"/uploads/bills/{name}", text,
+                structured["total_amount"], structured["vendor_name"], structured["bill_date"],
+                structured["total_amount"], round(gst, 2), json.dumps(structured["items"]), structured["confidence"],
+                json.dumps(structured), hashlib.sha256(text.encode()).hexdigest(),
+                round(rng.lognormvariate(8.3, 0.4), 1), "done", stamp,
+            ))
+            timeline.append((created, (
+                user_id, "expense", structured["total_amount"], f"Bill from {structured['vendor_name']}",
+                structured["vendor_name"], structured["vendor_gstin"], structured["bill_number"],
+                structured["bill_date"], structured["subtotal"], structured["cgst_amount"],
+                structured["sgst_amount"], structured["igst_amount"], stamp,
+            )))
+        for created in random_stamps(rng, manual_per_user[index], start, end):
+            if rng.random() < 0.78:
+                row = (user_id, "income", round(rng.lognormvariate(6.5, 1.1), 2), rng.choice(INCOME_NOTES))
+            else:
+                row = (user_id, "expense", round(rng.lognormvariate(7.0, 1.2), 2), rng.choice(EXPENSE_NOTES))
+            timeline.append((created, row + (None,) * 8 + (utc_stamp(created),)))
+        timeline.sort(key=lambda item: item[0])
+        for _, row in timeline:
+            loader.add("entries", row)
+
+        if args.progress and (index + 1) % max(1, args.users // 10) == 0:
+            loader.flush()
+            print(f"  {index + 1}/{args.users} shops, {loader.counts['entries']:,} entries")
+
+    loader.flush()
+    return loader.counts
+
+
+TRANSACTIONS_DDL = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    amount FLOAT NOT NULL,
+    gst_amount FLOAT,
+    payment_mode VARCHAR,
+    description VARCHAR,
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS ix_transactions_id ON transactions (id);
+CREATE INDEX IF NOT EXISTS ix_transactions_date ON transactions (date);
+"""
+
+
+def transaction_rows(rng: random.Random, count: int, start: date, end: date) -> Iterator[tuple]:
+    descriptions = INCOME_NOTES + [f"{item} sale" for item in ITEMS] + [f"Order for {v}" for v in VENDORS]
+    for created in random_stamps(rng, count, start, end):
+        amount = round(rng.lognormvariate(6.8, 1.0), 2)
+        rate = rng.choices(GST_RATES, weights=GST_WEIGHTS)[0]
+        stamp = utc_stamp(created) + ".000000"  # SQLAlchemy's DateTime format
+        yield (ist_date(created), amount, round(amount * rate / (1 + rate), 2),
+               rng.choices(PAYMENT_MODES, weights=PAYMENT_WEIGHTS)[0], rng.choice(descriptions), stamp, stamp)
+
+
+def generate_transactions(conn: sqlite3.Connection, args, rng: random.Random, start: date, end: date) -> int:
+    conn.executescript(TRANSACTIONS_DDL)
+    loader = Loader(conn, args.batch_size)
+    loader.table("transactions", ("date", "amount", "gst_amount", "payment_mode", "description",
+                                  "created_at", "updated_at"))
+    conn.execute("BEGIN IMMEDIATE")
+    if args.replace:
+        conn.execute("DELETE FROM transactions")
+    for row in transaction_rows(rng, args.transactions, start, end):
+        loader.add("transactions", row)
+    loader.flush()
+    conn.execute("COMMIT")
+    return loader.counts["transactions"]
+
+
+def load_ledgerly(db_path: Path, args, rng: random.Random, start: date, end: date) -> dict[str, int]:
+    from werkzeug.security import generate_password_hash
+
+    init_db(db_path)
+    # One hash for everyone: hashing a million passwords would dominate the load
+    password_hash = generate_password_hash(PASSWORD)
+    conn = connect(db_path)
+    try:
+        bulk_pragmas(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        # Suspend the rollup and search index triggers (work per row) and rebuild them once at
+        # the end; it all happens in this transaction, so a failed load leaves the triggers in place
+        triggers = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('entries', 'bills')"
+        ).fetchall()
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER "{name}"')
+        if args.replace:
+            # Cascades to their entries, bills, jobs, schedules and profiles
+            conn.execute("DELETE FROM users WHERE email LIKE ?", (f"%@{EMAIL_DOMAIN}",))
+        counts = generate_ledgerly(conn, args, rng, start, end, password_hash)
+        if args.progress:
+            print("  rebuilding entry_daily_rollup, gst_period_rollup and the search indexes")
+        counts["entry_daily_rollup"] = rebuild_rollup(conn)
+        counts["gst_period_rollup"] = rebuild_gst_rollup(conn)
+        rebuild_search_index(conn)
+        for _, sql in triggers:
+            conn.execute(sql)
+        conn.execute("COMMIT")
+        finish(conn)
+    finally:
+        conn.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=Path(os.environ.get("LEDGERLY_DB_PATH", str(default_db_path()))),
+                        help="Flask app database (default: LEDGERLY_DB_PATH or backend/ledgerly.db)")
+    parser.add_argument("--ledger-db", type=Path, default=Path("ledger.db"),
+                        help="/ask API database (main.py opens ./ledger.db)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--entries", type=int, default=1_000_000, help="ledger entries, including bill expenses")
+    parser.add_argument("--bills", type=int, default=100_000)
+    parser.add_argument("--schedules", type=int, default=20_000)
+    parser.add_argument("--transactions", type=int, default=1_000_000, help="rows for ledger.db (0 = skip)")
+    parser.add_argument("--days", type=int, default=730, help="history length")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="last day of history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--replace", action="store_true",
+                        help="first delete previously generated shops and their data (and all ledger.db transactions)")
+    parser.add_argument("--quiet", dest="progress", action="store_false")
+    args = parser.parse_args()
+    if args.users < 1 or args.bills > args.entries:
+        parser.error("need at least one user, and --bills cannot exceed --entries")
+
+    start = args.end - timedelta(days=args.days - 1)
+    print(f"[ledgerly] seed {args.seed}, history {start} .. {args.end}")
+
+    started = time.perf_counter()
+    counts = load_ledgerly(args.db, args, random.Random(args.seed), start, args.end)
+    elapsed = time.perf_counter() - started
+    rows = sum(v for k, v in counts.items() if not k.endswith("_rollup"))
+    print(f"[ledgerly] {args.db}: " + ", ".join(f"{v:,} {k}" for k, v in counts.items())
+          + f" in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)")
+
+    if args.transactions:
+        started = time.perf_counter()
+        conn = sqlite3.connect(args.ledger_db, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            bulk_pragmas(conn)
+            # Separate RNG stream so --transactions doesn't change the ledgerly.db data
+            count = generate_transactions(conn, args, random.Random(f"{args.seed}:transactions"), start, args.end)
+            finish(conn)
+        finally:
+            conn.close()
+        elapsed = time.perf_counter() - started
+        print(f"[ledgerly] {args.ledger_db}: {count:,} transactions in {elapsed:.1f} s ({count / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+GST summaries (GSTR-3B style) for a month or a quarter.
+
+Reports read ``gst_period_rollup``, the per-user, per-month totals by vendor
+GSTIN that triggers on ``entries`` keep current (see db.init_db), so a
+quarter is three months of primary-key reads however long the ledger is.
+A month is the invoice's (``bill_date``), falling back to when the entry
+was recorded. Periods are ``YYYY-MM`` or a financial-year quarter,
+``2024-25-Q1`` (April-June 2024) to ``2024-25-Q4`` (January-March 2025).
+
+The nightly batch stores each shop's reports in ``gst_reports``:
+
+    python gst_report.py build                      # this and last month and quarter, every shop
+    python gst_report.py build --period 2024-25-Q4 [--user-id N]
+    python gst_report.py backfill [--user-id N]     # rebuild gst_period_rollup from entries
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+
+from db import default_db_path, get_pool, init_db, query_all, query_one, rebuild_gst_rollup
+
+TAX_HEADS = ("cgst_amount", "sgst_amount", "igst_amount")
+SUM_COLUMNS = ("entry_count", "amount", "taxable_amount", *TAX_HEADS)
+# Expenses are inward supplies (input tax credit), income outward supplies
+SECTIONS = {"expense": "inward", "income": "outward"}
+_MONTH_RE = re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$")
+_QUARTER_RE = re.compile(r"^(?:FY)?(\d{4})-(\d{2})-Q([1-4])$", re.IGNORECASE)
+USERS_PER_TRANSACTION = 100
+
+
+def period_months(period: str) -> list[str]:
+    """The ``YYYY-MM`` months of a period; raises ValueError."""
+    period = period.strip()
+    if _MONTH_RE.match(period):
+        return [period]
+    m = _QUARTER_RE.match(period)
+    if not m or int(m.group(2)) != (int(m.group(1)) + 1) % 100:
+        raise ValueError("period must be YYYY-MM or a financial-year quarter like 2024-25-Q1")
+    start_year, quarter = int(m.group(1)), int(m.group(3))
+    first = 4 + 3 * (quarter - 1)  # Q1 starts in April
+    return [f"{start_year + (month - 1) // 12}-{(month - 1) % 12 + 1:02d}" for month in range(first, first + 3)]
+
+
+def quarter_of(day: date) -> str:
+    start_year = day.year if day.month >= 4 else day.year - 1
+    return f"{start_year}-{(start_year + 1) % 100:02d}-Q{(day.month - 4) % 12 // 3 + 1}"
+
+
+def default_periods(today: date) -> list[str]:
+    """This and last month and quarter: late bills still land in the previous period."""
+    last_month = date(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1)
+    quarter_start = date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+    last_quarter_day = date(quarter_start.year - (quarter_start.month == 1), (quarter_start.month - 2) % 12 + 1, 1)
+    periods = [today.strftime("%Y-%m"), last_month.strftime("%Y-%m"), quarter_of(today), quarter_of(last_quarter_day)]
+    return list(dict.fromkeys(periods))
+
+
+def _zero() -> dict:
+    return dict.fromkeys(SUM_COLUMNS, 0.0)
+
+
+def _add(totals: dict, row) -> None:
+    for column in SUM_COLUMNS:
+        totals[column] += row[column]
+
+
+def _rounded(totals: dict) -> dict:
+    out = {column: round(value, 2) for column, value in totals.items()}
+    out["entry_count"] = int(totals["entry_count"])
+    out["total_tax"] = round(sum(totals[head] for head in TAX_HEADS), 2)
+    return out
+
+
+def gst_summary(conn: sqlite3.Connection, user_id: int, period: str) -> dict:
+    """Totals, per-month tax heads and per-vendor-GSTIN breakdown, for inward and outward supplies."""
+    months = period_months(period)
+    rows = query_all(
+        conn,
+        """SELECT month, entry_type, vendor_gstin, vendor_name, entry_count, amount,
+                  taxable_amount, cgst_amount, sgst_amount, igst_amount
+           FROM gst_period_rollup
+           WHERE user_id = ? AND month >= ? AND month <= ?
+           ORDER BY month""",
+        (user_id, months[0], months[-1]),
+    )
+    sections = {
+        entry_type: {"totals": _zero(), "by_month": {month: _zero() for month in months},
+                     "vendors": {}, "names": {}, "unregistered": _zero()}
+        for entry_type in SECTIONS
+    }
+    for row in rows:
+        section = sections[row["entry_type"]]
+        _add(section["totals"], row)
+        _add(section["by_month"][row["month"]], row)
+        gstin = row["vendor_gstin"]
+        if not gstin:
+            _add(section["unregistered"], row)
+            continue
+        _add(section["vendors"].setdefault(gstin, _zero()), row)
+        if row["vendor_name"]:
+            section["names"][gstin] = row["vendor_name"]  # months ascend: the latest name wins
+
+    report = {"period": period, "months": months}
+    for entry_type, name in SECTIONS.items():
+        section = sections[entry_type]
+        by_vendor = [{"vendor_gstin": gstin, "vendor_name": section["names"].get(gstin), **_rounded(totals)}
+                     for gstin, totals in section["vendors"].items()]
+        by_vendor.sort(key=lambda v: (-v["total_tax"], v["vendor_gstin"]))
+        report[name] = {
+            "totals": _rounded(section["totals"]),
+            "by_month": [{"month": month, **_rounded(totals)} for month, totals in section["by_month"].items()],
+            "by_vendor": by_vendor,
+            "unregistered": _rounded(section["unregistered"]),
+        }
+    report["net_tax_payable"] = round(report["outward"]["totals"]["total_tax"] - report["inward"]["totals"]["total_tax"], 2)
+    return report
+
+
+def store_report(conn: sqlite3.Connection, user_id: int, period: str, report: dict) -> None:
+    conn.execute(
+        """INSERT INTO gst_reports (user_id, period, report_json, generated_at) VALUES (?, ?, ?, datetime('now'))
+           ON CONFLICT(user_id, period) DO UPDATE SET
+               report_json = excluded.report_json, generated_at = excluded.generated_at""",
+        (user_id, period, json.dumps(report, separators=(",", ":"))),
+    )
+
+
+def stored_report(conn: sqlite3.Connection, user_id: int, period: str) -> dict | None:
+    row = query_one(conn, "SELECT report_json, generated_at FROM gst_reports WHERE user_id = ? AND period = ?",
+                    (user_id, period))
+    if row is None:
+        return None
+    return {**json.loads(row["report_json"]), "generated_at": row["generated_at"]}
+
+
+def build_reports(pool, periods: list[str], user_id: int | None = None) -> int:
+    """Store ``periods`` for every shop with entries in them (or one); returns reports written."""
+    written = 0
+    for period in periods:
+        months = period_months(period)
+        with pool.connection() as conn:
+            if user_id is not None:
+                users = [user_id]
+            else:
+                users = [r["user_id"] for r in query_all(
+                    conn, "SELECT DISTINCT user_id FROM gst_period_rollup WHERE month >= ? AND month <= ?",
+                    (months[0], months[-1]))]
+        for start in range(0, len(users), USERS_PER_TRANSACTION):
+            with pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for user in users[start:start + USERS_PER_TRANSACTION]:
+                    store_report(conn, user, period, gst_summary(conn, user, period))
+                    written += 1
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "backfill"])
+    parser.add_argument("--period", action="append", help="YYYY-MM or 2024-25-Q1 (repeatable; default: "
+                                                          "this and last month and quarter)")
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args()
+
+    db_path = Path(os.environ.get("LEDGERLY_DB_PATH", str(default_db_path())))
+    init_db(db_path)
+    pool = get_pool(db_path)
+    started = time.perf_counter()
+    if args.command == "backfill":
+        with pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = rebuild_gst_rollup(conn, args.user_id)
+        print(f"[ledgerly] GST rollup rebuilt: {rows} row(s) in {time.perf_counter() - started:.1f} s")
+        return
+
+    periods = args.period or default_periods(date.today())
+    try:
+        for period in periods:
+            period_months(period)
+    except ValueError as e:
+        parser.error(str(e))
+    written = build_reports(pool, periods, args.user_id)
+    print(f"[ledgerly] {written} GST report(s) for {', '.join(periods)} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
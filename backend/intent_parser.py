@@ -0,0 +1,255 @@
+"""
+Local intent parser for /ask.
+
+Recognises the everyday Hinglish/English questions listed in the OpenAI
+system prompt ("aaj ka sale", "kal ka galla", "UPI se kitna", "GST kitna
+laga", "last 7 days", "payment mode wise") and builds the same
+``{sql, chart, title}`` answer from templates, without a network round-trip.
+
+A question only matches when every word is understood (a known keyword or a
+filler word); anything else returns None and goes to OpenAI, so a partial
+match never produces a wrong answer.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+# Spelling / transliteration variants folded onto one canonical token
+_FOLD = {
+    "aaj": "today", "aj": "today", "aja": "today", "today": "today", "todays": "today", "आज": "today",
+    "kal": "yesterday", "kl": "yesterday", "kall": "yesterday", "yesterday": "yesterday",
+    "yesterdays": "yesterday", "कल": "yesterday",
+    "parso": "daybefore", "parson": "daybefore", "parsoon": "daybefore", "परसों": "daybefore",
+    "sale": "sales", "sales": "sales", "sell": "sales", "bikri": "sales", "bikree": "sales",
+    "galla": "sales", "gala": "sales", "gallah": "sales", "galle": "sales", "revenue": "sales",
+    "kamai": "sales", "income": "sales", "collection": "sales", "amount": "sales", "बिक्री": "sales",
+    "gst": "gst", "tax": "gst", "taxes": "gst", "jst": "gst",
+    "cash": "cash", "nakad": "cash", "naqad": "cash", "nagad": "cash", "कैश": "cash",
+    "upi": "upi", "gpay": "upi", "phonepe": "upi", "paytm": "upi", "online": "upi",
+    "card": "card", "cards": "card", "debit": "card", "credit": "card",
+    "transactions": "count", "transaction": "count", "entries": "count", "bills": "count", "count": "count",
+    "average": "average", "avg": "average", "ausat": "average", "aust": "average",
+    "kitna": "howmuch", "kitne": "howmuch", "kitni": "howmuch", "ktna": "howmuch", "kitnaa": "howmuch",
+    "total": "howmuch", "sum": "howmuch", "kul": "howmuch", "much": "howmuch", "many": "howmuch",
+    "कितना": "howmuch",
+    "daily": "byday", "datewise": "byday", "daywise": "byday", "trend": "byday", "trends": "byday",
+    "modewise": "bymode", "breakdown": "bymode",
+}
+
+# Words that carry no meaning for the query
+_FILLER = {
+    "ka", "ki", "ke", "ko", "me", "mein", "mai", "main", "se", "par", "pe", "hua", "hui", "hue", "huya",
+    "tha", "thi", "the", "hai", "hain", "kya", "kaisa", "batao", "bata", "btao", "dikhao", "dikha",
+    "show", "tell", "give", "get", "what", "whats", "was", "is", "are", "how", "of", "in", "for", "by",
+    "my", "mera", "meri", "mere", "hamara", "humara", "de", "do", "dena", "please", "pls", "plz",
+    "laga", "lagi", "lage", "mila", "mili", "aaya", "aya", "aayi", "collected", "received", "paid",
+    "payment", "payments", "mode", "modes", "wise", "se", "via", "through", "a", "an", "all", "sab",
+    "bhai", "ji", "yaar", "ledger", "dukan", "shop", "overall", "so", "far", "ab", "tak", "abhi",
+    "का", "की", "के", "में", "है", "हुआ",
+}
+
+# cache_key drops only politeness words, Hindi particles and auxiliaries: a word that can change
+# which rows or which total a question means ("paid", "received", "by", "via", "se", "tak") stays
+_KEY_STOPWORDS = {
+    "ka", "ki", "ke", "ko", "me", "mein", "mai", "hai", "hain", "tha", "thi", "the", "hua", "hui", "hue",
+    "huya", "kya", "batao", "bata", "btao", "dikhao", "dikha", "show", "tell", "give", "what", "whats", "how",
+    "is", "are", "was", "a", "an", "my", "mera", "meri", "mere", "please", "pls", "plz", "bhai", "ji", "yaar",
+    "का", "की", "के", "में", "है", "हुआ",
+}
+# Variants that only need folding in the cache key (parse_question treats them as filler)
+_KEY_FOLD = {
+    "paid": "paid", "pay": "paid", "diya": "paid", "diye": "paid", "di": "paid", "chukaya": "paid",
+    "received": "received", "receive": "received", "mila": "received", "mili": "received", "mile": "received",
+    "aaya": "received", "aya": "received", "aayi": "received",
+}
+
+_PHRASES = (
+    # (pattern on the normalised question, slot, value)
+    (re.compile(r"\b(?:last|past|pichle|pichhle|pichla|pichhla|previous)\s+(\d{1,3})\s+(?:days?|din|dino|dinon)\b"), "period", "last_n"),
+    (re.compile(r"\b(?:last|past|pichle|pichhle|pichla)\s+(?:week|hafte|hafta|saptah)\b|\bweekly\b"), "period", "last_7"),
+    (re.compile(r"\b(?:this|is|iss)\s+(?:week|hafte|hafta)\b"), "period", "this_week"),
+    (re.compile(r"\b(?:last|pichle|pichhle|pichla|previous)\s+(?:month|mahine|mahina)\b"), "period", "last_month"),
+    (re.compile(r"\b(?:this|is|iss)\s+(?:month|mahine|mahina)\b"), "period", "this_month"),
+    (re.compile(r"\b(?:payment\s+)?mode\s+wise\b|\bby\s+(?:payment\s+)?mode\b|\bmode\s+breakdown\b"), "breakdown", "mode"),
+    (re.compile(r"\b(?:day|date|din)\s+wise\b|\bper\s+day\b|\bby\s+(?:day|date)\b|\broz\s+ka\b"), "breakdown", "day"),
+    (re.compile(r"\bday\s+before\s+yesterday\b"), "period", "daybefore"),
+)
+
+_PERIOD_TOKENS = {"today", "yesterday", "daybefore"}
+_MODE_TOKENS = {"cash", "upi", "card"}
+_METRICS = {
+    "sales": ("SUM(amount)", "Sales"),
+    "gst": ("SUM(gst_amount)", "GST Collected"),
+    "count": ("COUNT(*)", "Transactions"),
+    "average": ("AVG(amount)", "Average Sale"),
+}
+_PERIOD_SQL = {
+    "today": ("date = date('now')", "Today"),
+    "yesterday": ("date = date('now', '-1 day')", "Yesterday"),
+    "daybefore": ("date = date('now', '-2 days')", "Day Before Yesterday"),
+    "this_week": ("date >= date('now', '-6 days', 'weekday 1')", "This Week"),
+    "this_month": ("strftime('%Y-%m', date) = strftime('%Y-%m', 'now')", "This Month"),
+    "last_month": ("strftime('%Y-%m', date) = strftime('%Y-%m', 'now', 'start of month', '-1 month')", "Last Month"),
+}
+_MULTI_DAY = {"last_n", "this_week", "this_month", "last_month"}
+_NON_WORD_RE = re.compile(r"[^\w\s\u0900-\u097f]+")  # keep Devanagari vowel signs
+MAX_DAYS = 366
+
+
+def normalize(question: str) -> str:
+    """Lowercase, strip punctuation/accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _NON_WORD_RE.sub(" ", text.replace("'s", "s"))
+    return " ".join(text.split())
+
+
+def cache_key(question: str) -> str:
+    """Normalised question with spelling variants folded and particles dropped.
+
+    "Kal ka galla?" and "kal ki bikri" share a key, so ask_cache reuses one
+    OpenAI answer for both; "how much paid" and "how much received" do not,
+    and "payment mode wise" becomes ``bymode``. Empty for a question with
+    nothing but particles (not cached).
+    """
+    text = f" {normalize(question)} "
+    for pattern, slot, value in _PHRASES:
+        if slot == "breakdown":
+            text = pattern.sub(f" by{value} ", text)
+    return " ".join(_KEY_FOLD.get(word) or _FOLD.get(word, word)
+                    for word in text.split() if word not in _KEY_STOPWORDS)
+
+
+def parse_question(question: str) -> dict | None:
+    """``{sql, chart, title}`` for a recognised question, else None."""
+    text = f" {normalize(question)} "
+    slots: dict = {}
+
+    for pattern, slot, value in _PHRASES:
+        m = pattern.search(text)
+        if m is None:
+            continue
+        if slot in slots:
+            return None  # two periods or breakdowns: leave it to the model
+        if value == "last_n":
+            days = int(m.group(1))
+            if not 1 <= days <= MAX_DAYS:
+                return None
+            value = ("last_n", days)
+        elif value == "last_7":
+            value = ("last_n", 7)
+        slots[slot] = value
+        text = text[:m.start()] + " " + text[m.end():]
+
+    metric = None
+    explicit_total = False
+    for word in text.split():
+        token = _FOLD.get(word)
+        if token is None:
+            if word in _FILLER:
+                continue
+            return None  # unknown word: not a question we can answer from a template
+        if token in _PERIOD_TOKENS:
+            if slots.setdefault("period", token) != token:
+                return None
+        elif token in _MODE_TOKENS:
+            if slots.setdefault("mode", token) != token:
+                return None
+        elif token == "howmuch":
+            explicit_total = True
+        elif token == "byday":
+            slots.setdefault("breakdown", "day")
+        elif token == "bymode":
+            slots.setdefault("breakdown", "mode")
+        elif token == "sales" and metric is not None:
+            continue  # "GST on sales": sales is just context for the other metric
+        elif metric in (None, "sales", token):
+            metric = token
+        else:
+            return None
+
+    if not slots and metric is None:
+        return None
+    return _build(metric or "sales", slots, explicit_total)
+
+
+def _build(metric: str, slots: dict, explicit_total: bool) -> dict:
+    expr, metric_title = _METRICS[metric]
+    where, title_parts = [], []
+
+    period = slots.get("period")
+    if isinstance(period, tuple):
+        days = period[1]
+        where.append(f"date >= date('now', '-{days} days')")
+        period_title = f"Last {days} Days"
+        period_kind = "last_n"
+    elif period is not None:
+        clause, period_title = _PERIOD_SQL[period]
+        where.append(clause)
+        period_kind = period
+    else:
+        period_title, period_kind = None, None
+
+    mode = slots.get("mode")
+    if mode is not None:
+        where.append(f"payment_mode = '{mode}'")
+        metric_title = f"{mode.upper() if mode == 'upi' else mode.title()} {metric_title}"
+
+    breakdown = slots.get("breakdown")
+    # "Last 7 days" on its own is a trend question, "last 7 days ka total" is a number
+    if breakdown is None and period_kind in _MULTI_DAY and metric == "sales" and mode is None and not explicit_total:
+        breakdown = "day"
+
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    if breakdown == "mode":
+        sql = f"SELECT payment_mode, {expr} FROM transactions{where_sql} GROUP BY payment_mode ORDER BY 2 DESC"
+        chart, title = "bar", f"{metric_title} by Payment Mode"
+    elif breakdown == "day":
+        sql = f"SELECT date, {expr} FROM transactions{where_sql} GROUP BY date ORDER BY date"
+        chart, title = "line", f"Daily {metric_title}"
+    else:
+        sql = f"SELECT COALESCE({expr}, 0) FROM transactions{where_sql}" if metric != "count" else \
+              f"SELECT {expr} FROM transactions{where_sql}"
+        chart, title = "none", metric_title if period_title or mode or metric == "average" else f"Total {metric_title}"
+
+    title_parts.append(title)
+    if period_title:
+        title_parts.append(period_title)
+    return {"sql": sql, "chart": chart, "title": " — ".join(title_parts)}
+
+
+@dataclass
+class _SourceStats:
+    count: int = 0
+    total_ms: float = 0.0
+
+
+class IntentStats:
+    """Thread-safe counters: how many /ask questions were answered locally vs by OpenAI, and how fast."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sources: dict[str, _SourceStats] = {}
+
+    def record(self, source: str, elapsed_ms: float) -> None:
+        with self._lock:
+            stats = self._sources.setdefault(source, _SourceStats())
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            sources = {name: (s.count, s.total_ms) for name, s in self._sources.items()}
+        total = sum(count for count, _ in sources.values())
+        local = sources.get("local", (0, 0.0))[0]
+        return {
+            "questions": total,
+            "local_hits": local,
+            "hit_rate": round(local / total, 4) if total else 0.0,
+            "avg_ms": {name: round(ms / count, 3) for name, (count, ms) in sources.items() if count},
+        }
+
+
+stats = IntentStats()
@@ -0,0 +1,204 @@
+"""SQLite-backed durable job queue.
+
+Jobs live in the ``jobs`` table created by ``db.init_db``. A worker claims a
+job by leasing it for ``visibility_timeout`` seconds; if the worker dies the
+lease expires and another worker picks the job up again. Failed attempts are
+retried with exponential backoff until ``max_attempts`` is reached.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from db import exec_one, query_all, query_one
+
+KIND_PROCESS_BILL = "bill.process"
+
+DEFAULT_VISIBILITY_TIMEOUT = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 5.0
+# A bill younger than this may still be inside an inline upload or a dedup copy
+ORPHAN_GRACE_S = 1800.0
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+    max_attempts: int
+    bill_id: int | None
+
+
+def _row_to_job(row: sqlite3.Row) -> Job:
+    return Job(
+        id=int(row["id"]),
+        kind=row["kind"],
+        payload=json.loads(row["payload"] or "{}"),
+        attempts=int(row["attempts"]),
+        max_attempts=int(row["max_attempts"]),
+        bill_id=row["bill_id"],
+    )
+
+
+def enqueue(
+    conn: sqlite3.Connection,
+    kind: str,
+    payload: dict[str, Any],
+    bill_id: int | None = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    delay: float = 0.0,
+) -> int:
+    return exec_one(
+        conn,
+        """INSERT INTO jobs (kind, payload, bill_id, max_attempts, run_after)
+           VALUES (?, ?, ?, ?, ?)""",
+        (kind, json.dumps(payload), bill_id, max_attempts, time.time() + delay),
+    )
+
+
+def claim(
+    conn: sqlite3.Connection,
+    worker_id: str,
+    kinds: Iterable[str] | None = None,
+    visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+) -> Job | None:
+    """Lease the oldest runnable job (queued, or running with an expired lease)."""
+    now = time.time()
+    kind_filter = ""
+    params: list[Any] = [now, now]
+    if kinds:
+        kinds = list(kinds)
+        kind_filter = f" AND kind IN ({','.join('?' for _ in kinds)})"
+        params.extend(kinds)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = query_one(
+            conn,
+            f"""SELECT * FROM jobs
+                WHERE ((status = 'queued' AND run_after <= ?)
+                       OR (status = 'running' AND locked_until < ? AND attempts < max_attempts))
+                {kind_filter}
+                ORDER BY run_after, id
+                LIMIT 1""",
+            params,
+        )
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            """UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = ?,
+                   locked_until = ?, updated_at = datetime('now')
+               WHERE id = ?""",
+            (worker_id, now + visibility_timeout, row["id"]),
+        )
+        row = query_one(conn, "SELECT * FROM jobs WHERE id = ?", (row["id"],))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return _row_to_job(row)
+
+
+def heartbeat(
+    conn: sqlite3.Connection,
+    job_id: int,
+    worker_id: str,
+    visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    progress: str | None = None,
+) -> bool:
+    """Extend the lease (and optionally record a progress stage). False if the lease was lost."""
+    cur = conn.execute(
+        """UPDATE jobs SET locked_until = ?, progress = COALESCE(?, progress), updated_at = datetime('now')
+           WHERE id = ? AND locked_by = ? AND status = 'running'""",
+        (time.time() + visibility_timeout, progress, job_id, worker_id),
+    )
+    return cur.rowcount == 1
+
+
+def complete(conn: sqlite3.Connection, job_id: int, worker_id: str) -> None:
+    conn.execute(
+        """UPDATE jobs SET status = 'done', progress = 'done', locked_by = NULL, locked_until = NULL,
+               updated_at = datetime('now')
+           WHERE id = ? AND locked_by = ?""",
+        (job_id, worker_id),
+    )
+
+
+def fail(conn: sqlite3.Connection, job: Job, worker_id: str, error: str, retryable: bool = True) -> bool:
+    """Record a failed attempt. Returns True if the job was re-queued for another try."""
+    if retryable and job.attempts < job.max_attempts:
+        backoff = RETRY_BACKOFF_BASE * (2 ** (job.attempts - 1))
+        conn.execute(
+            """UPDATE jobs SET status = 'queued', run_after = ?, last_error = ?, locked_by = NULL,
+                   locked_until = NULL, updated_at = datetime('now')
+               WHERE id = ? AND locked_by = ?""",
+            (time.time() + backoff, error, job.id, worker_id),
+        )
+        return True
+    conn.execute(
+        """UPDATE jobs SET status = 'failed', last_error = ?, locked_by = NULL, locked_until = NULL,
+               updated_at = datetime('now')
+           WHERE id = ? AND locked_by = ?""",
+        (error, job.id, worker_id),
+    )
+    return False
+
+
+def reap_expired(conn: sqlite3.Connection) -> list[Job]:
+    """Fail jobs whose lease expired on their last allowed attempt; returns them."""
+    rows = query_all(
+        conn,
+        """SELECT * FROM jobs
+           WHERE status = 'running' AND locked_until < ? AND attempts >= max_attempts""",
+        (time.time(),),
+    )
+    for row in rows:
+        conn.execute(
+            """UPDATE jobs SET status = 'failed', last_error = COALESCE(last_error, 'lease_expired'),
+                   locked_by = NULL, locked_until = NULL, updated_at = datetime('now')
+               WHERE id = ? AND status = 'running'""",
+            (row["id"],),
+        )
+    return [_row_to_job(r) for r in rows]
+
+
+def recover_orphaned_bills(conn: sqlite3.Connection, grace_s: float = ORPHAN_GRACE_S) -> list[int]:
+    """Enqueue a processing job for every bill stuck in 'processing' with no job at all.
+
+    Covers bills left behind by a crash of the upload request (inline or
+    before the job row was written) and bills uploaded before the queue
+    existed. Only bills older than ``grace_s`` count: a newer one may still
+    be processed by the request that created it.
+    """
+    rows = query_all(
+        conn,
+        """SELECT b.id, b.user_id, b.s3_key FROM bills b
+           WHERE b.status = 'processing' AND b.created_at < datetime('now', ?)
+             AND NOT EXISTS (SELECT 1 FROM jobs j WHERE j.bill_id = b.id)""",
+        (f"-{int(grace_s)} seconds",),
+    )
+    recovered = []
+    for row in rows:
+        enqueue(
+            conn,
+            KIND_PROCESS_BILL,
+            {"bill_id": int(row["id"]), "user_id": int(row["user_id"]), "path": row["s3_key"]},
+            bill_id=int(row["id"]),
+        )
+        recovered.append(int(row["id"]))
+    return recovered
+
+
+def latest_for_bill(conn: sqlite3.Connection, bill_id: int) -> sqlite3.Row | None:
+    return query_one(
+        conn,
+        """SELECT id, status, attempts, max_attempts, progress, last_error, locked_until, updated_at
+           FROM jobs WHERE bill_id = ? ORDER BY id DESC LIMIT 1""",
+        (bill_id,),
+    )
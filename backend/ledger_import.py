@@ -0,0 +1,353 @@
+"""
+Bulk import of ledger entries from CSV or NDJSON (``POST /api/entries/import``).
+
+The upload is read as a stream: rows are parsed and validated one at a time
+and inserted in batches of ``IMPORT_BATCH_SIZE``, one transaction per
+batch, so memory stays flat whatever the file size. A bad row is reported
+(by line number) and skipped; the rest of the file still goes in. Columns are the ``entries`` ones:
+
+    entry_type,amount,note,created_at,vendor_name,vendor_gstin,bill_number,
+    bill_date,taxable_amount,cgst_amount,sgst_amount,igst_amount
+
+Only ``entry_type`` and ``amount`` are required. ``created_at`` and
+``bill_date`` take ``YYYY-MM-DD``, ``DD/MM/YYYY`` or an ISO timestamp; times
+without an offset are in the shop's timezone, and are stored as UTC.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone, tzinfo
+from typing import Iterable, Iterator
+
+IMPORT_BATCH_SIZE = 1000
+# Errors listed in the response; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+# A longer line is not a ledger row; stop rather than buffer it
+MAX_LINE_BYTES = 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+IMPORT_COLUMNS = (
+    "entry_type", "amount", "note", "created_at", "vendor_name", "vendor_gstin",
+    "bill_number", "bill_date", "taxable_amount", "cgst_amount", "sgst_amount", "igst_amount",
+)
+REQUIRED_COLUMNS = ("entry_type", "amount")
+COLUMN_ALIASES = {"type": "entry_type", "date": "created_at", "gstin": "vendor_gstin"}
+GST_AMOUNT_COLUMNS = ("taxable_amount", "cgst_amount", "sgst_amount", "igst_amount")
+# Spreadsheets run cells starting with these as formulas; ledger_export.py puts a
+# ' in front of such text cells, and csv_rows takes it off again
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+FORMATS = ("csv", "ndjson")
+_FORMAT_NAMES = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}
+_FORMAT_MIMETYPES = {
+    "text/csv": "csv", "application/csv": "csv",
+    "application/x-ndjson": "ndjson", "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson", "application/x-jsonlines": "ndjson",
+}
+_FORMAT_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}
+
+ENTRY_INSERT = f"INSERT INTO entries (user_id, {', '.join(IMPORT_COLUMNS)}) VALUES "
+_ENTRY_VALUES = f"(?{', ?' * len(IMPORT_COLUMNS)})"
+# Rows per INSERT statement, within SQLite's 32766 bound parameters. Multi-row
+# statements rather than executemany: the full-text index (entries_fts) writes
+# its pending terms out at every statement boundary, so one row per statement
+# costs a tiny index segment per row.
+ROWS_PER_STATEMENT = 500
+
+
+def insert_entries(conn, rows: list[tuple]) -> None:
+    """Insert ``(user_id, *IMPORT_COLUMNS)`` tuples, ``ROWS_PER_STATEMENT`` per statement."""
+    for start in range(0, len(rows), ROWS_PER_STATEMENT):
+        chunk = rows[start:start + ROWS_PER_STATEMENT]
+        conn.execute(ENTRY_INSERT + ", ".join([_ENTRY_VALUES] * len(chunk)),
+                     [value for row in chunk for value in row])
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; ``code`` matches the API's error codes."""
+
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def detect_format(requested: str | None, mimetype: str | None, filename: str | None) -> str:
+    """``csv`` or ``ndjson`` from ``?format=``, the Content-Type or the file extension."""
+    if requested:
+        fmt = _FORMAT_NAMES.get(requested.strip().lower())
+        if fmt is None:
+            raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+        return fmt
+    fmt = _FORMAT_MIMETYPES.get((mimetype or "").lower())
+    if fmt is None and filename and "." in filename:
+        fmt = _FORMAT_EXTENSIONS.get(filename.rsplit(".", 1)[1].lower())
+    if fmt is None:
+        raise ValueError("send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+    return fmt
+
+
+def iter_lines(stream) -> Iterator[str]:
+    """Decoded lines (with their ``\n``) from a binary stream, read in chunks."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        pending += decoder.decode(chunk or b"", final=not chunk)
+        start = 0
+        while (end := pending.find("\n", start)) != -1:
+            yield pending[start:end + 1]
+            start = end + 1
+        pending = pending[start:]
+        if not chunk:
+            if pending:
+                yield pending
+            return
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"a line is longer than {MAX_LINE_BYTES // 1024} KB")
+
+
+def _column(name: str) -> str | None:
+    key = name.strip().lower().replace(" ", "_")
+    key = COLUMN_ALIASES.get(key, key)
+    return key if key in IMPORT_COLUMNS else None
+
+
+def _unguard(cell: str) -> str:
+    """Undo the export's formula guard: ``'=2 bags`` is read back as ``=2 bags``."""
+    if cell[:1] == "'" and cell[1:2] in FORMULA_PREFIXES:
+        return cell[1:]
+    return cell
+
+
+def csv_rows(stream) -> tuple[Iterator[tuple[int, dict | RowError]], list[str]]:
+    """``(rows, ignored_columns)``; reads the header now and raises ValueError if it is unusable."""
+    reader = csv.reader(iter_lines(stream))
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ValueError("the file is empty") from None
+    columns = [_column(name) for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    ignored = [name for name, column in zip(header, columns) if column is None and name.strip()]
+
+    def rows() -> Iterator[tuple[int, dict | RowError]]:
+        for cells in reader:
+            if not any(cell.strip() for cell in cells):
+                continue
+            if len(cells) > len(columns):
+                yield reader.line_num, RowError("row_invalid", f"{len(cells)} cells but {len(columns)} columns")
+                continue
+            yield reader.line_num, {column: _unguard(cell) for column, cell in zip(columns, cells) if column}
+
+    return rows(), ignored
+
+
+def ndjson_rows(stream) -> Iterator[tuple[int, dict | RowError]]:
+    for line_no, line in enumerate(iter_lines(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, RowError("row_invalid", "not valid JSON")
+            continue
+        if not isinstance(record, dict):
+            yield line_no, RowError("row_invalid", "each line must be a JSON object")
+            continue
+        yield line_no, {column: value for key, value in record.items() if (column := _column(str(key)))}
+
+
+def _text(value) -> str | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _number(value, column: str) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise RowError(f"{column}_invalid", f"{column} must be a number")
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        text = str(value).strip().replace(",", "").removeprefix("₹").removeprefix("Rs.").strip()
+        if not text:
+            return None
+        try:
+            number = float(text)
+        except ValueError:
+            raise RowError(f"{column}_invalid", f"{column} must be a number, got {str(value)[:40]!r}") from None
+    if not math.isfinite(number):
+        raise RowError(f"{column}_invalid", f"{column} must be a finite number")
+    return number
+
+
+def _parse_date(text: str) -> date | None:
+    if len(text) == 10 and text[2] == "/" and text[5] == "/":  # DD/MM/YYYY
+        try:
+            return date(int(text[6:]), int(text[3:5]), int(text[:2]))
+        except ValueError:
+            return None
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _created_at(value, tz: tzinfo) -> str | None:
+    text = _text(value)
+    if text is None:
+        return None
+    day = _parse_date(text)
+    if day is not None:
+        moment = datetime.combine(day, datetime.min.time())
+    else:
+        try:
+            moment = datetime.fromisoformat(text)
+        except ValueError:
+            raise RowError("created_at_invalid", f"created_at must be a date or ISO timestamp, got {text[:40]!r}") from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=tz)
+    try:
+        return moment.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    except OverflowError:
+        raise RowError("created_at_invalid", "created_at is out of range") from None
+
+
+def entry_params(record: dict, tz: tzinfo) -> tuple:
+    """Validated values for ``IMPORT_COLUMNS`` (``created_at`` None = now); raises RowError."""
+    entry_type = (_text(record.get("entry_type")) or "").lower()
+    if entry_type not in ("income", "expense"):
+        raise RowError("entry_type_invalid", "entry_type must be income or expense")
+    amount = _number(record.get("amount"), "amount")
+    if amount is None:
+        raise RowError("amount_invalid", "amount is required")
+
+    gstin = _text(record.get("vendor_gstin"))
+    if gstin is not None:
+        gstin = gstin.upper()
+        if len(gstin) != 15 or not gstin.isalnum():
+            raise RowError("gstin_invalid", "GSTIN must be 15 alphanumeric characters")
+
+    bill_date = _text(record.get("bill_date"))
+    if bill_date is not None:
+        parsed = _parse_date(bill_date)
+        if parsed is None:
+            raise RowError("bill_date_invalid", "bill_date must be YYYY-MM-DD or DD/MM/YYYY")
+        bill_date = parsed.isoformat()
+
+    gst = {}
+    for column in GST_AMOUNT_COLUMNS:
+        gst[column] = _number(record.get(column), column)
+        if gst[column] is not None and gst[column] < 0:
+            raise RowError(f"{column}_invalid", f"{column} must not be negative")
+
+    return (
+        entry_type, amount, _text(record.get("note")), _created_at(record.get("created_at"), tz),
+        _text(record.get("vendor_name")), gstin, _text(record.get("bill_number")), bill_date,
+        gst["taxable_amount"], gst["cgst_amount"], gst["sgst_amount"], gst["igst_amount"],
+    )
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+    ignored_columns: list[str] = field(default_factory=list)
+    aborted: str | None = None
+
+    def add_error(self, line: int, error: RowError) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error.code, "message": str(error)})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "ignored_columns": self.ignored_columns,
+            "aborted": self.aborted,
+        }
+
+
+def import_entries(
+    pool,
+    user_id: int,
+    rows: Iterable[tuple[int, dict | RowError]],
+    tz: tzinfo,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    dry_run: bool = False,
+    result: ImportResult | None = None,
+) -> ImportResult:
+    """
+    Validate ``rows`` and insert the good ones for ``user_id``, one transaction
+    per batch (a connection is only checked out while a batch is written, not
+    while the upload trickles in). With ``dry_run`` nothing is written.
+    A stream that turns unreadable part-way (bad CSV quoting, an oversized
+    line) stops the import; batches already written stay, and ``aborted`` says why.
+    """
+    result = result or ImportResult()
+    batch: list[tuple] = []
+    now = None
+
+    def flush() -> None:
+        if not dry_run:
+            with pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                insert_entries(conn, batch)
+        result.imported += len(batch)
+        batch.clear()
+
+    try:
+        for line, record in rows:
+            result.rows += 1
+            if isinstance(record, RowError):
+                result.add_error(line, record)
+                continue
+            try:
+                params = entry_params(record, tz)
+            except RowError as e:
+                result.add_error(line, e)
+                continue
+            if params[3] is None:
+                now = now or datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                params = params[:3] + (now,) + params[4:]
+            batch.append((user_id, *params))
+            if len(batch) >= batch_size:
+                flush()
+    except (csv.Error, ValueError) as e:
+        result.aborted = str(e)
+    if batch:
+        flush()
+    return result
+
+
+def import_stream(
+    pool,
+    user_id: int,
+    stream,
+    fmt: str,
+    tz: tzinfo,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> ImportResult:
+    """Import a CSV or NDJSON byte stream; raises ValueError before writing anything if the CSV header is unusable."""
+    result = ImportResult()
+    if fmt == "csv":
+        rows, result.ignored_columns = csv_rows(stream)
+    else:
+        rows = ndjson_rows(stream)
+    return import_entries(pool, user_id, rows, tz, batch_size=batch_size, dry_run=dry_run, result=result)
@@ -1,14 +1,24 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from db_new import engine, SessionLocal, Transaction, Base, get_db
-from openai_helper import ask_openai
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from db_new import async_engine, engine, Transaction, Base, get_async_db
+from openai_helper import ask_openai, ask_openai_async
+from sql_sandbox import QueryRejected, QueryTimeout, SandboxError, SqlSandbox
+import ask_cache
+import intent_parser
+import metrics
 from datetime import date, datetime
+import asyncio
 import json
 import os
+import re
+import sqlite3
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,6 +40,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip JSON (/transactions lists every row) and static files above ~1 KB
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("LEDGERLY_COMPRESS_MIN_BYTES", "1024")))
+
+# Per-route latency, SQL per request and OpenAI usage at GET /metrics
+metrics.install_fastapi(app, "main")
+metrics.instrument_sqlalchemy(engine)
+metrics.instrument_sqlalchemy(async_engine.sync_engine)
+
 # Mount static files (serve frontend)
 frontend_path = Path(__file__).parent.parent
 try:
@@ -45,6 +63,19 @@ except Exception as e:
     print(f"Warning: Could not mount static files: {e}")
 
 
+# /ask calls OpenAI on the async client; LEDGERLY_ASK_ASYNC=0 uses the blocking
+# client on the threadpool instead (the old behaviour, for comparison)
+ASK_ASYNC = os.getenv("LEDGERLY_ASK_ASYNC", "1") != "0"
+
+# Model-generated SQL runs read-only, time-boxed and restricted to the transactions table
+sql_sandbox = SqlSandbox(
+    Path(engine.url.database),
+    tables=("transactions",),
+    time_budget_ms=float(os.getenv("LEDGERLY_ASK_TIME_BUDGET_MS", "2000")),
+    max_rows=int(os.getenv("LEDGERLY_ASK_MAX_ROWS", "1000")),
+)
+
+
 # Pydantic models
 class AskRequest(BaseModel):
     question: str
@@ -76,42 +107,65 @@ class QueryResponse(BaseModel):
     chart: str
     data: list = None
     sql: str = ""  # Include for debugging
+    source: str = "openai"  # "local" (intent_parser), "cache" (ask_cache) or "openai"
+    truncated: bool = False  # row cap hit, or the time budget ran out mid-result
+
+
+FORBIDDEN_SQL_RE = re.compile(
+    r"\b(delete|drop|update|insert|alter|create|truncate|exec|execute|pragma|vacuum|attach|detach)\b"
+)
 
 
 def validate_sql(sql: str):
-    """Prevent SQL injection by validating query"""
-    forbidden_keywords = [
-        "delete", "drop", "update", "insert", "alter", 
-        "create", "truncate", "exec", "execute", "pragma",
-        "vacuum", "attach", "detach"
-    ]
-    
+    """Cheap early rejection of non-SELECT queries; sql_sandbox enforces the real limits"""
     sql_lower = sql.lower().strip()
-    
-    # Check for forbidden keywords
-    for keyword in forbidden_keywords:
-        if keyword in sql_lower:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"SQL operation not allowed: {keyword}"
-            )
-    
-    # Must start with SELECT
-    if not sql_lower.startswith("select"):
+
+    # Whole words only, so columns such as created_at/updated_at pass
+    match = FORBIDDEN_SQL_RE.search(sql_lower)
+    if match:
+        raise HTTPException(
+            status_code=400,
+            detail=f"SQL operation not allowed: {match.group(1)}"
+        )
+
+    # Must be a SELECT (optionally behind a WITH clause)
+    if not sql_lower.startswith(("select", "with")):
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail="Only SELECT queries allowed"
         )
 
 
+def translate_with_openai(question: str) -> dict:
+    """Ask OpenAI for the query; only answers that pass validate_sql reach ask_cache"""
+    return checked_translation(ask_openai(question))
+
+
+async def translate_with_openai_async(question: str) -> dict:
+    """translate_with_openai on the async OpenAI client"""
+    return checked_translation(await ask_openai_async(question))
+
+
+def checked_translation(ai_response: dict) -> dict:
+    sql = (ai_response.get("sql") or "").strip()
+    if not sql:
+        raise HTTPException(status_code=400, detail="No SQL query generated")
+    validate_sql(sql)
+    return {
+        "sql": sql,
+        "chart": ai_response.get("chart", "none"),
+        "title": ai_response.get("title", "Query Result"),
+    }
+
+
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "version": "2.0.0"}
 
 
 @app.post("/ask", response_model=QueryResponse)
-def ask_question(req: AskRequest, db: Session = Depends(get_db)):
+async def ask_question(req: AskRequest):
     """
     Main endpoint: Convert natural language question to SQL and execute it.
     
@@ -125,8 +179,18 @@ def ask_question(req: AskRequest, db: Session = Depends(get_db)):
         if not req.question or len(req.question.strip()) == 0:
             raise HTTPException(status_code=400, detail="Question cannot be empty")
 
-        # Get AI-generated SQL query
-        ai_response = ask_openai(req.question)
+        # Everyday questions are answered from templates; the rest from the
+        # translation cache, and only cache misses go to OpenAI
+        started = time.perf_counter()
+        ai_response = intent_parser.parse_question(req.question)
+        source = "local"
+        if ai_response is None:
+            cache = ask_cache.get_cache()
+            if ASK_ASYNC:
+                ai_response, source = await cache.get_or_compute_async(req.question, translate_with_openai_async)
+            else:
+                ai_response, source = await run_in_threadpool(cache.get_or_compute, req.question, translate_with_openai)
+        intent_parser.stats.record(source, (time.perf_counter() - started) * 1000)
         sql = ai_response.get("sql", "").strip()
         
         if not sql:
@@ -135,15 +199,28 @@ def ask_question(req: AskRequest, db: Session = Depends(get_db)):
         # Validate SQL for safety
         validate_sql(sql)
 
-        # Execute query
-        result = db.execute(text(sql)).fetchall()
+        # Execute query in the sandbox; a timeout keeps the rows already fetched
+        truncated = False
+        query_started = time.perf_counter()
+        try:
+            query = await asyncio.to_thread(sql_sandbox.execute, sql)
+            result, truncated = query.rows, query.truncated
+        except QueryTimeout as e:
+            if not e.rows:
+                raise HTTPException(status_code=504, detail=str(e))
+            result, truncated = e.rows, True
+        except QueryRejected as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            # The sandbox has its own connection, outside the SQLAlchemy hooks
+            metrics.record_query(time.perf_counter() - query_started)
 
         # Format response based on chart type
         chart_type = ai_response.get("chart", "none")
         
         if chart_type == "none":
             # Single value response
-            value = float(result[0][0]) if result and len(result[0]) > 0 else 0
+            value = float(result[0][0] or 0) if result and len(result[0]) > 0 else 0
             data = None
         else:
             # Chart data (multiple rows with label and value)
@@ -162,22 +239,31 @@ def ask_question(req: AskRequest, db: Session = Depends(get_db)):
             value=value,
             chart=chart_type,
             data=data,
-            sql=sql  # Include for debugging
+            sql=sql,  # Include for debugging
+            source=source,
+            truncated=truncated
         )
 
     except HTTPException as e:
         raise e
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"Invalid JSON from AI: {str(e)}")
-    except ValueError as e:
+    except (ValueError, SandboxError, sqlite3.DatabaseError) as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error in /ask endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Query execution failed: {str(e)}")
 
 
+@app.get("/ask/stats")
+async def ask_stats():
+    """How /ask questions were answered (local parser, cache, OpenAI) and average time to a query per source"""
+    cache_stats = await asyncio.to_thread(ask_cache.get_cache().stats)
+    return {**intent_parser.stats.snapshot(), "cache": cache_stats}
+
+
 @app.post("/transactions", response_model=TransactionResponse)
-def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_db)):
+async def create_transaction(transaction: TransactionCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new transaction"""
     try:
         db_transaction = Transaction(
@@ -188,63 +274,63 @@ def create_transaction(transaction: TransactionCreate, db: Session = Depends(get
             description=transaction.description
         )
         db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
+        await db.commit()
+        await db.refresh(db_transaction)
         return db_transaction
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/transactions", response_model=list[TransactionResponse])
-def get_transactions(db: Session = Depends(get_db)):
+async def get_transactions(db: AsyncSession = Depends(get_async_db)):
     """Get all transactions"""
-    transactions = db.query(Transaction).order_by(Transaction.date.desc()).all()
-    return transactions
+    transactions = await db.scalars(select(Transaction).order_by(Transaction.date.desc()))
+    return transactions.all()
 
 
 @app.get("/transactions/date/{transaction_date}", response_model=list[TransactionResponse])
-def get_transactions_by_date(transaction_date: date, db: Session = Depends(get_db)):
+async def get_transactions_by_date(transaction_date: date, db: AsyncSession = Depends(get_async_db)):
     """Get transactions by date"""
-    transactions = db.query(Transaction).filter(
+    transactions = await db.scalars(select(Transaction).where(
         Transaction.date == transaction_date
-    ).all()
-    return transactions
+    ))
+    return transactions.all()
 
 
 @app.delete("/transactions/{transaction_id}")
-def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
+async def delete_transaction(transaction_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a transaction"""
-    transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    transaction = await db.get(Transaction, transaction_id)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    
-    db.delete(transaction)
-    db.commit()
+
+    await db.delete(transaction)
+    await db.commit()
     return {"message": "Transaction deleted successfully"}
 
 
 @app.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
     """Get overall statistics"""
     try:
         # Total transactions
-        total_transactions = db.query(Transaction).count()
-        
+        total_transactions = await db.scalar(select(func.count()).select_from(Transaction))
+
         # Today's sales
-        today_sales = db.execute(
+        today_sales = await db.scalar(
             text("SELECT SUM(amount) FROM transactions WHERE date = date('now')")
-        ).scalar() or 0
-        
+        ) or 0
+
         # Total GST
-        total_gst = db.execute(
+        total_gst = await db.scalar(
             text("SELECT SUM(gst_amount) FROM transactions")
-        ).scalar() or 0
-        
+        ) or 0
+
         # By payment mode
-        payment_modes = db.execute(
+        payment_modes = (await db.execute(
             text("SELECT payment_mode, SUM(amount) as total FROM transactions GROUP BY payment_mode")
-        ).fetchall()
+        )).fetchall()
         
         return {
             "total_transactions": total_transactions,
@@ -0,0 +1,422 @@
+"""Prometheus metrics for the Ledgerly apps, without a client library.
+
+Records per-route request latency, SQL statements and SQL time per request,
+bill pipeline stage timings and LLM calls/tokens, and renders them in the
+Prometheus text format for a ``/metrics`` endpoint. Every metric is a dict
+of fixed buckets behind one lock, so recording costs a few microseconds.
+
+Values are per process: with several gunicorn workers each scrape sees the
+worker that answered it, and the bill worker (worker.py) has its own
+registry, served on LEDGERLY_WORKER_METRICS_PORT. If LEDGERLY_METRICS_TOKEN
+is set, scrapes must send ``Authorization: Bearer <token>``. Set
+LEDGERLY_METRICS=0 to turn off the endpoints and request hooks.
+"""
+from __future__ import annotations
+
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def enabled() -> bool:
+    return os.environ.get("LEDGERLY_METRICS", "1").strip() != "0"
+
+
+def authorized(header: str | None) -> bool:
+    token = os.environ.get("LEDGERLY_METRICS_TOKEN", "")
+    return not token or hmac.compare_digest(header or "", f"Bearer {token}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total[0]) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_number(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "ledgerly_http_requests_total", "HTTP requests by route and status.",
+    ("app", "method", "route", "status"),
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "ledgerly_http_request_duration_seconds",
+    "Time to produce the response (first byte for streamed responses).",
+    ("app", "method", "route"),
+))
+DB_QUERIES = REGISTRY.register(Histogram(
+    "ledgerly_db_queries_per_request", "SQL statements executed per HTTP request.",
+    ("app", "route"), buckets=COUNT_BUCKETS,
+))
+DB_SECONDS = REGISTRY.register(Histogram(
+    "ledgerly_db_seconds_per_request", "Time spent executing SQL per HTTP request.",
+    ("app", "route"),
+))
+BILL_STAGE = REGISTRY.register(Histogram(
+    "ledgerly_bill_stage_seconds", "Time spent in each bill pipeline stage.",
+    ("stage", "outcome"), buckets=STAGE_BUCKETS,
+))
+LLM_CALLS = REGISTRY.register(Counter(
+    "ledgerly_llm_calls_total", "LLM API calls.", ("provider", "model", "purpose", "outcome"),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "ledgerly_llm_tokens_total", "LLM tokens reported by the provider.", ("provider", "model", "purpose", "kind"),
+))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "ledgerly_llm_call_seconds", "LLM API call latency.", ("provider", "purpose"), buckets=STAGE_BUCKETS,
+))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ---------------------------------------------------------------------------
+# SQL accounting per request
+# ---------------------------------------------------------------------------
+# [statements, seconds] for the request being served; a mutable list so work
+# done in copied contexts (threads, tasks) still adds to the same totals.
+_db_usage: ContextVar[list | None] = ContextVar("ledgerly_db_usage", default=None)
+
+
+def begin_request():
+    """Start counting SQL for the current request; pass the token to ``end_request``."""
+    return _db_usage.set([0, 0.0])
+
+
+def end_request(token) -> tuple[int, float]:
+    usage = _db_usage.get() or [0, 0.0]
+    _db_usage.reset(token)
+    return usage[0], usage[1]
+
+
+def record_query(seconds: float, statements: int = 1) -> None:
+    usage = _db_usage.get()
+    if usage is not None:
+        usage[0] += statements
+        usage[1] += seconds
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection that adds each statement's execute time to the current request.
+
+    Only the ``execute`` step is timed: rows are stepped lazily by ``fetch*``,
+    so large result sets are under-counted slightly.
+    """
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            record_query(time.perf_counter() - started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            record_query(time.perf_counter() - started)
+
+    def executescript(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executescript(*args, **kwargs)
+        finally:
+            record_query(time.perf_counter() - started)
+
+
+def instrument_sqlalchemy(engine) -> None:
+    """Count statements run through a SQLAlchemy engine (sync, or an AsyncEngine's ``sync_engine``)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("ledgerly_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record_query(time.perf_counter() - conn.info["ledgerly_query_started"].pop())
+
+
+# ---------------------------------------------------------------------------
+# Bill pipeline and LLM calls
+# ---------------------------------------------------------------------------
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time one bill pipeline stage; failures are recorded with ``outcome="error"``."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        BILL_STAGE.observe(time.perf_counter() - started, name, outcome)
+
+
+def timed_iter(iterable: Iterable, name: str) -> Iterator:
+    """Yield from ``iterable``, timing the production of each item as stage ``name``."""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        except BaseException:
+            BILL_STAGE.observe(time.perf_counter() - started, name, "error")
+            raise
+        BILL_STAGE.observe(time.perf_counter() - started, name, "ok")
+        yield item
+
+
+class LlmCall:
+    __slots__ = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self) -> None:
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def usage_from(self, response) -> None:
+        """Token counts from a Gemini (``usage_metadata``) or OpenAI (``usage``) response."""
+        gemini = getattr(response, "usage_metadata", None)
+        if gemini is not None:
+            self.prompt_tokens = getattr(gemini, "prompt_token_count", 0) or 0
+            self.completion_tokens = getattr(gemini, "candidates_token_count", 0) or 0
+            return
+        openai = getattr(response, "usage", None)
+        if openai is not None:
+            self.prompt_tokens = getattr(openai, "prompt_tokens", 0) or 0
+            self.completion_tokens = getattr(openai, "completion_tokens", 0) or 0
+
+
+@contextmanager
+def llm_call(provider: str, model: str, purpose: str) -> Iterator[LlmCall]:
+    """Count and time one LLM request; call ``usage_from(response)`` on the yielded object."""
+    call = LlmCall()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield call
+        outcome = "ok"
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - started, provider, purpose)
+        LLM_CALLS.inc(provider, model, purpose, outcome)
+        if call.prompt_tokens:
+            LLM_TOKENS.inc(provider, model, purpose, "prompt", amount=call.prompt_tokens)
+        if call.completion_tokens:
+            LLM_TOKENS.inc(provider, model, purpose, "completion", amount=call.completion_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Wiring for the apps
+# ---------------------------------------------------------------------------
+def observe_request(app_name: str, method: str, route: str, status: int, seconds: float,
+                    db_usage: tuple[int, float]) -> None:
+    HTTP_REQUESTS.inc(app_name, method, route, str(status))
+    HTTP_LATENCY.observe(seconds, app_name, method, route)
+    DB_QUERIES.observe(db_usage[0], app_name, route)
+    DB_SECONDS.observe(db_usage[1], app_name, route)
+
+
+def install_flask(app, app_name: str) -> None:
+    """Request hooks and a ``GET /metrics`` route for a Flask app.
+
+    Also makes ``db.connect`` open InstrumentedConnections, which feed the
+    per-request SQL counters.
+    """
+    if not enabled():
+        return
+    from flask import Response, g, request
+
+    import db
+
+    db.set_connection_factory(InstrumentedConnection)
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = time.perf_counter()
+        g.metrics_db_token = begin_request()
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.pop("metrics_started", None)
+        token = g.pop("metrics_db_token", None)
+        if started is not None and token is not None:
+            # The URL rule, not the path, keeps the label set small
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            observe_request(app_name, request.method, route, response.status_code,
+                            time.perf_counter() - started, end_request(token))
+        return response
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        if not authorized(request.headers.get("Authorization")):
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+        return Response(render(), content_type=CONTENT_TYPE)
+
+
+def install_fastapi(app, app_name: str) -> None:
+    """Request middleware and a ``GET /metrics`` route for a FastAPI app."""
+    if not enabled():
+        return
+    from fastapi.responses import PlainTextResponse
+
+    @app.middleware("http")
+    async def _metrics_middleware(request, call_next):
+        started = time.perf_counter()
+        token = begin_request()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            observe_request(app_name, request.method, getattr(route, "path", "unmatched"), status,
+                            time.perf_counter() - started, end_request(token))
+
+    async def metrics_endpoint(request):
+        if not authorized(request.headers.get("authorization")):
+            return PlainTextResponse("unauthorized\n", status_code=401)
+        return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
+
+def serve(port: int, host: str = "0.0.0.0") -> None:
+    """Serve ``/metrics`` from a background thread (for processes without a web app, e.g. worker.py)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            if not authorized(self.headers.get("Authorization")):
+                self.send_error(401)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="ledgerly-metrics").start()
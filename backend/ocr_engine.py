@@ -0,0 +1,446 @@
+"""
+Process-pool engine for the CPU-bound parts of the bill pipeline.
+
+OpenCV preprocessing and QR decoding, PDF rasterisation and Tesseract run in
+worker processes so they neither hold the GIL of the web/worker process nor
+block its threads.
+Images travel between processes as encoded in-memory buffers (PNG/JPEG bytes);
+nothing is written next to the uploads.
+
+Configuration (environment):
+- LEDGERLY_OCR_WORKERS: pool size (default: CPU count; 0 runs everything inline)
+- LEDGERLY_OCR_TIMEOUT: per-task timeout in seconds (default 60); the pool of
+  a task that overruns it is replaced and its worker processes killed
+- LEDGERLY_PDF_DPI: rasterisation resolution for PDF pages (default 200)
+- LEDGERLY_PDF_THREADS: pdftoppm threads, and pages rasterised per task (default 2)
+- LEDGERLY_PDF_MAX_PAGES: pages of a PDF that are processed at most (default 50;
+  the bill records how many it had and that the rest were skipped)
+- LEDGERLY_PDF_TEXT_MIN_CHARS: non-space characters a page's embedded text
+  needs for the PDF to skip OCR (default 40; 0 disables the text-layer path)
+"""
+from __future__ import annotations
+
+import atexit
+import io
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+
+class OcrTimeout(RuntimeError):
+    """A pooled OCR/image task exceeded its time budget."""
+
+
+class TesseractMissing(RuntimeError):
+    """Tesseract is not installed or TESSERACT_CMD is wrong.
+
+    Raised instead of ``pytesseract.TesseractNotFoundError``, which cannot be
+    pickled back from a worker process.
+    """
+
+
+class PdfConversionFailed(RuntimeError):
+    """Poppler could not rasterise the PDF."""
+
+
+# ------------------------------------------------------------------
+# Task functions (module level so worker processes can unpickle them)
+# ------------------------------------------------------------------
+def _init_worker(tesseract_cmd: str | None) -> None:
+    if tesseract_cmd:
+        import pytesseract
+
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def preprocess_image_bytes(data: bytes) -> bytes:
+    """
+    Preprocess bill image for better OCR and LLM accuracy.
+    - Converts to grayscale
+    - Applies adaptive thresholding to remove shadows
+    - Enhances handwriting visibility
+    Returns PNG bytes (the input unchanged if it can't be decoded).
+    """
+    import cv2
+    import numpy as np
+
+    try:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            return data
+
+        # Adaptive threshold - removes shadows, enhances text
+        processed = cv2.adaptiveThreshold(
+            img, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY,
+            11, 2
+        )
+        ok, encoded = cv2.imencode(".png", processed)
+        return encoded.tobytes() if ok else data
+    except Exception:
+        return data
+
+
+def decode_qr_bytes(data: bytes) -> list[str]:
+    """Texts of the QR codes OpenCV finds in an encoded image."""
+    import cv2
+    import numpy as np
+
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return []
+    detector = cv2.QRCodeDetector()
+    try:
+        found, texts, _, _ = detector.detectAndDecodeMulti(img)
+    except cv2.error:
+        found, texts = False, ()
+    if found and any(texts):
+        return [text for text in texts if text]
+    try:
+        text, _, _ = detector.detectAndDecode(img)
+    except cv2.error:
+        return []
+    return [text] if text else []
+
+
+def pdf_page_count(data: bytes, poppler_path: str | None = None, timeout: float = 0) -> int:
+    """Number of pages in a PDF (from pdfinfo, without rasterising anything)."""
+    from pdf2image import pdfinfo_from_bytes
+
+    try:
+        info = pdfinfo_from_bytes(data, poppler_path=poppler_path, timeout=timeout or None)
+    except Exception as e:
+        raise PdfConversionFailed(str(e)) from None
+    return int(info.get("Pages") or 0)
+
+
+def pdf_pages_png(
+    data: bytes,
+    first_page: int,
+    last_page: int,
+    dpi: int = 200,
+    thread_count: int = 1,
+    poppler_path: str | None = None,
+    timeout: float = 0,
+) -> list[bytes]:
+    """Rasterise pages ``first_page..last_page`` of a PDF to PNG bytes.
+
+    pdftoppm writes into a scratch directory (``paths_only``), so the pages are
+    never decoded into PIL images; only their encoded PNGs come back.
+    """
+    from pdf2image import convert_from_bytes
+
+    with tempfile.TemporaryDirectory(prefix="ledgerly-pdf-") as tmp:
+        try:
+            paths = convert_from_bytes(
+                data,
+                dpi=dpi,
+                first_page=first_page,
+                last_page=last_page,
+                thread_count=thread_count,
+                output_folder=tmp,
+                fmt="png",
+                paths_only=True,
+                poppler_path=poppler_path,
+                timeout=timeout or None,
+            )
+        except Exception as e:
+            raise PdfConversionFailed(str(e)) from None
+        return [Path(path).read_bytes() for path in paths]
+
+
+def pdf_text_layer(
+    data: bytes,
+    first_page: int,
+    last_page: int,
+    poppler_path: str | None = None,
+    timeout: float = 0,
+) -> list[str] | None:
+    """Embedded text of pages ``first_page..last_page`` via Poppler's pdftotext.
+
+    ``-layout`` keeps the physical column positions, so table rows (item,
+    HSN, qty, rate, amount) stay on one line as they do in OCR output.
+    Returns None if pdftotext is not available.
+    """
+    exe = "pdftotext.exe" if os.name == "nt" else "pdftotext"
+    cmd = str(Path(poppler_path) / exe) if poppler_path else exe
+    with tempfile.TemporaryDirectory(prefix="ledgerly-pdf-") as tmp:
+        source = Path(tmp) / "bill.pdf"
+        source.write_bytes(data)
+        try:
+            proc = subprocess.run(
+                [cmd, "-layout", "-enc", "UTF-8", "-f", str(first_page), "-l", str(last_page), str(source), "-"],
+                capture_output=True,
+                timeout=timeout or None,
+            )
+        except FileNotFoundError:
+            return None
+        except subprocess.TimeoutExpired as e:
+            raise OcrTimeout(f"pdftotext exceeded {timeout:.0f}s") from e
+    if proc.returncode != 0:
+        raise PdfConversionFailed(proc.stderr.decode("utf-8", "replace").strip() or "pdftotext failed")
+    # pdftotext ends every page with a form feed
+    pages = proc.stdout.decode("utf-8", "replace").split("\f")
+    return pages[: last_page - first_page + 1]
+
+
+def pdf_page_images(
+    data: bytes,
+    page: int = 1,
+    poppler_path: str | None = None,
+    timeout: float = 0,
+) -> list[bytes]:
+    """The image objects embedded in a PDF page, as PNG bytes, via Poppler's pdfimages.
+
+    Nothing is rendered: a logo or pasted QR comes back at its own resolution,
+    and a page of pure text and vector drawing returns nothing.
+    """
+    exe = "pdfimages.exe" if os.name == "nt" else "pdfimages"
+    cmd = str(Path(poppler_path) / exe) if poppler_path else exe
+    with tempfile.TemporaryDirectory(prefix="ledgerly-pdf-") as tmp:
+        source = Path(tmp) / "bill.pdf"
+        source.write_bytes(data)
+        try:
+            proc = subprocess.run(
+                [cmd, "-png", "-f", str(page), "-l", str(page), str(source), str(Path(tmp) / "img")],
+                capture_output=True,
+                timeout=timeout or None,
+            )
+        except FileNotFoundError:
+            return []
+        except subprocess.TimeoutExpired as e:
+            raise OcrTimeout(f"pdfimages exceeded {timeout:.0f}s") from e
+        if proc.returncode != 0:
+            raise PdfConversionFailed(proc.stderr.decode("utf-8", "replace").strip() or "pdfimages failed")
+        return [path.read_bytes() for path in sorted(Path(tmp).glob("img-*.png"))]
+
+
+def ocr_image_bytes(data: bytes, timeout: float = 0) -> str:
+    """Run Tesseract on an encoded image."""
+    import pytesseract
+    from PIL import Image
+
+    try:
+        return pytesseract.image_to_string(Image.open(io.BytesIO(data)), timeout=timeout)
+    except pytesseract.TesseractNotFoundError as e:
+        raise TesseractMissing(str(e)) from None
+    except RuntimeError as e:
+        # pytesseract signals its own subprocess timeout with a bare RuntimeError
+        if "timeout" in str(e).lower():
+            raise OcrTimeout(str(e)) from None
+        raise
+
+
+# ------------------------------------------------------------------
+# Engine
+# ------------------------------------------------------------------
+class OcrEngine:
+    """Sized process pool with per-task timeouts; ``workers=0`` runs tasks inline."""
+
+    def __init__(
+        self,
+        workers: int,
+        task_timeout: float = 60.0,
+        tesseract_cmd: str | None = None,
+        pdf_dpi: int = 200,
+        pdf_threads: int = 2,
+        pdf_max_pages: int = 50,
+        pdf_text_min_chars: int = 40,
+    ) -> None:
+        self.workers = max(0, int(workers))
+        self.task_timeout = task_timeout
+        self.tesseract_cmd = tesseract_cmd
+        self.pdf_dpi = pdf_dpi
+        self.pdf_threads = max(1, int(pdf_threads))
+        self.pdf_max_pages = max(1, int(pdf_max_pages))
+        self.pdf_text_min_chars = max(0, int(pdf_text_min_chars))
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Caller holds self._lock
+        if self._executor is None or self._pid != os.getpid():
+            # "spawn" keeps workers independent of the parent's threads and
+            # works the same on Windows dev boxes and Linux servers.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.tesseract_cmd,),
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> tuple[ProcessPoolExecutor | None, Future]:
+        if self.workers == 0:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            return None, future
+        with self._lock:
+            executor = self._get_executor()
+            return executor, executor.submit(fn, *args)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        return self._submit(fn, *args)[1]
+
+    def _recycle(self, executor: ProcessPoolExecutor | None) -> None:
+        """Replace ``executor`` with a fresh pool on next use and kill its worker processes.
+
+        Tasks other threads still had on it fail with BrokenProcessPool and
+        are retried on the new pool by ``run``.
+        """
+        if executor is None:
+            return
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            processes = list((executor._processes or {}).values())
+            executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def run(self, fn: Callable[..., Any], *args: Any, timeout: float | None = None) -> Any:
+        """Run ``fn(*args)`` in the pool and wait for it, raising OcrTimeout past the budget."""
+        timeout = self.task_timeout if timeout is None else timeout
+        for attempt in (1, 2):
+            executor, future = self._submit(fn, *args)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeout:
+                # The task is still running in its worker and would hold that slot
+                # until it finished (a hung Tesseract or pdftoppm: never)
+                self._recycle(executor)
+                raise OcrTimeout(f"{getattr(fn, '__name__', 'task')} exceeded {timeout:.0f}s") from None
+            except BrokenProcessPool:
+                # A worker died (OOM, segfault in a native lib, a recycled pool); start a fresh pool and retry once.
+                self._recycle(executor)
+                if attempt == 2:
+                    raise
+
+    def _tool_timeout(self) -> float:
+        # Poppler and Tesseract get a slightly shorter budget so they are killed before the future times out
+        return max(1.0, self.task_timeout - 1)
+
+    def preprocess(self, data: bytes) -> bytes:
+        return self.run(preprocess_image_bytes, data)
+
+    def qr_codes(self, data: bytes) -> list[str]:
+        return self.run(decode_qr_bytes, data)
+
+    def pdf_first_page(self, data: bytes) -> bytes:
+        """The first page of a PDF as PNG bytes."""
+        pages = self.run(pdf_pages_png, data, 1, 1, self.pdf_dpi, 1, os.environ.get("POPPLER_PATH"),
+                         self._tool_timeout())
+        if not pages:
+            raise PdfConversionFailed("PDF has no pages")
+        return pages[0]
+
+    def pdf_first_page_images(self, data: bytes) -> list[bytes]:
+        """Images embedded in the first page of a PDF, without rendering it."""
+        return self.run(pdf_page_images, data, 1, os.environ.get("POPPLER_PATH"), self._tool_timeout())
+
+    def pdf_page_count(self, data: bytes) -> int:
+        """Number of pages in a PDF, including any past ``pdf_max_pages``."""
+        return self.run(pdf_page_count, data, os.environ.get("POPPLER_PATH"), self._tool_timeout())
+
+    def pdf_text(self, data: bytes, page_count: int | None = None) -> list[str] | None:
+        """Per-page embedded text of a digital PDF, or None if it needs OCR.
+
+        Every page must carry at least ``pdf_text_min_chars`` non-space
+        characters; a scanned PDF (no text layer, or a stray stamp/footer)
+        returns None and goes through ``pdf_pages`` + OCR instead. At most
+        ``pdf_max_pages`` pages are returned; ``page_count`` saves counting
+        them again.
+        """
+        if self.pdf_text_min_chars == 0:
+            return None
+        poppler_path = os.environ.get("POPPLER_PATH")
+        count = min(self.pdf_page_count(data) if page_count is None else page_count, self.pdf_max_pages)
+        if count == 0:
+            return None
+        pages = self.run(pdf_text_layer, data, 1, count, poppler_path, self._tool_timeout())
+        if pages is None or len(pages) < count:
+            return None
+        if any(len("".join(page.split())) < self.pdf_text_min_chars for page in pages):
+            return None
+        return pages
+
+    def pdf_pages(self, data: bytes, page_count: int | None = None) -> Iterator[tuple[int, int, bytes]]:
+        """Yield ``(page_number, page_count, png_bytes)`` for each PDF page, in order.
+
+        Pages are rasterised ``pdf_threads`` at a time and handed out one by
+        one, so at most that many page images are alive however long the PDF
+        is. The yielded ``page_count`` is capped at ``pdf_max_pages``; pass the
+        PDF's own count as ``page_count`` if it is already known.
+        """
+        poppler_path = os.environ.get("POPPLER_PATH")
+        count = min(self.pdf_page_count(data) if page_count is None else page_count, self.pdf_max_pages)
+        if count == 0:
+            raise PdfConversionFailed("PDF has no pages")
+        for first in range(1, count + 1, self.pdf_threads):
+            last = min(count, first + self.pdf_threads - 1)
+            chunk = deque(self.run(
+                pdf_pages_png, data, first, last, self.pdf_dpi, self.pdf_threads, poppler_path, self._tool_timeout()
+            ))
+            page = first
+            while chunk:
+                yield page, count, chunk.popleft()
+                page += 1
+
+    def ocr(self, data: bytes) -> str:
+        return self.run(ocr_image_bytes, data, self._tool_timeout())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_engine: OcrEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> OcrEngine:
+    """Return the process-wide engine, configured from the environment on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            import pytesseract
+
+            cmd = pytesseract.pytesseract.tesseract_cmd
+            _engine = OcrEngine(
+                workers=int(os.environ.get("LEDGERLY_OCR_WORKERS", str(os.cpu_count() or 1))),
+                task_timeout=float(os.environ.get("LEDGERLY_OCR_TIMEOUT", "60")),
+                tesseract_cmd=cmd if cmd and Path(cmd).exists() else None,
+                pdf_dpi=int(os.environ.get("LEDGERLY_PDF_DPI", "200")),
+                pdf_threads=int(os.environ.get("LEDGERLY_PDF_THREADS", "2")),
+                pdf_max_pages=int(os.environ.get("LEDGERLY_PDF_MAX_PAGES", "50")),
+                pdf_text_min_chars=int(os.environ.get("LEDGERLY_PDF_TEXT_MIN_CHARS", "40")),
+            )
+        return _engine
+
+
+def shutdown_engine() -> None:
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+            _engine = None
+
+
+atexit.register(shutdown_engine)
@@ -1,17 +1,19 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import os
 import json
 from dotenv import load_dotenv
 
+import metrics
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize OpenAI client
+# Initialize OpenAI client (optional: questions intent_parser recognises never reach it)
 api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
-
-client = OpenAI(api_key=api_key)
+client = OpenAI(api_key=api_key) if api_key else None
+async_client = AsyncOpenAI(api_key=api_key) if api_key else None
+if client is None:
+    print("Warning: OPENAI_API_KEY not set; /ask will only answer questions it recognises locally")
 
 SYSTEM_PROMPT = """
 You are a BI query generator for a ledger system. Your job is to convert natural language queries 
@@ -75,30 +77,57 @@ def ask_openai(question: str) -> dict:
     Returns:
         Dictionary with keys: sql, chart, title
     """
+    if client is None:
+        raise ValueError("Question not recognised and OPENAI_API_KEY is not set")
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Fast and cost-effective
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": question}
-            ],
-            temperature=0.1,  # Low temperature for consistent SQL generation
-            response_format={"type": "json_object"},  # Forces JSON output
-            max_tokens=500  # Limit response size
-        )
-        
-        # Extract and parse the response
-        response_text = response.choices[0].message.content
-        ai_response = json.loads(response_text)
-        
-        return ai_response
-        
+        args = completion_args(question)
+        with metrics.llm_call("openai", args["model"], "ask") as call:
+            response = client.chat.completions.create(**args)
+            call.usage_from(response)
+        return parse_completion(response)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON response from OpenAI: {str(e)}")
+    except Exception as e:
+        raise Exception(f"OpenAI API error: {str(e)}")
+
+
+async def ask_openai_async(question: str) -> dict:
+    """Same as ask_openai, on the async client (does not hold a worker thread while waiting)"""
+    if async_client is None:
+        raise ValueError("Question not recognised and OPENAI_API_KEY is not set")
+
+    try:
+        args = completion_args(question)
+        with metrics.llm_call("openai", args["model"], "ask") as call:
+            response = await async_client.chat.completions.create(**args)
+            call.usage_from(response)
+        return parse_completion(response)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON response from OpenAI: {str(e)}")
     except Exception as e:
         raise Exception(f"OpenAI API error: {str(e)}")
 
 
+def completion_args(question: str) -> dict:
+    return dict(
+        model="gpt-4o-mini",  # Fast and cost-effective
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": question}
+        ],
+        temperature=0.1,  # Low temperature for consistent SQL generation
+        response_format={"type": "json_object"},  # Forces JSON output
+        max_tokens=500  # Limit response size
+    )
+
+
+def parse_completion(response) -> dict:
+    # Extract and parse the response
+    response_text = response.choices[0].message.content
+    return json.loads(response_text)
+
+
 if __name__ == "__main__":
     # Test the OpenAI helper
     test_question = "Aaj ka sale"
@@ -0,0 +1,148 @@
+"""
+Maintenance for the ``entry_daily_rollup`` table.
+
+The rollup is kept current by triggers on ``entries`` (see db.init_db) and is
+seeded automatically the first time the app starts with it. These commands
+are for operations:
+
+    python rollup.py backfill [--user-id N]   # rebuild from entries
+    python rollup.py check [--user-id N]      # compare against entries, exit 1 on drift
+    python rollup.py check --fix              # ...and rebuild the users that drifted
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from db import default_db_path, get_pool, init_db, query_all, rebuild_rollup
+
+ROLLUP_COLUMNS = ("amount", "entry_count", "taxable_amount", "cgst_amount", "sgst_amount", "igst_amount")
+# Triggers add and subtract floats, so totals may drift by rounding noise
+TOLERANCE = 0.005
+
+
+def range_totals(conn: sqlite3.Connection, user_id: int, start_utc: datetime, end_utc: datetime) -> dict:
+    """Per-entry-type totals for ``start_utc <= created_at < end_utc`` (naive UTC datetimes).
+
+    Whole UTC days inside the range come from the rollup; only the partial
+    days at either edge (e.g. an IST day starts at 18:30 UTC) are summed from
+    ``entries`` through its (user_id, created_at) index.
+    """
+    first_day = start_utc.date() if start_utc.time() == time.min else start_utc.date() + timedelta(days=1)
+    last_day = end_utc.date()  # exclusive
+    stamp = "%Y-%m-%d %H:%M:%S"
+    entry_columns = """entry_type, amount, 1 AS n, COALESCE(taxable_amount, 0) AS taxable,
+                       COALESCE(cgst_amount, 0) AS cgst, COALESCE(sgst_amount, 0) AS sgst,
+                       COALESCE(igst_amount, 0) AS igst"""
+    edge = f"SELECT {entry_columns} FROM entries WHERE user_id = ? AND created_at >= ? AND created_at < ?"
+
+    if first_day < last_day:
+        day_start = datetime.combine(first_day, time.min)
+        day_end = datetime.combine(last_day, time.min)
+        parts = [
+            """SELECT entry_type, amount, entry_count AS n, taxable_amount AS taxable, cgst_amount AS cgst,
+                      sgst_amount AS sgst, igst_amount AS igst
+               FROM entry_daily_rollup WHERE user_id = ? AND day >= ? AND day < ?""",
+            edge,
+            edge,
+        ]
+        params = (
+            user_id, first_day.isoformat(), last_day.isoformat(),
+            user_id, start_utc.strftime(stamp), day_start.strftime(stamp),
+            user_id, day_end.strftime(stamp), end_utc.strftime(stamp),
+        )
+    else:
+        parts = [edge]
+        params = (user_id, start_utc.strftime(stamp), end_utc.strftime(stamp))
+
+    rows = query_all(
+        conn,
+        f"""SELECT entry_type, TOTAL(amount) AS amount, TOTAL(n) AS entry_count,
+                   TOTAL(taxable) AS taxable_amount, TOTAL(cgst) AS cgst_amount,
+                   TOTAL(sgst) AS sgst_amount, TOTAL(igst) AS igst_amount
+            FROM ({" UNION ALL ".join(parts)})
+            GROUP BY entry_type""",
+        params,
+    )
+    totals = {entry_type: dict.fromkeys(ROLLUP_COLUMNS, 0.0) for entry_type in ("income", "expense")}
+    for row in rows:
+        totals[row["entry_type"]] = {column: row[column] for column in ROLLUP_COLUMNS}
+    for entry_type in totals:
+        totals[entry_type]["entry_count"] = int(totals[entry_type]["entry_count"])
+    return totals
+
+
+def check_rollup(conn: sqlite3.Connection, user_id: int | None = None) -> list[dict]:
+    """Rollup rows that disagree with a fresh aggregate of ``entries``."""
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    expected = {
+        (r["user_id"], r["day"], r["entry_type"]): r
+        for r in query_all(
+            conn,
+            f"""SELECT user_id, date(created_at) AS day, entry_type, TOTAL(amount) AS amount,
+                       COUNT(*) AS entry_count, TOTAL(taxable_amount) AS taxable_amount,
+                       TOTAL(cgst_amount) AS cgst_amount, TOTAL(sgst_amount) AS sgst_amount,
+                       TOTAL(igst_amount) AS igst_amount
+                FROM entries {where}
+                GROUP BY user_id, date(created_at), entry_type""",
+            params,
+        )
+    }
+    actual = {
+        (r["user_id"], r["day"], r["entry_type"]): r
+        for r in query_all(conn, f"SELECT * FROM entry_daily_rollup {where}", params)
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        want, have = expected.get(key), actual.get(key)
+        diffs = {
+            column: (want[column] if want else 0, have[column] if have else 0)
+            for column in ROLLUP_COLUMNS
+            if abs((want[column] if want else 0) - (have[column] if have else 0)) > TOLERANCE
+        }
+        if diffs:
+            user, day, entry_type = key
+            mismatches.append({"user_id": user, "day": day, "entry_type": entry_type, "diffs": diffs})
+    return mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill or verify the entries daily rollup")
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--fix", action="store_true", help="with check: rebuild users whose rollup drifted")
+    args = parser.parse_args()
+
+    db_path = Path(os.environ.get("LEDGERLY_DB_PATH", str(default_db_path())))
+    init_db(db_path)
+    with get_pool(db_path).connection() as conn:
+        if args.command == "backfill":
+            conn.execute("BEGIN IMMEDIATE")
+            rows = rebuild_rollup(conn, args.user_id)
+            print(f"[ledgerly] rollup rebuilt: {rows} day row(s)")
+            return
+
+        mismatches = check_rollup(conn, args.user_id)
+        for m in mismatches[:50]:
+            print(f"[ledgerly] user {m['user_id']} {m['day']} {m['entry_type']}: "
+                  + ", ".join(f"{col} expected {want} got {have}" for col, (want, have) in m["diffs"].items()))
+        if not mismatches:
+            print("[ledgerly] rollup consistent")
+            return
+        print(f"[ledgerly] {len(mismatches)} inconsistent rollup row(s)")
+        if args.fix:
+            conn.execute("BEGIN IMMEDIATE")
+            for user in sorted({m["user_id"] for m in mismatches}):
+                rebuild_rollup(conn, user)
+            print("[ledgerly] rebuilt affected users")
+            return
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
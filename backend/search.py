@@ -0,0 +1,195 @@
+"""
+Full-text search over a shop's bills and ledger entries (``GET /api/search``).
+
+Bills (vendor name and OCR text) and entries (vendor name and note) are
+indexed by the FTS5 tables ``bills_fts`` and ``entries_fts``, which triggers
+keep in step with inserts, updates and deletes (see db.init_db). Every
+indexed row carries an ``owner`` token, ``u<user_id>``, and every query is
+ANDed with it, so a search only ever sees the caller's own rows.
+
+Queries are written the way people talk: "that cement bill from March"
+becomes the term ``cement`` (filler words are dropped; ``sunfl*`` matches
+a prefix) and a filter on the most recent March (or ``March 2024``).
+Results whose vendor name matches come first, then the newest, among
+the newest ``SEARCH_CANDIDATES`` matches; they are paged with ``offset``
+and come with an HTML-escaped snippet in which matches are wrapped in
+``<mark>``.
+
+Everything here costs in proportion to the shop's own matches, not to the
+whole index: BM25 would read each term's document count across every shop
+on every query, and so would a prefix (``word*``), which is why prefixes
+are only taken when asked for.
+"""
+from __future__ import annotations
+
+import html
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import date
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# Ranked results are paged by offset; deep pages mean the query needs refining
+SEARCH_MAX_OFFSET = 1000
+SEARCH_CANDIDATES = SEARCH_MAX_OFFSET + SEARCH_MAX_LIMIT
+SNIPPET_TOKENS = 12
+# Shorter prefixes ("c*") match too much of the index to be worth it
+MIN_PREFIX = 3
+TYPES = ("all", "bills", "entries")
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        (("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",), ("jun", "june"),
+         ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"), ("oct", "october"),
+         ("nov", "november"), ("dec", "december")),
+        start=1,
+    )
+    for name in names
+}
+STOPWORDS = {
+    "a", "an", "the", "that", "this", "those", "these", "my", "our", "from", "for", "of", "in", "on", "at",
+    "to", "with", "and", "or", "by", "last", "bill", "bills", "invoice", "invoices", "entry", "entries",
+    "receipt", "receipts", "show", "find", "me", "all", "some", "which", "was", "were", "i", "we", "paid",
+}
+_WORD_RE = re.compile(r"(\w+)(\*?)")
+_SPACE_RE = re.compile(r"\s+")
+# Snippet markers that cannot occur in indexed text; swapped for <mark> after escaping
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    terms: tuple[str, ...]
+    month: tuple[int, int] | None  # (year, month)
+    prefixes: frozenset[str] = frozenset()
+
+    def match(self, user_id: int, columns: str = "vendor_name body") -> str:
+        """The FTS5 MATCH expression: the owner token AND every term, in ``columns``."""
+        quoted = " ".join(f'"{term}"*' if term in self.prefixes else f'"{term}"' for term in self.terms)
+        return f"owner : u{int(user_id)} AND {{{columns}}} : ({quoted})"
+
+    def month_range(self) -> tuple[str, str] | None:
+        """UTC ``created_at`` bounds of the month filter."""
+        if self.month is None:
+            return None
+        year, month = self.month
+        following = (year + month // 12, month % 12 + 1)
+        return f"{year}-{month:02d}-01", f"{following[0]}-{following[1]:02d}-01"
+
+
+def parse_query(text: str, today: date) -> SearchQuery:
+    """Split a free-text query into search terms and an optional month filter."""
+    words = _WORD_RE.findall(text.lower())
+    terms: list[str] = []
+    prefixes: set[str] = set()
+    month = None
+    skip = False
+    for index, (word, star) in enumerate(words):
+        if skip:
+            skip = False
+            continue
+        if word in MONTHS and month is None and not star:
+            number = MONTHS[word]
+            following = words[index + 1][0] if index + 1 < len(words) else ""
+            if re.fullmatch(r"(?:19|20)\d\d", following):
+                month, skip = (int(following), number), True
+            else:
+                # The latest such month that has started
+                month = (today.year if number <= today.month else today.year - 1, number)
+        elif star and len(word) >= MIN_PREFIX:
+            terms.append(word)
+            prefixes.add(word)
+        elif word not in STOPWORDS:
+            terms.append(word)
+    return SearchQuery(tuple(dict.fromkeys(terms)), month, frozenset(prefixes))
+
+
+def _snippet_html(raw: str | None) -> str:
+    text = html.escape(_SPACE_RE.sub(" ", raw or "").strip())
+    return text.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+# Both indexes have the columns (vendor_name, body, owner), so one MATCH expression fits either.
+# Only the newest SEARCH_CANDIDATES matches of each kind are ordered: a common word ("cement")
+# costs the same in a shop with 1,000 bills as in one with 100,000.
+_CANDIDATES = """SELECT * FROM (
+                    SELECT '{kind}' AS type, {fts}.rowid AS id, t.created_at,
+                           {fts}.rowid IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?) AS vendor_match
+                    FROM {fts} JOIN {table} t ON t.id = {fts}.rowid{month}
+                    WHERE {fts} MATCH ?
+                    ORDER BY {fts}.rowid DESC LIMIT {candidates}
+                 )"""
+_MONTH = " AND t.created_at >= ? AND t.created_at < ?"
+_DETAILS = {
+    "bills": """SELECT id, vendor_name, COALESCE(vendor_name, filename) AS title, total_amount AS amount,
+                       bill_date, status, created_at
+                FROM bills WHERE user_id = ? AND id IN ({ids})""",
+    "entries": """SELECT id, vendor_name, COALESCE(note, vendor_name, entry_type) AS title, amount,
+                         bill_date, entry_type AS status, created_at
+                  FROM entries WHERE user_id = ? AND id IN ({ids})""",
+}
+# One pass over the matches; only the page's rows are cut into snippets. The snippet comes from
+# the column with the most matches, the earlier on a tie, so ``owner`` (last) is never shown.
+_SNIPPETS = """SELECT rowid, snippet({fts}, -1, char(2), char(3), '…', {tokens}) FROM {fts}
+               WHERE {fts} MATCH ? AND +rowid IN ({ids})"""
+_KINDS = {"bills": "bill", "entries": "entry"}
+
+
+def search(conn: sqlite3.Connection, user_id: int, query: SearchQuery, kind: str = "all",
+           limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0) -> tuple[list[dict], int | None]:
+    """Ranked hits and the ``offset`` of the next page (None at the end)."""
+    match = query.match(user_id)
+    month = query.month_range()
+    parts, params = [], []
+    for table in (("bills", "entries") if kind == "all" else (kind,)):
+        parts.append(_CANDIDATES.format(kind=_KINDS[table], fts=f"{table}_fts", table=table,
+                                        month=_MONTH if month else "", candidates=SEARCH_CANDIDATES))
+        params += [query.match(user_id, "vendor_name"), *(month or ()), match]
+    ranked = conn.execute(
+        " UNION ALL ".join(parts) + " ORDER BY vendor_match DESC, created_at DESC, id DESC LIMIT ? OFFSET ?",
+        (*params, limit + 1, offset),
+    ).fetchall()
+    page = ranked[:limit]
+
+    # Details and snippets for the page only
+    details = {}
+    for table, type_ in _KINDS.items():
+        ids = [row["id"] for row in page if row["type"] == type_]
+        if not ids:
+            continue
+        placeholders = ", ".join("?" * len(ids))
+        snippets = dict(conn.execute(
+            _SNIPPETS.format(fts=f"{table}_fts", tokens=SNIPPET_TOKENS, ids=placeholders), (match, *ids)
+        ).fetchall())
+        for row in conn.execute(_DETAILS[table].format(ids=placeholders), (user_id, *ids)):
+            details[type_, row["id"]] = {**dict(row), "snippet": _snippet_html(snippets.get(row["id"]))}
+    hits = [{"type": row["type"], **details[row["type"], row["id"]], "vendor_match": bool(row["vendor_match"])}
+            for row in page if (row["type"], row["id"]) in details]
+    more = len(ranked) > limit and offset + limit <= SEARCH_MAX_OFFSET
+    return hits, (offset + limit if more else None)
+
+
+def recent_in_month(conn: sqlite3.Connection, user_id: int, query: SearchQuery, kind: str = "all",
+                    limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0) -> tuple[list[dict], int | None]:
+    """A query with only a month ("bills from March"): that month's rows, newest first."""
+    start, end = query.month_range()
+    parts, params = [], []
+    if kind in ("all", "bills"):
+        parts.append("""SELECT 'bill' AS type, id, vendor_name, COALESCE(vendor_name, filename) AS title,
+                               total_amount AS amount, bill_date, status, created_at
+                        FROM bills WHERE user_id = ? AND created_at >= ? AND created_at < ?""")
+        params += [user_id, start, end]
+    if kind in ("all", "entries"):
+        parts.append("""SELECT 'entry' AS type, id, vendor_name, COALESCE(note, vendor_name, entry_type) AS title,
+                               amount, bill_date, entry_type AS status, created_at
+                        FROM entries WHERE user_id = ? AND created_at >= ? AND created_at < ?""")
+        params += [user_id, start, end]
+    rows = conn.execute(
+        " UNION ALL ".join(parts) + " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+        (*params, limit + 1, offset),
+    ).fetchall()
+    hits = [{**dict(row), "snippet": html.escape(row["title"] or ""), "vendor_match": False} for row in rows[:limit]]
+    more = len(rows) > limit and offset + limit <= SEARCH_MAX_OFFSET
+    return hits, (offset + limit if more else None)
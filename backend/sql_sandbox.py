@@ -0,0 +1,139 @@
+"""Sandboxed execution of model-generated SQL for /ask.
+
+Each query runs on its own read-only SQLite connection (``mode=ro``), never
+on the app's SQLAlchemy session:
+
+- An authorizer allows only SELECT, reads of the permitted tables and
+  ordinary SQL functions. Writes, PRAGMA, ATTACH, schema tables and other
+  tables are refused when the statement is prepared.
+- Permitted tables are only reachable through TEMP views of the same name,
+  which shadow the real tables and carry the caller's tenant filter. A
+  direct ``main.transactions`` read is refused, so the filter can't be
+  sidestepped.
+- A progress handler aborts the query once its time budget is spent
+  (cartesian joins, runaway recursive CTEs).
+- At most ``max_rows`` rows are fetched; the result says when it was cut.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+DEFAULT_TIME_BUDGET_MS = 2000
+DEFAULT_MAX_ROWS = 1000
+# SQLite VM instructions between progress-handler checks
+PROGRESS_STEPS = 10_000
+
+_DENIED_FUNCTIONS = {"load_extension", "readfile", "writefile", "edit", "fts3_tokenizer", "sqlite_offset"}
+_ALWAYS_ALLOWED = {sqlite3.SQLITE_SELECT, getattr(sqlite3, "SQLITE_RECURSIVE", 33)}
+
+
+class SandboxError(Exception):
+    """Base class for queries the sandbox refused or could not finish."""
+
+
+class QueryRejected(SandboxError):
+    """The statement tried something other than reading the permitted tables."""
+
+
+class QueryTimeout(SandboxError):
+    """The time budget ran out; ``rows`` holds whatever was fetched before that."""
+
+    def __init__(self, message: str, rows: list[tuple]) -> None:
+        super().__init__(message)
+        self.rows = rows
+
+
+@dataclass
+class QueryResult:
+    columns: list[str]
+    rows: list[tuple] = field(default_factory=list)
+    truncated: bool = False
+    elapsed_ms: float = 0.0
+
+
+class SqlSandbox:
+    def __init__(self, db_path: Path, tables: tuple[str, ...] = ("transactions",),
+                 time_budget_ms: float = DEFAULT_TIME_BUDGET_MS, max_rows: int = DEFAULT_MAX_ROWS) -> None:
+        self.db_path = Path(db_path)
+        self.tables = tuple(tables)
+        self.time_budget_ms = time_budget_ms
+        self.max_rows = max(1, max_rows)
+
+    def _connect(self, scope: dict | None) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, isolation_level=None)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, 1_000_000)
+        for table in self.tables:
+            columns = {row[1] for row in conn.execute(f'PRAGMA main.table_info("{table}")')}
+            if not columns:
+                raise SandboxError(f"Table not found: {table}")
+            conditions = []
+            for column, value in (scope or {}).items():
+                if column not in columns:
+                    raise SandboxError(f"Cannot scope {table} by unknown column {column}")
+                literal = conn.execute("SELECT quote(?)", (value,)).fetchone()[0]
+                conditions.append(f'"{column}" = {literal}')
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            conn.execute(f'CREATE TEMP VIEW "{table}" AS SELECT * FROM main."{table}"{where}')
+        conn.set_authorizer(self._authorizer(scoped=bool(scope)))
+        return conn
+
+    def _authorizer(self, scoped: bool):
+        tables = set(self.tables)
+
+        def authorize(action: int, arg1, arg2, db_name, view) -> int:
+            if action in _ALWAYS_ALLOWED:
+                return sqlite3.SQLITE_OK
+            if action == sqlite3.SQLITE_FUNCTION:
+                return sqlite3.SQLITE_DENY if (arg2 or "").lower() in _DENIED_FUNCTIONS else sqlite3.SQLITE_OK
+            if action == sqlite3.SQLITE_READ:
+                if db_name is None:  # a CTE; its own reads are checked separately
+                    return sqlite3.SQLITE_OK
+                if arg1 in tables:
+                    # Top-level reads go to the TEMP view; main tables only from inside it.
+                    # A flattened view may read no column at all (COUNT(*)) and loses its
+                    # attribution; that is only harmless when there is no tenant filter.
+                    if db_name == "temp" or (db_name == "main" and (view == arg1 or (arg2 == "" and not scoped))):
+                        return sqlite3.SQLITE_OK
+            return sqlite3.SQLITE_DENY
+
+        return authorize
+
+    def execute(self, sql: str, scope: dict | None = None) -> QueryResult:
+        """Run one SELECT with the tenant filter ``scope`` ({column: value}) on every table."""
+        started = time.perf_counter()
+        deadline = started + self.time_budget_ms / 1000
+        conn = self._connect(scope)
+        conn.set_progress_handler(lambda: 1 if time.perf_counter() > deadline else 0, PROGRESS_STEPS)
+        rows: list[tuple] = []
+        try:
+            try:
+                cursor = conn.execute(sql)
+            except sqlite3.ProgrammingError as exc:  # more than one statement
+                raise QueryRejected(str(exc)) from exc
+            except sqlite3.DatabaseError as exc:
+                if "not authorized" in str(exc) or "prohibited" in str(exc) or "cannot modify" in str(exc):
+                    raise QueryRejected("Only read-only queries on the ledger tables are allowed") from exc
+                raise
+            columns = [d[0] for d in cursor.description or ()]
+            while len(rows) <= self.max_rows:
+                batch = cursor.fetchmany(min(256, self.max_rows + 1 - len(rows)))
+                if not batch:
+                    break
+                rows.extend(batch)
+        except sqlite3.OperationalError as exc:
+            if "interrupted" in str(exc):
+                raise QueryTimeout(f"Query exceeded its {self.time_budget_ms:.0f} ms budget", rows) from exc
+            raise
+        finally:
+            conn.close()
+        truncated = len(rows) > self.max_rows
+        return QueryResult(
+            columns=columns,
+            rows=rows[:self.max_rows],
+            truncated=truncated,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
@@ -0,0 +1,150 @@
+"""Tests for the /ask answer cache: ``python -m pytest backend/test_ask_cache.py``."""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ask_cache import AskCache
+from intent_parser import cache_key
+
+# Questions that ask for different things must never share a cached answer
+DIFFERENT_INTENTS = [
+    ("how much paid this month", "how much received this month"),
+    ("kitna diya aaj", "kitna mila aaj"),
+    ("top 5 sales payment mode wise", "top 5 sales"),
+    ("highest sale by mode", "highest sale"),
+    ("sales day wise", "sales by mode"),
+    ("sales via upi", "sales"),
+    ("kal se sales", "kal sales"),
+    ("gst collected", "gst"),
+]
+
+# Spelling, case, punctuation and particle variants of one question
+SAME_INTENT = [
+    ("Kal ka galla?", "kal ki bikri"),
+    ("Aaj ka sale", "aaj sales please"),
+    ("UPI se kitna mila", "upi se kitna received"),
+    ("payment mode wise", "Payment-mode wise!"),
+    ("sales by mode", "sales mode wise"),
+]
+
+
+@pytest.mark.parametrize("first, second", DIFFERENT_INTENTS)
+def test_different_intents_get_different_keys(first, second):
+    assert cache_key(first) != cache_key(second)
+
+
+@pytest.mark.parametrize("first, second", SAME_INTENT)
+def test_variants_share_a_key(first, second):
+    assert cache_key(first) == cache_key(second)
+
+
+def test_meaningful_questions_have_a_key():
+    assert cache_key("payment mode wise") == "bymode"
+    assert cache_key("please ji") == ""
+
+
+def test_empty_key_bypasses_the_cache(tmp_path):
+    cache = AskCache(tmp_path / "ask_cache.db")
+    calls = []
+
+    def compute(question):
+        calls.append(question)
+        return {"sql": "SELECT 1", "chart": "none", "title": question}
+
+    assert cache.get_or_compute("please ji", compute)[1] == "openai"
+    assert cache.get_or_compute("bhai please", compute)[1] == "openai"
+    assert calls == ["please ji", "bhai please"]
+    assert cache.stats()["entries"] == 0
+
+
+def answer(title: str) -> dict:
+    return {"sql": "SELECT SUM(amount) FROM transactions", "chart": "none", "title": title}
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("ask_cache.time.time", lambda: now[0])
+    cache = AskCache(tmp_path / "ask_cache.db", ttl_s=60)
+    cache.put("yesterday sales", answer("old"))
+    assert cache.get("yesterday sales") == answer("old")
+
+    now[0] += 61
+    assert cache.get("yesterday sales") is None
+    # Gone from the shared table too, not just from this process
+    assert AskCache(tmp_path / "ask_cache.db", ttl_s=60).get("yesterday sales") is None
+    assert cache.get_or_compute("kal ka galla", lambda q: answer("new")) == (answer("new"), "openai")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("ask_cache.time.time", lambda: now[0])
+    cache = AskCache(tmp_path / "ask_cache.db", max_entries=2, memory_entries=1)
+    for key in ("a", "b"):
+        cache.put(key, answer(key))
+        now[0] += 1
+    assert cache.get("a") == answer("a")  # from the table: "a" is now the most recent
+    now[0] += 1
+    cache.put("c", answer("c"))
+
+    shared = AskCache(tmp_path / "ask_cache.db", max_entries=2)
+    assert shared.get("b") is None
+    assert shared.get("a") == answer("a")
+    assert shared.get("c") == answer("c")
+
+
+def test_concurrent_misses_share_one_call(tmp_path):
+    cache = AskCache(tmp_path / "ask_cache.db")
+    release = threading.Event()
+    calls = []
+
+    def compute(question):
+        calls.append(question)
+        release.wait(5)
+        return answer(question)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get_or_compute, question, compute)
+                   for question in ["Aaj ka sale?"] + ["aaj sales"] * 7]
+        while not calls:
+            time.sleep(0.01)
+        time.sleep(0.1)  # let the others reach the flight
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["cache"] * 7 + ["openai"]
+    assert all(value == answer("Aaj ka sale?") for value, _ in results)
+    assert cache.stats()["misses"] == 1
+
+
+def test_a_failed_call_is_not_cached(tmp_path):
+    cache = AskCache(tmp_path / "ask_cache.db")
+
+    def fail(question):
+        raise ValueError("invalid sql")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("aaj sales", fail)
+    assert cache.get_or_compute("aaj sales", lambda q: answer(q)) == (answer("aaj sales"), "openai")
+
+
+def test_concurrent_async_misses_share_one_call(tmp_path):
+    cache = AskCache(tmp_path / "ask_cache.db")
+    calls = []
+
+    async def compute(question):
+        calls.append(question)
+        await asyncio.sleep(0.05)
+        return answer(question)
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute_async("upi se kitna", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["cache"] * 4 + ["openai"]
@@ -0,0 +1,178 @@
+"""
+Background worker for queued bill processing.
+
+Run it next to the web app (same LEDGERLY_DB_PATH):
+
+    python worker.py            # poll forever
+    python worker.py --once     # drain runnable jobs, then exit
+    python worker.py --concurrency 4   # OCR several bills at once
+
+Any number of workers can share one database; jobs are leased, so a crashed
+worker's job is picked up again once its visibility timeout expires.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable
+
+import jobs
+import metrics
+from app import BillProcessingError, process_bill
+from db import ConnectionPool, default_db_path, get_pool, init_db
+
+
+def recover(pool: ConnectionPool) -> None:
+    """Fail exhausted jobs whose worker died and re-queue orphaned 'processing' bills."""
+    with pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for job in jobs.reap_expired(conn):
+            if job.bill_id is not None:
+                conn.execute(
+                    "UPDATE bills SET status = 'failed' WHERE id = ? AND status = 'processing'",
+                    (job.bill_id,),
+                )
+        recovered = jobs.recover_orphaned_bills(conn)
+    if recovered:
+        print(f"[ledgerly-worker] re-queued {len(recovered)} stuck bill(s): {recovered}")
+
+
+def handle_job(
+    pool: ConnectionPool,
+    job: jobs.Job,
+    worker_id: str,
+    visibility_timeout: float,
+    processor: Callable[..., dict] = process_bill,
+) -> bool:
+    """Run one leased job to completion. Returns True on success."""
+    payload = job.payload
+
+    def progress(stage: str) -> None:
+        with pool.connection() as conn:
+            jobs.heartbeat(conn, job.id, worker_id, visibility_timeout, progress=stage)
+
+    error = None
+    retryable = True
+    try:
+        processor(pool, int(payload["bill_id"]), int(payload["user_id"]), Path(payload["path"]), progress=progress)
+    except BillProcessingError as e:
+        error, retryable = f"{e.code}: {e.message}", e.retryable
+    except Exception as e:
+        traceback.print_exc()
+        error = str(e) or e.__class__.__name__
+
+    with pool.connection() as conn:
+        if error is None:
+            jobs.complete(conn, job.id, worker_id)
+            return True
+        requeued = jobs.fail(conn, job, worker_id, error, retryable=retryable)
+        if not requeued and job.bill_id is not None:
+            conn.execute(
+                "UPDATE bills SET status = 'failed' WHERE id = ? AND status = 'processing'",
+                (job.bill_id,),
+            )
+    print(f"[ledgerly-worker] job {job.id} attempt {job.attempts} failed ({'retrying' if requeued else 'giving up'}): {error}")
+    return False
+
+
+def run_worker(
+    db_path: Path,
+    once: bool = False,
+    poll_interval: float = 1.0,
+    visibility_timeout: float = jobs.DEFAULT_VISIBILITY_TIMEOUT,
+    recover_interval: float = 60.0,
+    concurrency: int = 1,
+    processor: Callable[..., dict] = process_bill,
+) -> int:
+    """Process jobs until stopped (or, with ``once``, until the queue is empty). Returns jobs handled.
+
+    ``concurrency`` jobs run at once on threads; their CPU-bound OCR work is
+    spread across cores by the shared process pool in ocr_engine.
+    """
+    init_db(db_path)
+    pool = get_pool(db_path)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        stopping.set()
+        print("[ledgerly-worker] stopping after current job(s)")
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    handled = 0
+    counter_lock = threading.Lock()
+    last_recover = float("-inf")
+
+    def loop(slot: int) -> None:
+        nonlocal handled, last_recover
+        slot_id = f"{worker_id}:{slot}"
+        while not stopping.is_set():
+            if slot == 0 and time.monotonic() - last_recover >= recover_interval:
+                recover(pool)
+                last_recover = time.monotonic()
+
+            with pool.connection() as conn:
+                job = jobs.claim(conn, slot_id, kinds=[jobs.KIND_PROCESS_BILL], visibility_timeout=visibility_timeout)
+
+            if job is None:
+                if once:
+                    return
+                stopping.wait(poll_interval)
+                continue
+
+            handle_job(pool, job, slot_id, visibility_timeout, processor=processor)
+            with counter_lock:
+                handled += 1
+
+    if concurrency <= 1:
+        loop(0)
+    else:
+        threads = [threading.Thread(target=loop, args=(slot,), daemon=True) for slot in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return handled
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ledgerly bill processing worker")
+    parser.add_argument("--once", action="store_true", help="exit when no runnable jobs remain")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--visibility-timeout", type=float, default=jobs.DEFAULT_VISIBILITY_TIMEOUT)
+    parser.add_argument(
+        "--concurrency", type=int, default=int(os.environ.get("LEDGERLY_WORKER_CONCURRENCY", "1")),
+        help="bills processed at once (OCR itself runs on the LEDGERLY_OCR_WORKERS process pool)",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=int(os.environ.get("LEDGERLY_WORKER_METRICS_PORT", "0")),
+        help="serve bill stage and LLM metrics at :PORT/metrics (0 = off)",
+    )
+    args = parser.parse_args()
+
+    db_path = Path(os.environ.get("LEDGERLY_DB_PATH", str(default_db_path())))
+    print(f"[ledgerly-worker] using {db_path}")
+    if args.metrics_port and metrics.enabled():
+        metrics.serve(args.metrics_port)
+        print(f"[ledgerly-worker] metrics on :{args.metrics_port}/metrics")
+    handled = run_worker(
+        db_path,
+        once=args.once,
+        poll_interval=args.poll_interval,
+        visibility_timeout=args.visibility_timeout,
+        concurrency=args.concurrency,
+    )
+    print(f"[ledgerly-worker] handled {handled} job(s)")
+
+
+if __name__ == "__main__":
+    main()
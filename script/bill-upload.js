@@ -30,15 +30,15 @@
     uploadDropZone.addEventListener('drop', (e) => {
       e.preventDefault();
       uploadDropZone.classList.remove('is-dragover');
-      if (e.dataTransfer.files.length) {
-        handleFileUpload(e.dataTransfer.files[0]);
+      if (isBatch(e.dataTransfer.files)) {
+        handleBatchUpload(e.dataTransfer.files);
       }
     });
 
     // File selection
     fileInput.addEventListener('change', (e) => {
-      if (e.target.files.length) {
-        handleFileUpload(e.target.files[0]);
+      if (isBatch(e.target.files)) {
+        handleBatchUpload(e.target.files);
       }
     });
 
@@ -51,42 +51,72 @@
       if (ocrPreview) ocrPreview.style.display = 'none';
     });
 
-    function handleFileUpload(file) {
-      const isImage = file.type.startsWith('image/');
-      const isPdf = file.type === 'application/pdf' || file.name.toLowerCase().endsWith('.pdf');
-      if (!isImage && !isPdf) {
-        alert('Please upload an image or PDF file (JPG, PNG, PDF).');
-        return;
-      }
+    // Single files are uploaded by dashboard.js; this handles several files or a ZIP
+    function isBatch(files) {
+      return files.length > 1 || (files.length === 1 && files[0].name.toLowerCase().endsWith('.zip'));
+    }
 
-      // Show processing
+    function handleBatchUpload(files) {
       uploadDropZone.style.display = 'none';
       processingState.style.display = 'flex';
 
       const formData = new FormData();
-      formData.append('file', file);
+      Array.from(files).forEach(file => formData.append('files', file));
+
+      const results = [];
+      let summary = null;
 
-      fetch('/api/bills/upload', {
+      fetch('/api/bills/batch', {
         method: 'POST',
         body: formData,
-        credentials: 'same-origin' // Ensure cookie is sent
+        credentials: 'same-origin'
       })
-      .then(res => res.json())
-      .then(data => {
+      .then(res => {
+        if (!res.ok || !res.body) {
+          return res.json().then(data => { throw new Error(data.message || data.error || 'upload_failed'); });
+        }
+        // One JSON object per line, each sent as soon as its bill is processed
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        const pump = () => reader.read().then(({ done, value }) => {
+          buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+          const lines = buffer.split('\n');
+          buffer = lines.pop();
+          lines.filter(Boolean).forEach(line => {
+            const msg = JSON.parse(line);
+            if (msg.type === 'summary') {
+              summary = msg;
+            } else {
+              results.push(msg);
+              processingState.dataset.progress = `${results.length}/${files.length}`;
+            }
+          });
+          return done ? null : pump();
+        });
+        return pump();
+      })
+      .then(() => {
         processingState.style.display = 'none';
-        
-        if (data.ok && data.bill) {
-          showResult(data.bill);
-        } else {
-          alert('Upload failed: ' + (data.error || 'Unknown error'));
-          uploadDropZone.style.display = 'flex';
+        const okBills = results.filter(r => r.ok && r.bill).map(r => r.bill);
+        const total = okBills.reduce((sum, bill) => sum + (bill.total_amount || bill.detected_amount || 0), 0);
+        showResult({ total_amount: total, items: okBills.map(bill => ({ vendor: bill.vendor_name, total: bill.total_amount })) });
+        const failed = results.filter(r => !r.ok);
+        if (failed.length) {
+          alert(`${failed.length} of ${results.length} bills could not be processed: ` +
+                failed.map(r => `${r.filename} (${r.error})`).join(', '));
+        }
+        if (summary && ocrTextBox) {
+          ocrTextBox.textContent = JSON.stringify({ summary, bills: okBills.map(b => ({
+            vendor: b.vendor_name, bill_date: b.bill_date, total: b.total_amount
+          })) }, null, 2);
         }
       })
       .catch(err => {
         console.error(err);
         processingState.style.display = 'none';
         uploadDropZone.style.display = 'flex';
-        alert('Network error occurred.');
+        alert('Batch upload failed: ' + err.message);
       });
     }
 
@@ -37,6 +37,24 @@
   // -------------------------
   // Entries Table Functions
   // -------------------------
+  const ENTRY_LIST_FIELDS = 'id,entry_type,amount,note,created_at';
+
+  // /api/entries is paginated newest-first; follow next_before_id to get every entry
+  async function fetchAllEntries() {
+    const entries = [];
+    let beforeId = null;
+    do {
+      const params = new URLSearchParams({ limit: '500', fields: ENTRY_LIST_FIELDS });
+      if (beforeId) params.set('before_id', beforeId);
+      const response = await fetch(`/api/entries?${params}`, { credentials: 'same-origin' });
+      const data = await response.json();
+      if (!response.ok || !data.ok) return null;
+      entries.push(...(data.entries || []));
+      beforeId = data.next_before_id;
+    } while (beforeId);
+    return entries;
+  }
+
   function initEntriesTable() {
     loadEntries();
     initTableFilters();
@@ -47,7 +65,7 @@
     if (!tbody) return;
 
     try {
-      const response = await fetch('/api/entries', { credentials: 'same-origin' });
+      const response = await fetch(`/api/entries?limit=50&fields=${ENTRY_LIST_FIELDS}`, { credentials: 'same-origin' });
       const data = await response.json();
 
       if (!response.ok || !data.ok) {
@@ -145,15 +163,13 @@
     if (!mainLedgerTable) return;
 
     try {
-      const response = await fetch('/api/entries', { credentials: 'same-origin' });
-      const data = await response.json();
+      const entries = await fetchAllEntries();
 
-      if (!response.ok || !data.ok) {
+      if (!entries) {
         mainLedgerTable.innerHTML = '<div style="padding: 2rem; text-align: center; color: #888;">Failed to load ledger entries</div>';
         return;
       }
 
-      const entries = data.entries || [];
       allLedgerEntries = entries;
       
       if (entries.length === 0) {
@@ -343,12 +359,8 @@
 
   async function applyLedgerFilter(filterValue) {
     try {
-      const response = await fetch('/api/entries', { credentials: 'same-origin' });
-      const data = await response.json();
-      
-      if (!response.ok || !data.ok) return;
-      
-      let entries = data.entries || [];
+      // Filter the entries loaded for the ledger instead of fetching them again
+      let entries = allLedgerEntries;
       
       // Apply filter
       if (filterValue === 'income' || filterValue === 'expense') {
@@ -375,18 +387,15 @@
 
   async function exportLedgerToCSV() {
     try {
-      const response = await fetch('/api/entries', { credentials: 'same-origin' });
-      const data = await response.json();
+      const entries = await fetchAllEntries();
       
-      if (!response.ok || !data.ok) {
+      if (!entries) {
         if (window.ToastManager) {
           ToastManager.show('Failed to export ledger', 'error');
         }
         return;
       }
       
-      const entries = data.entries || [];
-      
       if (entries.length === 0) {
         if (window.ToastManager) {
           ToastManager.show('No entries to export', 'info');
@@ -455,7 +464,11 @@
   async function loadBillingSnapshot(range = 'week') {
     try {
       console.log('Loading billing snapshot for range:', range);
-      const response = await fetch(`/api/billing/snapshot?range=${range}`, { credentials: 'same-origin' });
+      // Day boundaries follow the browser's UTC offset (e.g. +05:30), which the
+      // server can resolve without a time zone database
+      const offset = -new Date().getTimezoneOffset();
+      const tz = `${offset < 0 ? '-' : '+'}${String(Math.floor(Math.abs(offset) / 60)).padStart(2, '0')}:${String(Math.abs(offset) % 60).padStart(2, '0')}`;
+      const response = await fetch(`/api/billing/snapshot?range=${range}&tz=${encodeURIComponent(tz)}`, { credentials: 'same-origin' });
       const data = await response.json();
 
       console.log('Billing snapshot response:', data);
@@ -1006,18 +1019,23 @@
       e.preventDefault();
       dropZone.classList.remove('drag-over');
       const files = e.dataTransfer.files;
-      if (files.length > 0) {
+      // Several files (or a ZIP) go to the batch endpoint in bill-upload.js
+      if (files.length === 1 && !isZip(files[0])) {
         handleFileUpload(files[0]);
       }
     });
 
     // File input change
     fileInput.addEventListener('change', () => {
-      if (fileInput.files.length > 0) {
+      if (fileInput.files.length === 1 && !isZip(fileInput.files[0])) {
         handleFileUpload(fileInput.files[0]);
       }
     });
 
+    function isZip(file) {
+      return file.name.toLowerCase().endsWith('.zip');
+    }
+
     // Upload another button
     if (uploadAnotherBtn) {
       uploadAnotherBtn.addEventListener('click', resetUploadUI);
@@ -1031,6 +1049,36 @@
       fileInput.value = '';
     }
 
+    // Polling backs off from 1.5 s to 10 s and gives up after 3 minutes
+    const BILL_POLL_FIRST_MS = 1500;
+    const BILL_POLL_MAX_MS = 10000;
+    const BILL_WAIT_MAX_MS = 3 * 60 * 1000;
+
+    async function waitForBill(billId) {
+      // Poll the status endpoint until the worker finishes or gives up;
+      // resolves to null if the bill is still processing when the wait runs out
+      const deadline = Date.now() + BILL_WAIT_MAX_MS;
+      let delay = BILL_POLL_FIRST_MS;
+      while (Date.now() + delay < deadline) {
+        await new Promise((resolve) => setTimeout(resolve, delay));
+        delay = Math.min(delay * 1.5, BILL_POLL_MAX_MS);
+        const response = await fetch(`/api/bills/${billId}/status`, { credentials: 'same-origin' });
+        const data = await response.json();
+        if (!response.ok) {
+          throw new Error(data.message || data.error || 'Status check failed');
+        }
+        if (data.bill.status === 'done') return data.bill;
+        if (data.bill.status === 'failed') {
+          throw new Error(data.bill.error || 'Bill processing failed');
+        }
+        // No job queued, or its worker died with no retries left: nothing will finish it
+        if (data.bill.job_status === null || data.bill.job_status === 'dead' || data.bill.job_status === 'failed') {
+          throw new Error(data.bill.error || 'Bill processing stopped; please upload it again');
+        }
+      }
+      return null;
+    }
+
     async function handleFileUpload(file) {
       // Validate file type
       const isImage = file.type.startsWith('image/');
@@ -1068,6 +1116,21 @@
           throw new Error(data.message || data.error || 'Upload failed');
         }
 
+        // Queued uploads (202) are processed in the background; wait for the result
+        if (data.bill && data.bill.status === 'processing') {
+          data.bill = await waitForBill(data.bill.id);
+          if (!data.bill) {
+            resetUploadUI();
+            const message = 'Still processing, check the bills list later.';
+            if (window.ToastManager) {
+              ToastManager.show(message, 'info');
+            } else {
+              alert(message);
+            }
+            return;
+          }
+        }
+
         // Show success result
         processingEl.style.display = 'none';
         resultEl.style.display = 'flex';